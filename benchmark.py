@@ -0,0 +1,102 @@
+import argparse
+import json
+import logging
+import os
+
+from config import ShowdownConfig
+from config import init_logging
+from data.mods.apply_mods import apply_mods
+from puzzles.load_puzzle import PUZZLE_DIR
+from showdown.engine.benchmark import compare
+from showdown.engine.benchmark import load_corpus
+from showdown.engine.benchmark import record_corpus
+from showdown.engine.benchmark import run_benchmarks
+
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time the engine on a corpus of recorded positions")
+    parser.add_argument("--corpus", default=os.path.join(BENCHMARK_DIR, "corpus.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARK_DIR, "baseline.json"))
+    parser.add_argument("--output", default=None, help="where to write the results, they are printed if this is not given")
+    parser.add_argument("--save-baseline", action="store_true", help="replace the baseline with these results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="how much slower than the baseline a benchmark can be before it fails")
+    parser.add_argument("--max-depth", type=int, default=4)
+    parser.add_argument("--deep-positions", type=int, default=8, help="how many positions to search at depth 3, each depth after that uses a quarter as many")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--record", action="store_true", help="record the corpus again from the puzzles before running")
+    parser.add_argument("--pokemon-mode", default=os.environ.get("POKEMON_MODE", "gen9nationaldexag"), help="only used when recording")
+    parser.add_argument("--battles", type=int, default=3, help="battles to record from each puzzle")
+    parser.add_argument("--damage-calc-type", default="average")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    init_logging("INFO", False)
+    ShowdownConfig.damage_calc_type = args.damage_calc_type
+
+    if args.record:
+        ShowdownConfig.pokemon_mode = args.pokemon_mode
+        apply_mods(args.pokemon_mode)
+        from showdown.puzzle_runner.verifier import read_file
+        from showdown.puzzle_runner.verifier import team_from_export
+        names = sorted(
+            name for name in os.listdir(PUZZLE_DIR)
+            if os.path.isdir(os.path.join(PUZZLE_DIR, name)) and not name.startswith('.')
+        )
+        default_challenger = team_from_export(read_file(os.path.join(BENCHMARK_DIR, "challenger")))
+        # switch-out moves like u-turn are only in the corpus if a challenger uses them
+        pivot_challenger = team_from_export(read_file(os.path.join(BENCHMARK_DIR, "pivot_challenger")))
+        corpus = record_corpus(
+            names,
+            default_challenger,
+            args.pokemon_mode,
+            battles=args.battles,
+            extra_challenger_teams={"pivot_challenger": pivot_challenger}
+        )
+        with open(args.corpus, 'w') as f:
+            json.dump(corpus, f, sort_keys=True)
+        logger.info("Recorded {} positions to {}".format(len(corpus["positions"]), args.corpus))
+    else:
+        corpus = load_corpus(args.corpus)
+        ShowdownConfig.pokemon_mode = corpus["pokemon_mode"]
+        apply_mods(corpus["pokemon_mode"])
+
+    results = run_benchmarks(corpus, max_depth=args.max_depth, deep_positions=args.deep_positions, repeat=args.repeat)
+
+    regressed = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            results["comparison"] = compare(results, json.load(f), threshold=args.threshold)
+        for name, c in results["comparison"].items():
+            if c["change"] is None:
+                logger.info("{}: no baseline".format(name))
+                continue
+            logger.info("{}: {:+.1f}% ({:.1f}us/op vs. {:.1f}us/op)".format(name, 100 * c["change"], c["current_us"], c["baseline_us"]))
+            if c["regressed"]:
+                regressed.append(name)
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(text)
+        logger.info("Saved the baseline to {}".format(args.baseline))
+
+    if regressed:
+        logger.error("Slower than the baseline: {}".format(", ".join(regressed)))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -56,6 +56,18 @@ class _ShowdownConfig:
     websocket_uri: str
     username: str
     password: str
+    accounts: list[tuple[str, str]]
+    login_uri: str
+    login_timeout: float
+    reconnect_attempts: int
+    reconnect_max_delay: float
+    message_rate_limit: float
+    message_burst: int
+    message_lines_per_frame: int
+    search_cache_dir: str
+    search_cache_size: int
+    smogon_stats_uri: str
+    smogon_stats_cache_dir: str
     bot_mode: str
     pokemon_mode: str
     run_count: int
@@ -64,6 +76,8 @@ class _ShowdownConfig:
     save_replay: bool
     room_name: str
     damage_calc_type: str
+    switch_out_mode: str
+    sample_aggregation: str
     log_level: str
     log_to_file: bool
     log_handler: Union[CustomRotatingFileHandler, logging.StreamHandler]
@@ -73,6 +87,14 @@ class _ShowdownConfig:
         self.websocket_uri = env("WEBSOCKET_URI")
         self.username = env("PS_USERNAME")
         self.password = env("PS_PASSWORD")
+        self.accounts = [(self.username, self.password)] + self.parse_accounts(env.list("PS_EXTRA_ACCOUNTS", []))
+        self.login_uri = env("LOGIN_URI", None)
+        self.login_timeout = env.float("LOGIN_TIMEOUT", 10)
+        self.reconnect_attempts = env.int("RECONNECT_ATTEMPTS", 10)
+        self.reconnect_max_delay = env.float("RECONNECT_MAX_DELAY", 60)
+        self.message_rate_limit = env.float("MESSAGE_RATE_LIMIT", 1.6)
+        self.message_burst = env.int("MESSAGE_BURST", 6)
+        self.message_lines_per_frame = env.int("MESSAGE_LINES_PER_FRAME", 3)
         self.bot_mode = env("BOT_MODE")
         self.pokemon_mode = env("POKEMON_MODE")
 
@@ -82,19 +104,43 @@ class _ShowdownConfig:
         self.save_replay = env.bool("SAVE_REPLAY", False)
         self.room_name = env("ROOM_NAME", None)
         self.damage_calc_type = env("DAMAGE_CALC_TYPE", "average")
+        self.switch_out_mode = env("SWITCH_OUT_MODE", constants.SWITCH_OUT_SEARCH)
+        self.sample_aggregation = env("SAMPLE_AGGREGATION", constants.SAMPLES_WORST_CASE)
+        self.search_cache_dir = env("SEARCH_CACHE_DIR", None)
+        self.search_cache_size = env.int("SEARCH_CACHE_SIZE", 100000)
+        self.smogon_stats_uri = env("SMOGON_STATS_URI", "https://www.smogon.com/stats")
+        self.smogon_stats_cache_dir = env("SMOGON_STATS_CACHE_DIR", None)
 
         self.log_level = env("LOG_LEVEL", "DEBUG")
         self.log_to_file = env.bool("LOG_TO_FILE", False)
 
         self.validate_config()
 
+    @staticmethod
+    def parse_accounts(account_strings):
+        # each account is given as `username:password`
+        accounts = []
+        for account in account_strings:
+            username, _, password = account.partition(":")
+            accounts.append((username.strip(), password.strip()))
+        return accounts
+
     def validate_config(self):
         assert self.bot_mode in constants.BOT_MODES
+        assert self.switch_out_mode in constants.SWITCH_OUT_MODES, (
+            "SWITCH_OUT_MODE must be one of {}".format(", ".join(constants.SWITCH_OUT_MODES))
+        )
+        assert self.sample_aggregation in constants.SAMPLE_AGGREGATIONS, (
+            "SAMPLE_AGGREGATION must be one of {}".format(", ".join(constants.SAMPLE_AGGREGATIONS))
+        )
 
         if self.bot_mode == constants.CHALLENGE_USER:
             assert self.user_to_challenge is not None, (
                 "If bot_mode is `CHALLENGE_USER, you must declare USER_TO_CHALLENGE"
             )
 
+        usernames = [username for username, _ in self.accounts]
+        assert len(usernames) == len(set(usernames)), "Each account in PS_EXTRA_ACCOUNTS must be unique"
+
 
 ShowdownConfig = _ShowdownConfig()
@@ -27,6 +27,16 @@ ACCEPT_CHALLENGE = "ACCEPT_CHALLENGE"
 SEARCH_LADDER = "SEARCH_LADDER"
 BOT_MODES = [CHALLENGE_USER, ACCEPT_CHALLENGE, SEARCH_LADDER]
 
+# how the engine picks the pokemon to switch to after a switch-out move like u-turn
+SWITCH_OUT_SEARCH = "search"
+SWITCH_OUT_HEURISTIC = "heuristic"
+SWITCH_OUT_MODES = [SWITCH_OUT_SEARCH, SWITCH_OUT_HEURISTIC]
+
+# how the scores of several sampled battles are combined before picking a move
+SAMPLES_WORST_CASE = "worst_case"
+SAMPLES_EXPECTED = "expected"
+SAMPLE_AGGREGATIONS = [SAMPLES_WORST_CASE, SAMPLES_EXPECTED]
+
 STANDARD_BATTLE = "standard_battle"
 RANDOM_BATTLE = "random_battle"
 
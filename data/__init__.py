@@ -2,6 +2,8 @@ import os
 import json
 import logging
 
+from data.random_battle_index import build_random_battle_set_indexes
+
 logger = logging.getLogger(__name__)
 
 PWD = os.path.dirname(os.path.abspath(__file__))
@@ -17,6 +19,7 @@ with open(pkmn_json_location, 'r') as f:
 random_battle_set_location = os.path.join(PWD, 'random_battle_sets.json')
 with open(random_battle_set_location, 'r') as f:
     random_battle_sets = json.load(f)
+random_battle_set_indexes = build_random_battle_set_indexes(random_battle_sets)
 
 
 pokemon_sets = random_battle_sets
@@ -1,9 +1,18 @@
+import asyncio
+import hashlib
+import json
+import os
+
 import constants
+from config import ShowdownConfig
 
 import data
 from data import pokedex
+from data.prefix_index import prefix_index
+from data.parse_smogon_stats import get_cache_path
 from data.parse_smogon_stats import get_smogon_stats_file_name
-from data.parse_smogon_stats import get_pokemon_information
+from data.parse_smogon_stats import fetch_pokemon_information
+from data.parse_smogon_stats import write_atomically
 
 from data.parse_smogon_stats import MOVES_STRING
 from data.parse_smogon_stats import SPREADS_STRING
@@ -39,35 +48,22 @@ def get_pokemon_sets(pkmn):
     try:
         return data.pokemon_sets[pkmn]
     except KeyError:
-        possible_names = [p for p in data.pokemon_sets if pkmn.startswith(p)]
-        if not possible_names:
+        new_name = prefix_index(data.pokemon_sets).first_prefix_of(pkmn)
+        if new_name is None:
             raise KeyError
         else:
-            new_name = possible_names[0]
             logger.debug("{} not in the sets lookup, using {} instead".format(pkmn, new_name))
             return data.pokemon_sets[new_name]
 
 
 def get_all_possible_moves_for_random_battle(pkmn_name, known_moves):
     try:
-        sets = data.random_battle_sets[pkmn_name]
+        index = data.random_battle_set_indexes[pkmn_name]
     except KeyError:
         logger.warning("{} not in the random-battle sets lookup".format(pkmn_name))
         return []
 
-    new_moves = list()
-    for key in sets[constants.SETS]:
-        this_set_moves = key.split('|')
-        if all(m in this_set_moves for m in known_moves):
-            for m in filter(lambda x: x not in new_moves + known_moves, this_set_moves):
-                new_moves.append(m)
-
-    if not new_moves:
-        for m, _ in sets[constants.MOVES]:
-            if m not in known_moves:
-                new_moves.append(m)
-
-    return new_moves
+    return index.possible_moves(known_moves)
 
 
 def get_most_likely_ability_for_random_battle(pkmn_name):
@@ -164,20 +160,44 @@ def get_most_likely_spread(pkmn_name):
 
 
 def get_standard_battle_sets(battle_mode, pokemon_names=None):
+    """
+    Blocking version of `async_get_standard_battle_sets`, for scripts only
+    It cannot be called while an event loop is running, so battles must await `async_get_standard_battle_sets`
+    """
+    return asyncio.run(async_get_standard_battle_sets(battle_mode, pokemon_names))
+
+
+async def async_get_standard_battle_sets(battle_mode, pokemon_names=None):
+    """
+    When `SMOGON_STATS_CACHE_DIR` is set the downloaded files and the merged result are saved there,
+    so the same battle mode and pokemon are loaded without the network until next month's stats are used
+    """
+    cache_dir = getattr(ShowdownConfig, 'smogon_stats_cache_dir', None)
+    merged_path = None
+    if cache_dir is not None:
+        key = hashlib.sha1("|".join(sorted(pokemon_names or [])).encode()).hexdigest()
+        month = get_smogon_stats_file_name(battle_mode).split('/')[-3]
+        merged_path = os.path.join(cache_dir, month, "merged", "{}-{}.json".format(battle_mode, key))
+        try:
+            with open(merged_path, 'r') as f:
+                logger.debug("Using saved usage stats from {}".format(merged_path))
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
     if any(battle_mode.endswith(s) for s in constants.SMOGON_HAS_STATS_PAGE_SUFFIXES):
-        smogon_stats_file_name = get_smogon_stats_file_name(battle_mode)
-        logger.debug("Making HTTP request to {} for usage stats".format(smogon_stats_file_name))
-        smogon_usage_data = get_pokemon_information(smogon_stats_file_name, pkmn_names=pokemon_names)
+        game_modes = [battle_mode]
+        logger.debug("Making HTTP request to {} for usage stats".format(get_smogon_stats_file_name(battle_mode)))
+        smogon_usage_data, = await fetch_pokemon_information(game_modes, pokemon_names, cache_dir)
     else:
         # use ALL data for a mode like battle-factory
-        logger.debug("Making HTTP request for ALL usage stats\nplease wait...")
-        ubers_data = get_pokemon_information(get_smogon_stats_file_name("gen9ubers"), pkmn_names=pokemon_names)
-        ou_data = get_pokemon_information(get_smogon_stats_file_name("gen9ou"), pkmn_names=pokemon_names)
-        uu_data = get_pokemon_information(get_smogon_stats_file_name("gen9uu"), pkmn_names=pokemon_names)
-        ru_data = get_pokemon_information(get_smogon_stats_file_name("gen9ru"), pkmn_names=pokemon_names)
-        nu_data = get_pokemon_information(get_smogon_stats_file_name("gen9nu"), pkmn_names=pokemon_names)
-        pu_data = get_pokemon_information(get_smogon_stats_file_name("gen9pu"), pkmn_names=pokemon_names)
-        lc_data = get_pokemon_information(get_smogon_stats_file_name("gen9lc"), pkmn_names=pokemon_names)
+        game_modes = ["gen9lc", "gen9pu", "gen9nu", "gen9ru", "gen9uu", "gen9ou", "gen9ubers"]
+        logger.debug("Making HTTP requests for ALL usage stats\nplease wait...")
+        lc_data, pu_data, nu_data, ru_data, uu_data, ou_data, ubers_data = await fetch_pokemon_information(
+            game_modes,
+            pokemon_names,
+            cache_dir
+        )
 
         smogon_usage_data = lc_data
         for pkmn_data in [pu_data, nu_data, ru_data, uu_data, ou_data, ubers_data]:
@@ -185,6 +205,12 @@ def get_standard_battle_sets(battle_mode, pokemon_names=None):
                 if pkmn_name not in smogon_usage_data:
                     smogon_usage_data[pkmn_name] = pkmn_data[pkmn_name]
 
+    # stats from the month before are used when last month's are not out yet,
+    # and they are not saved under last month so that last month's are downloaded once they are out
+    if merged_path is not None and all(
+        os.path.exists(get_cache_path(get_smogon_stats_file_name(game_mode), cache_dir)) for game_mode in game_modes
+    ):
+        write_atomically(merged_path, json.dumps(smogon_usage_data).encode())
     return smogon_usage_data
 
 
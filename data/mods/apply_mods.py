@@ -5,6 +5,8 @@ import constants
 import data
 from data import all_move_json
 from data import pokedex
+from data.prefix_index import invalidate_prefix_index
+from data.random_battle_index import build_random_battle_set_indexes
 from showdown.engine import damage_calculator
 
 logger = logging.getLogger(__name__)
@@ -50,12 +52,15 @@ def apply_pokedex_mods(gen_number):
             pokedex_mods = json.load(f)
         for pokemon, modifications in pokedex_mods.items():
             pokedex[pokemon].update(modifications)
+    invalidate_prefix_index(pokedex)
 
 
 def set_random_battle_sets(gen_number):
     logger.debug("Setting random battle sets for gen {}".format(gen_number))
     with open("{}/random_battle_sets_gen{}.json".format(PWD, gen_number), 'r') as f:
         data.random_battle_sets = json.load(f)
+    data.random_battle_set_indexes = build_random_battle_set_indexes(data.random_battle_sets)
+    invalidate_prefix_index()
 
 
 def apply_gen_3_mods():
@@ -1,12 +1,19 @@
+import asyncio
+import json
 import logging
 import ntpath
+import os
+import re
+import tempfile
 from datetime import datetime
 from dateutil import relativedelta
 
-import requests
+import aiohttp
 
+from config import ShowdownConfig
 from showdown.engine.helpers import spreads_are_alike
 from showdown.engine.helpers import normalize_name
+from data.prefix_index import PrefixIndex
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +24,13 @@ SPREADS_STRING = "spreads"
 ABILITY_STRING = "abilities"
 EFFECTIVENESS = "effectiveness"
 
+SMOGON_STATS_URI = "https://www.smogon.com/stats"
+FETCH_TIMEOUT = 120
+CHUNK_SIZE = 1 << 20
+
+# the parts of each pokemon's information in a chaos file that are used
+CHAOS_FIELDS = ('Raw count', 'Checks and Counters', 'Spreads', 'Items', 'Moves', 'Abilities')
+
 
 def get_smogon_stats_file_name(game_mode, month_delta=1):
     """
@@ -29,28 +43,254 @@ def get_smogon_stats_file_name(game_mode, month_delta=1):
         game_mode = game_mode[:-5]
 
     # always use the `-0` file - the higher ladder is for noobs
-    smogon_url = "https://www.smogon.com/stats/{}-{}/chaos/{}-0.json"
+    smogon_url = "{}/{}-{}/chaos/{}-0.json"
 
     previous_month = datetime.now() - relativedelta.relativedelta(months=month_delta)
     year = previous_month.year
     month = "{:02d}".format(previous_month.month)
 
-    return smogon_url.format(year, month, game_mode)
+    stats_uri = getattr(ShowdownConfig, 'smogon_stats_uri', None) or SMOGON_STATS_URI
+    return smogon_url.format(stats_uri.rstrip('/'), year, month, game_mode)
+
+
+def get_cache_path(smogon_stats_url, cache_dir):
+    """Chaos files are cached as `<cache_dir>/<year>-<month>/<format>-0.json`"""
+    month, _, file_name = smogon_stats_url.split('/')[-3:]
+    return os.path.join(cache_dir, month, file_name)
+
+
+def write_atomically(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+async def fetch_chaos_file(session, smogon_stats_url, cache_dir=None):
+    """
+    Downloads a chaos file and returns the path it was saved to, or None if it does not exist
+    The file is written as it is downloaded rather than being held in memory
+
+    When `cache_dir` is given the file is saved there, and is only downloaded again
+    if the server says that it has changed since it was saved.
+    Otherwise it is saved to a temporary file that the caller should remove
+    """
+    headers = {}
+    if cache_dir is not None:
+        path = get_cache_path(smogon_stats_url, cache_dir)
+        try:
+            with open(path + ".headers", 'r') as f:
+                saved_headers = json.load(f)
+            if os.path.exists(path):
+                if saved_headers.get("ETag"):
+                    headers["If-None-Match"] = saved_headers["ETag"]
+                if saved_headers.get("Last-Modified"):
+                    headers["If-Modified-Since"] = saved_headers["Last-Modified"]
+        except (OSError, ValueError):
+            pass
+    else:
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        async with session.get(smogon_stats_url, headers=headers) as r:
+            if r.status == 304:
+                logger.debug("{} has not changed, using {}".format(smogon_stats_url, path))
+                return path
+            if r.status == 404:
+                if cache_dir is None:
+                    os.remove(path)
+                return None
+            r.raise_for_status()
 
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                async for chunk in r.content.iter_chunked(CHUNK_SIZE):
+                    f.write(chunk)
+            response_headers = {h: r.headers[h] for h in ("ETag", "Last-Modified") if h in r.headers}
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if cache_dir is not None and os.path.exists(path):
+            logger.warning("Could not download {}, using {}: {}".format(smogon_stats_url, path, e))
+            return path
+        if cache_dir is None:
+            os.remove(path)
+        raise
 
-def pokemon_is_similar(normalized_name, list_of_pkmn_names):
-    return (
-        any(normalized_name.startswith(n) for n in list_of_pkmn_names) or
-        any(n.startswith(normalized_name) for n in list_of_pkmn_names)
-    )
+    os.replace(temp_path, path)
+    if cache_dir is not None:
+        write_atomically(path + ".headers", json.dumps(response_headers).encode())
+    return path
+
+
+class _JsonStream:
+    """Reads the values of a JSON file one at a time, only keeping the part of the file that is being read"""
+
+    SEPARATORS = re.compile(r'[\s,:]*')
+    END_OF_SCALAR = re.compile(r'[\s,\]}]')
+    # an unfinished string at the end of the buffer is matched as well so that it's brackets are not counted
+    STRING_OR_BRACKET = re.compile(r'"(?:[^"\\]|\\.)*(?:"|\\?\Z)|[{}\[\]]')
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def skip_separators(self):
+        while True:
+            self.pos = self.SEPARATORS.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return
+
+    def peek(self):
+        self.skip_separators()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON")
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected {!r} at {!r}".format(char, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def next_key(self):
+        """The next key of the object being read, or None at the end of the object"""
+        if self.peek() == '}':
+            self.pos += 1
+            return None
+        return self.value()
+
+    def value(self):
+        # numbers, true, false and null can only be read once the character after them has been read
+        if self.peek() not in '{["':
+            while not self.END_OF_SCALAR.search(self.buffer, self.pos) and self.fill():
+                pass
+
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+
+    def skip(self):
+        if self.peek() not in '{[':
+            self.value()
+            return
+
+        depth = 0
+        i = self.pos
+        while True:
+            for m in self.STRING_OR_BRACKET.finditer(self.buffer, i):
+                token = m.group()
+                if token[0] == '"':
+                    if m.end() == len(self.buffer) and not self.eof:
+                        i = m.start()
+                        break
+                    continue
+                depth += 1 if token in '{[' else -1
+                if depth == 0:
+                    self.pos = m.end()
+                    return
+            else:
+                i = len(self.buffer)
+
+            # only the depth is needed from what has been scanned, so it does not have to be kept
+            self.pos = i
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON")
+            i = self.pos
+
+
+def read_chaos_file(f, wanted, chunk_size=CHUNK_SIZE):
+    """
+    Yields the name and information of each pokemon in the chaos file `f` that `wanted(name)` is True for
+    The file is read in chunks and the other pokemon are skipped without being parsed,
+    so the memory used depends on the pokemon that are wanted rather than the size of the file
+    """
+    stream = _JsonStream(f, chunk_size)
+    stream.expect('{')
+    while (key := stream.next_key()) is not None:
+        if key != 'data':
+            stream.skip()
+            continue
+
+        stream.expect('{')
+        while (pkmn_name := stream.next_key()) is not None:
+            if wanted(pkmn_name):
+                pkmn_information = stream.value()
+                yield pkmn_name, {k: pkmn_information[k] for k in CHAOS_FIELDS if k in pkmn_information}
+            else:
+                stream.skip()
+
+
+def read_pokemon_information(path, pkmn_names=None):
+    # each reader has it's own index, since they are run in threads and `pkmn_names` is the caller's
+    index = PrefixIndex(pkmn_names) if pkmn_names else None
+
+    def wanted(pkmn_name):
+        normalized_name = normalize_name(pkmn_name)
+        return not pkmn_names or normalized_name in pkmn_names or pokemon_is_similar(normalized_name, index)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_pokemon_information(dict(read_chaos_file(f, wanted)), pkmn_names, index)
+
+
+async def fetch_pokemon_information(game_modes, pkmn_names=None, cache_dir=None):
+    """
+    Downloads the chaos file for each of `game_modes` at the same time
+    Returns the information from each file in the same order as `game_modes`
+    """
+    timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async def fetch(game_mode):
+            url = get_smogon_stats_file_name(game_mode)
+            path = await fetch_chaos_file(session, url, cache_dir)
+            if path is None:
+                # the stats for last month might not be out yet
+                url = get_smogon_stats_file_name(game_mode, month_delta=2)
+                path = await fetch_chaos_file(session, url, cache_dir)
+            if path is None:
+                raise ValueError("There are no usage stats for {}".format(game_mode))
+
+            try:
+                return await asyncio.to_thread(read_pokemon_information, path, pkmn_names)
+            finally:
+                if cache_dir is None:
+                    os.remove(path)
+
+        return await asyncio.gather(*[fetch(game_mode) for game_mode in game_modes])
+
+
+def pokemon_is_similar(normalized_name, index):
+    """`index` is the `PrefixIndex` of the names that `normalized_name` is compared with"""
+    return index.first_prefix_of(normalized_name) is not None or index.any_starts_with(normalized_name)
 
 
 def get_pokemon_information(smogon_stats_url, pkmn_names=None):
-    r = requests.get(smogon_stats_url)
-    if r.status_code == 404:
-        r = requests.get(get_smogon_stats_file_name(ntpath.basename(smogon_stats_url.replace('-0.json', '')), month_delta=2))
+    game_mode = ntpath.basename(smogon_stats_url.replace('-0.json', ''))
+    return asyncio.run(fetch_pokemon_information([game_mode], pkmn_names))[0]
+
 
-    infos = r.json()['data']
+def parse_pokemon_information(infos, pkmn_names=None, index=None):
+    if pkmn_names and index is None:
+        index = PrefixIndex(pkmn_names)
     final_infos = {}
     for pkmn_name, pkmn_information in infos.items():
         normalized_name = normalize_name(pkmn_name)
@@ -59,7 +299,7 @@ def get_pokemon_information(smogon_stats_url, pkmn_names=None):
         if (
             pkmn_names and
             normalized_name not in pkmn_names and
-            not pokemon_is_similar(normalized_name, pkmn_names)
+            not pokemon_is_similar(normalized_name, index)
         ):
             continue
         else:
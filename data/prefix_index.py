@@ -0,0 +1,61 @@
+from bisect import bisect_left
+
+
+class PrefixIndex:
+    """
+    Finds names in a table that are prefixes of a name, or that start with a name,
+    without looking through the whole table
+    """
+
+    def __init__(self, names):
+        self.order = {n: i for i, n in enumerate(names)}
+        self.sorted_names = sorted(self.order)
+        self.resolved = dict()
+
+    def first_prefix_of(self, name):
+        """The first name in the table that `name` starts with, or None"""
+        try:
+            return self.resolved[name]
+        except KeyError:
+            pass
+
+        matches = [name[:i] for i in range(1, len(name) + 1) if name[:i] in self.order]
+        prefix = min(matches, key=self.order.__getitem__) if matches else None
+        self.resolved[name] = prefix
+        return prefix
+
+    def any_starts_with(self, prefix):
+        i = bisect_left(self.sorted_names, prefix)
+        return i < len(self.sorted_names) and self.sorted_names[i].startswith(prefix)
+
+
+# indexes of the tables in the `data` module, kept for the last few tables they were made for
+_indexes = dict()
+MAX_INDEXES = 8
+
+
+def prefix_index(names):
+    """
+    Returns the `PrefixIndex` for `names`, only building it the first time it is asked for
+    A table that is changed in place must be followed by `invalidate_prefix_index`
+    """
+    try:
+        table, index = _indexes[id(names)]
+        if table is names:
+            return index
+    except KeyError:
+        pass
+
+    if len(_indexes) >= MAX_INDEXES:
+        _indexes.clear()
+    index = PrefixIndex(names)
+    _indexes[id(names)] = (names, index)
+    return index
+
+
+def invalidate_prefix_index(names=None):
+    """Throws away the index of `names`, or of every table if it is not given"""
+    if names is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(id(names), None)
@@ -0,0 +1,82 @@
+import constants
+
+
+class RandomBattleSetIndex:
+    """
+    The random battle sets of one pokemon, with the moves of each set stored as a bitset
+    and each move mapped to the bitset of the sets that have it
+
+    The sets that can still match the revealed moves are found by ANDing the sets of each
+    revealed move, and the moves that are left are remembered for each combination of revealed moves
+    """
+
+    def __init__(self, sets):
+        self.move_names = []
+        self.move_bits = {}
+        self.set_moves = []
+        self.sets_with_move = {}
+        for i, key in enumerate(sets[constants.SETS]):
+            this_set_moves = key.split('|')
+            for m in this_set_moves:
+                if m not in self.move_bits:
+                    self.move_bits[m] = 1 << len(self.move_names)
+                    self.move_names.append(m)
+                self.sets_with_move[m] = self.sets_with_move.get(m, 0) | 1 << i
+            self.set_moves.append(this_set_moves)
+
+        self.all_sets = (1 << len(self.set_moves)) - 1
+        self.most_common_moves = [m for m, _ in sets[constants.MOVES]]
+        self._possible_moves = {}
+
+    def revealed_moves_mask(self, known_moves):
+        """The bitset of `known_moves`, or None if one of them is not in any set"""
+        mask = 0
+        for m in known_moves:
+            try:
+                mask |= self.move_bits[m]
+            except KeyError:
+                return None
+        return mask
+
+    def matching_sets(self, known_moves):
+        """The bitset of the sets that have every one of `known_moves`"""
+        matching = self.all_sets
+        for m in known_moves:
+            matching &= self.sets_with_move.get(m, 0)
+        return matching
+
+    def possible_moves(self, known_moves):
+        """
+        The moves that are not in `known_moves` from every set that has all of `known_moves`,
+        in the order they appear in the sets.
+        If no set has all of them, the moves the pokemon can have from most to least common
+        """
+        mask = self.revealed_moves_mask(known_moves)
+        try:
+            return list(self._possible_moves[mask])
+        except KeyError:
+            pass
+
+        new_moves = []
+        seen = 0 if mask is None else mask
+        matching = 0 if mask is None else self.matching_sets(known_moves)
+        while matching:
+            lowest = matching & -matching
+            for m in self.set_moves[lowest.bit_length() - 1]:
+                bit = self.move_bits[m]
+                if not seen & bit:
+                    seen |= bit
+                    new_moves.append(m)
+            matching ^= lowest
+
+        if not new_moves:
+            new_moves = [m for m in self.most_common_moves if m not in known_moves]
+
+        # the fallback depends on the moves that are not in any set, so only combinations of known moves are kept
+        if mask is not None:
+            self._possible_moves[mask] = new_moves
+        return list(new_moves)
+
+
+def build_random_battle_set_indexes(random_battle_sets):
+    return {pkmn: RandomBattleSetIndex(sets) for pkmn, sets in random_battle_sets.items()}
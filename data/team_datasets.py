@@ -5,6 +5,7 @@ import os
 import json
 import logging
 import typing
+from functools import lru_cache
 from typing import Tuple
 from typing import Optional
 
@@ -19,6 +20,13 @@ logger = logging.getLogger(__name__)
 PWD = os.path.dirname(os.path.abspath(__file__))
 
 
+@lru_cache(maxsize=None)
+def load_team_datasets():
+    """`team_datasets.json` is only read the first time this is called"""
+    with open(os.path.join(PWD, 'team_datasets.json'), 'r') as f:
+        return json.load(f)
+
+
 @dataclass(frozen=True)
 class PokemonMoveset:
     moves: Tuple[str, ...]
@@ -80,24 +88,126 @@ class PokemonSet:
         return ability_check and item_check and speed_check and self.moves.pkmn_can_have_moves(pkmn)
 
 
+class PokemonSetIndex:
+    """
+    All of the sets for one pokemon, parsed once and ordered from the most to the least common
+
+    The moves of each set are stored as a bitset so that checking a set against the
+    revealed moves is a single bitwise operation, and speeds are only calculated once
+    """
+
+    def __init__(self, raw_sets: dict):
+        # `sorted` is stable, so sets with the same count stay in the order of the file
+        ordered = sorted(raw_sets.items(), key=lambda x: x[1], reverse=True)
+        self.sets = [_TeamDatasets.to_pokemon_set(s) for s, _ in ordered]
+        self.counts = [count for _, count in ordered]
+
+        self.move_bits = {}
+        self.move_masks = []
+        for pkmn_set in self.sets:
+            mask = 0
+            for mv in pkmn_set.moves:
+                mask |= self.move_bits.setdefault(mv, 1 << len(self.move_bits))
+            self.move_masks.append(mask)
+
+        self._speeds = {}
+
+    def __deepcopy__(self, memo):
+        # indexes are shared by copies of a battle, along with the candidates that refer to them
+        return self
+
+    def revealed_moves_mask(self, pkmn: Pokemon) -> Optional[int]:
+        """The bitset of `pkmn`'s known moves, or None if a move is not in any of the sets"""
+        mask = 0
+        for mv in pkmn.moves:
+            try:
+                mask |= self.move_bits[mv.name]
+            except KeyError:
+                return None
+        return mask
+
+    def speeds(self, pkmn: Pokemon):
+        """The speed of `pkmn` with each set, including choicescarf"""
+        key = (pkmn.base_stats[constants.SPEED], pkmn.level)
+        try:
+            return self._speeds[key]
+        except KeyError:
+            pass
+
+        speeds = []
+        for pkmn_set in self.sets:
+            speed = calculate_stats(pkmn.base_stats, pkmn.level, evs=pkmn_set.evs, nature=pkmn_set.nature)[constants.SPEED]
+            if pkmn_set.item == "choicescarf":
+                speed = int(speed * 1.5)
+            speeds.append(speed)
+        self._speeds[key] = speeds
+        return speeds
+
+    def candidates(self, pkmn: Pokemon, speed_check=True):
+        """
+        The indexes of the sets that have all of `pkmn`'s revealed moves and match it's speed range
+
+        The result is kept on `pkmn` and the next call only looks through those sets
+        as long as no moves have been forgotten and the speed range has not grown
+        """
+        revealed = self.revealed_moves_mask(pkmn)
+        if revealed is None:
+            return []
+
+        speed_min, speed_max = (pkmn.speed_range.min, pkmn.speed_range.max) if speed_check else (float('-inf'), float('inf'))
+        previous = pkmn.set_candidates
+        if (
+            previous is not None and
+            previous[0] is self and
+            revealed & previous[1] == previous[1] and
+            previous[2] <= speed_min and
+            speed_max <= previous[3]
+        ):
+            if revealed == previous[1] and speed_min == previous[2] and speed_max == previous[3]:
+                return previous[4]
+            searched = previous[4]
+        else:
+            searched = range(len(self.sets))
+
+        move_masks = self.move_masks
+        speeds = self.speeds(pkmn)
+        candidates = [
+            i for i in searched
+            if move_masks[i] & revealed == revealed and speed_min <= speeds[i] <= speed_max
+        ]
+        pkmn.set_candidates = (self, revealed, speed_min, speed_max, candidates)
+        return candidates
+
+    def possible_sets(self, pkmn: Pokemon, match_ability=True, match_item=True, speed_check=True):
+        """The indexes of the sets that `pkmn` can have, from the most to the least common"""
+        return [
+            i for i in self.candidates(pkmn, speed_check=speed_check)
+            if self.ability_and_item_match(i, pkmn, match_ability, match_item)
+        ]
+
+    def ability_and_item_match(self, i, pkmn: Pokemon, match_ability=True, match_item=True):
+        pkmn_set = self.sets[i]
+        if match_ability and not (pkmn_set.ability == pkmn.ability or pkmn.ability is None):
+            return False
+        return not match_item or pkmn_set.item_check(pkmn)
+
+
 class _TeamDatasets:
     def __init__(self):
         self.pokemon_sets = {}
+        self.indexes = {}
 
     def set_pokemon_sets(self, pkmn_names):
         """
-        To not have to hold the entire `team_datasets.json` in memory,
-        this allows you to only populate team_datasets with only the
-        sets of the pokemon you provide. Ideally this is called during
-        team preview
+        Only the sets of the pokemon you provide are looked at by `predict_set`.
+        Ideally this is called during team preview
         """
         self.pokemon_sets = {}
+        self.indexes = {}
         self.append_to_team_datasets(pkmn_names)
 
     def append_to_team_datasets(self, pkmn_names):
-        sets = os.path.join(PWD, 'team_datasets.json')
-        with open(sets, 'r') as f:
-            sets_dict = json.load(f)["pokemon"]
+        sets_dict = load_team_datasets()["pokemon"]
 
         for pkmn in pkmn_names:
             try:
@@ -105,11 +215,23 @@ class _TeamDatasets:
             except KeyError:
                 logger.warning("No pokemon information being added for {}".format(pkmn))
 
+    def get_index(self, pkmn_name) -> Optional[PokemonSetIndex]:
+        """The index for a pokemon's sets is built the first time it is needed"""
+        try:
+            return self.indexes[pkmn_name]
+        except KeyError:
+            pass
+
+        try:
+            index = PokemonSetIndex(self.pokemon_sets[pkmn_name])
+        except KeyError:
+            return None
+        self.indexes[pkmn_name] = index
+        return index
+
     @staticmethod
     def get_exact_team(pkmn_names):
-        sets = os.path.join(PWD, 'team_datasets.json')
-        with open(sets, 'r') as f:
-            teams_dict = json.load(f)["teams"]
+        teams_dict = load_team_datasets()["teams"]
 
         pkmn_lookup = "|".join(pkmn_names)
         try:
@@ -146,15 +268,13 @@ class _TeamDatasets:
         if not self.pokemon_sets:
             logger.warning("Called `predict_set` when team_datasets was empty")
 
-        try:
-            pkmn_data = self.pokemon_sets[pkmn.name]
-        except KeyError:
-            pkmn_data = {}
+        index = self.get_index(pkmn.name)
+        if index is None:
+            return None
 
-        for pkmn_set, _ in sorted(pkmn_data.items(), key=lambda x: x[1], reverse=True):
-            pkmn_set = self.to_pokemon_set(pkmn_set)
-            if pkmn_set.pkmn_can_contain_set(pkmn, match_ability=match_ability, match_item=match_item):
-                return pkmn_set
+        for i in index.candidates(pkmn):
+            if index.ability_and_item_match(i, pkmn, match_ability=match_ability, match_item=match_item):
+                return index.sets[i]
 
         return None
 
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import logging
+import os
+
+import constants
+from config import init_logging
+from data.mods.apply_mods import apply_mods
+from puzzles.load_puzzle import PUZZLE_DIR
+from showdown.local_server import LocalShowdownServer
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run puzzle battles through run.py against a local stand-in for Pokemon Showdown and measure the throughput"
+    )
+    parser.add_argument("puzzle", nargs="?", default=os.environ.get("PUZZLE"))
+    parser.add_argument("--pokemon-mode", default=os.environ.get("POKEMON_MODE", "gen9nationaldexag"))
+    parser.add_argument("--challenger", default=None, help="a team in the export format for the simulated challenger, defaults to the puzzle's `challenger` file")
+    parser.add_argument("--battles", type=int, default=100)
+    parser.add_argument("--accounts", type=int, default=1, help="how many accounts to battle with at once")
+    parser.add_argument("--bot-mode", default=constants.SEARCH_LADDER, choices=sorted(constants.BOT_MODES))
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", default="0", help="the same seed plays the same battles")
+    parser.add_argument("--max-turns", type=int, default=100)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--serve-only", action="store_true", help="only run the server, for pointing a separate run.py at it")
+    return parser.parse_args()
+
+
+def configure_environment(args, server):
+    # run.py reads it's configuration from the environment, which takes precedence over the env file
+    usernames = ["loadtest{}".format(i) for i in range(args.accounts)]
+    os.environ.update({
+        "PUZZLE": args.puzzle,
+        "WEBSOCKET_URI": server.address,
+        "LOGIN_URI": server.login_uri,
+        "PS_USERNAME": usernames[0],
+        "PS_PASSWORD": "",
+        "PS_EXTRA_ACCOUNTS": ",".join("{}:".format(u) for u in usernames[1:]),
+        "BOT_MODE": args.bot_mode,
+        "POKEMON_MODE": args.pokemon_mode,
+        "RUN_COUNT": str(args.battles),
+        "USER_TO_CHALLENGE": server.challenger_name,
+        "MESSAGE_RATE_LIMIT": "0",
+        "SAVE_REPLAY": "False",
+        "LOG_LEVEL": args.log_level,
+        "LOG_TO_FILE": "False",
+    })
+
+
+async def load_test(args):
+    challenger_path = args.challenger or os.path.join(PUZZLE_DIR, args.puzzle, "challenger")
+    with open(challenger_path, 'r') as f:
+        challenger_team = f.read()
+
+    apply_mods(args.pokemon_mode)
+    server = LocalShowdownServer(challenger_team, args.pokemon_mode, port=args.port, seed=args.seed, max_turns=args.max_turns)
+    await server.start()
+    try:
+        if args.serve_only:
+            logger.warning("Serving on {} with the login server at {}".format(server.address, server.login_uri))
+            await asyncio.Event().wait()
+
+        configure_environment(args, server)
+        # imported here so that the configuration is read after the environment is set
+        from run import showdown
+        await showdown()
+    finally:
+        await server.stop()
+
+    return server.stats()
+
+
+def main():
+    args = parse_args()
+    if args.puzzle is None:
+        raise ValueError("A puzzle must be given or set with PUZZLE")
+    if args.serve_only:
+        init_logging(args.log_level, False)
+
+    stats = asyncio.run(load_test(args))
+    print("Battles: {} ({} won by the bot, {} forfeited after an error) in {:.1f} seconds".format(
+        stats["battles"], stats["wins"], stats["errors"], stats["elapsed"]
+    ))
+    print("Battles per second: {:.2f}".format(stats["battles_per_second"]))
+    print("Turn latency over {} decisions: average {:.1f}ms, p50 {:.1f}ms, p95 {:.1f}ms, max {:.1f}ms".format(
+        stats["decisions"],
+        1000 * stats["average_turn_latency"],
+        1000 * stats["p50_turn_latency"],
+        1000 * stats["p95_turn_latency"],
+        1000 * stats["max_turn_latency"]
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 from .load_puzzle import load_team
 from .load_puzzle import load_puzzle
-from .load_puzzle import load_hints
\ No newline at end of file
+from .load_puzzle import load_hints
+from .registry import PuzzleRegistry
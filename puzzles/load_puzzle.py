@@ -5,18 +5,22 @@ from .team_converter import export_to_packed
 
 PUZZLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzles")
 
+def variant_paths(path):
+    """The files under a directory of variants, not including hidden files"""
+    file_names = list()
+    for f in os.listdir(path):
+        full_path = os.path.join(path, f)
+        if os.path.isfile(full_path) and not f.startswith('.'):
+            file_names.append(full_path)
+    return file_names
+
 def load_file(name, kind):
     if name is None:
         return 'null'
 
     path = os.path.join(PUZZLE_DIR, f"{name}", f"{kind}")
     if os.path.isdir(path):
-        file_names = list()
-        for f in os.listdir(path):
-            full_path = os.path.join(path, f)
-            if os.path.isfile(full_path) and not f.startswith('.'):
-                file_names.append(full_path)
-        file_path = random.choice(file_names)
+        file_path = random.choice(variant_paths(path))
 
     elif os.path.isfile(path):
         file_path = path
@@ -32,146 +32,170 @@ class PuzzleParser:
         self.validate_commands(self.commands)
 
     def parse_puzzle_text(self, puzzle_text: str):
-        tokens = [('', (0,0))]
+        """
+        Split the puzzle text into tokens in a single pass
+        Every token character is a token of it's own and the text between them is one token,
+        located at it's first character. Comments, whitespace, spaces and dashes are dropped
+        """
+        tokens = []
+        locations = []
+
+        def add_text(start: int, end: int, location: tuple[int, int]):
+            text = puzzle_text[start:end].strip()
+            if text:
+                tokens.append(text.lower())
+                locations.append(location)
+
         ln = 1
         col = 1
-        i = 0
-        for char in puzzle_text:
+        text_start = 0
+        text_location = None
+        for i, char in enumerate(puzzle_text):
             if char in constants.TOKENS:
-                if tokens[i][0] == '':
-                    tokens[i] = (char, (ln,col))
-                    i += 1
-                else:
-                    tokens.append((char, (ln,col)))
-                    i += 2
-                tokens.append(('', (ln,col + 1)))
-            elif tokens[i][0] == '':
-                tokens[i] = (char, (ln,col))
-            else:
-                tokens[i] = (tokens[i][0] + char, tokens[i][1])
-            
+                if text_location is not None:
+                    add_text(text_start, i, text_location)
+                tokens.append(char)
+                locations.append((ln, col))
+                text_start = i + 1
+                text_location = None
+            elif text_location is None:
+                text_location = (ln, col)
+
             if char == '\n':
                 ln += 1
                 col = 1
             else:
                 col += 1
-        
-        # Strip tokens of newlines and spaces
-        tokens = [(t[0].strip(), t[1]) for t in tokens]
-        # Remove whitespace tokens that have been stripped
-        token_text = [t[0] for t in tokens]
-        while '' in token_text:
-            tokens.pop(token_text.index(''))
-            token_text = [t[0] for t in tokens]
-
-        token_text = [t[0].lower() for t in tokens]
-        token_locations = [t[1] for t in tokens]
-
-        self.tokens = token_text
-        self.locations = token_locations
-
-    def parse_tokens(self, i = 0, repeat_until_faint = False):
-        # Remove comments
-        while constants.COMMENT_TOKEN in self.tokens:
-            index = self.tokens.index(constants.COMMENT_TOKEN)
-            self.tokens.pop(index)
-            if self.tokens[index] not in constants.TOKENS:
-                self.tokens.pop(index)
-
-        # Remove spaces
-        for j in range(len(self.tokens)):
-            self.tokens[j] = self.tokens[j].replace(' ', '')
-            self.tokens[j] = self.tokens[j].replace('-', '')
-        
-        commands = []
+
+        if text_location is not None:
+            add_text(text_start, len(puzzle_text), text_location)
+
+        self.tokens = []
+        self.locations = []
+        skip_next = False
+        for token, location in zip(tokens, locations):
+            if skip_next:
+                skip_next = False
+                if token not in constants.TOKENS:
+                    continue
+
+            # Remove comments along with the text following them
+            if token == constants.COMMENT_TOKEN:
+                skip_next = True
+                continue
+
+            self.tokens.append(token.replace(' ', '').replace('-', ''))
+            self.locations.append(location)
+
+    def parse_tokens(self):
         try:
-            while i < len(self.tokens):
-                token = self.tokens[i]
-                if token == '+':
-                    next = self.tokens[i + 1]
-                    modifiers = {
-                        'mega': False,
-                        'ultra_burst': False,
-                        'dynamax': False,
-                        'tera': False,
-                        'z': False
-                    }
-
-                    # If the next token looks like a pokemon name and not another token
-                    if next not in constants.MODIFIER_TOKENS:
-                        move = next
-                        i += 2
-                    else:
-                        if next == constants.MEGA_TOKEN:
-                            modifiers['mega'] = True
-                        elif next == constants.TERA_TOKEN:
-                            modifiers['tera'] = True
-                        move = self.tokens[i + 2]
-                        i += 3
-                    
-                    if move in constants.TOKENS:
-                        raise PuzzleSyntaxError(f"Expected a move name, got '{move}' instead", self.locations[i - 1], self.lines)
-
-                    commands.append({
-                        'action': constants.MOVE,
-                        'move': move,
-                        'modifiers': modifiers,
-                        'location': self.locations[i - 1]
-                    })
-                elif token == constants.SWITCH_TOKEN:
-                    switch = self.tokens[i + 1]
-
-                    if switch in constants.TOKENS:
-                        raise PuzzleSyntaxError(f"Expected a pokemon name, got '{switch}' instead", self.locations[i + 1], self.lines)
-
-                    commands.append({
-                        'action': constants.SWITCH,
-                        'pokemon': switch,
-                        'location': self.locations[i + 1]
-                    })
-
-                    i += 2
-                elif token == constants.SWITCH_OPEN_BRACKET:
-                    if self.tokens[i + 2] == constants.SWITCH_CLOSE_BRACKET:
-                        switch = self.tokens[i + 1]
-                        
-                        if switch in constants.TOKENS:
-                            raise PuzzleSyntaxError(f"Expected a pokemon name, got '{switch}' instead", self.locations[i + 1], self.lines)
-
-                        commands.append({
-                            'action': constants.SET_SWITCH,
-                            'pokemon': switch,
-                            'location': self.locations[i + 1]
-                        })
-                        
-                        i += 3
-                    elif constants.SWITCH_CLOSE_BRACKET in self.tokens[i + 1:] and \
-                        (constants.SWITCH_OPEN_BRACKET not in self.tokens[i + 1:] or self.tokens[i + 1:].index(constants.SWITCH_OPEN_BRACKET) > self.tokens[i + 1:].index(constants.SWITCH_CLOSE_BRACKET)):
-                        raise PuzzleSyntaxError(f"'{self.tokens[i + 2]}' unexpected in set switch statement", self.locations[i + 2], self.lines)
-                    else:
-                        raise PuzzleSyntaxError(f"Missing closing parenthesis '{constants.SWITCH_CLOSE_BRACKET}' for set switch statement", self.locations[i + 2], self.lines)
-                elif token == constants.REPEAT_OPEN_BRACKET:
-                    if repeat_until_faint:
-                        raise PuzzleSyntaxError(f"'{token}' unexpected in repeat until faint loop", self.locations[i], self.lines)
-                    else:
-                        result = self.parse_tokens(i = i + 1, repeat_until_faint = True)
-                        commands.append({
-                            'action': constants.REPEAT_UNTIL_FAINT,
-                            'commands': result[0]
-                        })
-                        i = result[1]
-                elif token == constants.REPEAT_CLOSE_BRACKET:
-                    if repeat_until_faint:
-                        return commands, i + 1
-                    else:
-                        raise PuzzleSyntaxError(f"'{token}' unexpected outside of repeat until faint loop", self.locations[i], self.lines)
-                else:
-                    raise PuzzleSyntaxError(f"'{token}' unexepected", self.locations[i], self.lines)
-        except IndexError as e:
+            commands, _ = self.parse_block(0, repeat_until_faint=False)
+        except IndexError:
             raise PuzzleSyntaxError("Reached end of file while parsing puzzle", self.locations[-1], self.lines)
-        
+
         return commands
 
+    def parse_block(self, i: int, repeat_until_faint: bool):
+        """Parse commands starting at token `i` until the end of the file, or the end of the repeat until faint loop"""
+        commands = []
+        while i < len(self.tokens):
+            token = self.tokens[i]
+            if token == constants.MOVE_TOKEN:
+                i = self.parse_move(i, commands)
+            elif token == constants.SWITCH_TOKEN:
+                i = self.parse_switch(i, commands)
+            elif token == constants.SWITCH_OPEN_BRACKET:
+                i = self.parse_set_switch(i, commands)
+            elif token == constants.REPEAT_OPEN_BRACKET:
+                if repeat_until_faint:
+                    raise PuzzleSyntaxError(f"'{token}' unexpected in repeat until faint loop", self.locations[i], self.lines)
+
+                repeated_commands, i = self.parse_block(i + 1, repeat_until_faint=True)
+                commands.append({
+                    'action': constants.REPEAT_UNTIL_FAINT,
+                    'commands': repeated_commands
+                })
+            elif token == constants.REPEAT_CLOSE_BRACKET:
+                if repeat_until_faint:
+                    return commands, i + 1
+                else:
+                    raise PuzzleSyntaxError(f"'{token}' unexpected outside of repeat until faint loop", self.locations[i], self.lines)
+            else:
+                raise PuzzleSyntaxError(f"'{token}' unexepected", self.locations[i], self.lines)
+
+        if repeat_until_faint:
+            raise IndexError("Missing closing bracket for repeat until faint loop")
+
+        return commands, i
+
+    def parse_move(self, i: int, commands: list[dict]):
+        next = self.tokens[i + 1]
+        modifiers = {
+            'mega': False,
+            'ultra_burst': False,
+            'dynamax': False,
+            'tera': False,
+            'z': False
+        }
+
+        # If the next token looks like a move name and not another token
+        if next not in constants.MODIFIER_TOKENS:
+            move = next
+            i += 2
+        else:
+            if next == constants.MEGA_TOKEN:
+                modifiers['mega'] = True
+            elif next == constants.TERA_TOKEN:
+                modifiers['tera'] = True
+            move = self.tokens[i + 2]
+            i += 3
+
+        if move in constants.TOKENS:
+            raise PuzzleSyntaxError(f"Expected a move name, got '{move}' instead", self.locations[i - 1], self.lines)
+
+        commands.append({
+            'action': constants.MOVE,
+            'move': move,
+            'modifiers': modifiers,
+            'location': self.locations[i - 1]
+        })
+        return i
+
+    def parse_switch(self, i: int, commands: list[dict]):
+        switch = self.tokens[i + 1]
+
+        if switch in constants.TOKENS:
+            raise PuzzleSyntaxError(f"Expected a pokemon name, got '{switch}' instead", self.locations[i + 1], self.lines)
+
+        commands.append({
+            'action': constants.SWITCH,
+            'pokemon': switch,
+            'location': self.locations[i + 1]
+        })
+        return i + 2
+
+    def parse_set_switch(self, i: int, commands: list[dict]):
+        if self.tokens[i + 2] == constants.SWITCH_CLOSE_BRACKET:
+            switch = self.tokens[i + 1]
+
+            if switch in constants.TOKENS:
+                raise PuzzleSyntaxError(f"Expected a pokemon name, got '{switch}' instead", self.locations[i + 1], self.lines)
+
+            commands.append({
+                'action': constants.SET_SWITCH,
+                'pokemon': switch,
+                'location': self.locations[i + 1]
+            })
+            return i + 3
+
+        # the statement is not closed before the next one is opened
+        for token in self.tokens[i + 1:]:
+            if token == constants.SWITCH_CLOSE_BRACKET:
+                raise PuzzleSyntaxError(f"'{self.tokens[i + 2]}' unexpected in set switch statement", self.locations[i + 2], self.lines)
+            if token == constants.SWITCH_OPEN_BRACKET:
+                break
+        raise PuzzleSyntaxError(f"Missing closing parenthesis '{constants.SWITCH_CLOSE_BRACKET}' for set switch statement", self.locations[i + 2], self.lines)
+
     def validate_commands(self, commands: list[dict], repeating = False):
         if commands[0]['action'] != constants.SET_SWITCH and not repeating:
             raise PuzzleError("First command of each puzzle must be declaring a lead pokemon", self.locations[0], self.lines)
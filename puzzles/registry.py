@@ -0,0 +1,110 @@
+import random
+import os
+import logging
+
+from .load_puzzle import PUZZLE_DIR
+from .load_puzzle import variant_paths
+from .puzzle_parser import get_puzzle_commands
+from .puzzle_parser import PuzzleError
+from .puzzle_parser import PuzzleSyntaxError
+from .team_converter import export_to_packed
+
+logger = logging.getLogger(__name__)
+
+
+def compile_hints(text):
+    return text.splitlines()
+
+
+class _PuzzleRegistry:
+    """
+    Keeps every puzzle's packed teams, puzzle commands and hints in memory
+
+    A puzzle's team, puzzle and hints may each be a single file or a directory
+    of variants. Variants are compiled once and picked from memory, and a file
+    is only read again when it's modification time changes
+    """
+
+    compilers = {
+        "team": export_to_packed,
+        "puzzle": get_puzzle_commands,
+        "hints": compile_hints,
+    }
+
+    def __init__(self, puzzle_dir=PUZZLE_DIR):
+        self.puzzle_dir = puzzle_dir
+
+        # (name, kind) -> (mtime, [file paths]) for directories of variants
+        self.variants = dict()
+
+        # file path -> (mtime, compiled value)
+        self.compiled = dict()
+
+    def puzzle_names(self):
+        return sorted(
+            name for name in os.listdir(self.puzzle_dir)
+            if os.path.isdir(os.path.join(self.puzzle_dir, name)) and not name.startswith('.')
+        )
+
+    def preload(self):
+        """Compile every puzzle so that no files are read when a battle starts"""
+        for name in self.puzzle_names():
+            for kind in self.compilers:
+                path = os.path.join(self.puzzle_dir, name, kind)
+                if not os.path.exists(path):
+                    continue
+                try:
+                    for file_path in self.get_variant_paths(name, kind):
+                        self.get_compiled(kind, file_path)
+                except (PuzzleError, PuzzleSyntaxError, ValueError) as e:
+                    # a broken puzzle should not stop the others from loading
+                    # it will raise again if it is used
+                    logger.warning("Could not load the {} for {}: {}".format(kind, name, e))
+
+        logger.info("Loaded {} puzzle file(s) from {}".format(len(self.compiled), self.puzzle_dir))
+
+    def get_variant_paths(self, name, kind):
+        path = os.path.join(self.puzzle_dir, name, kind)
+        if os.path.isfile(path):
+            return [path]
+        if not os.path.isdir(path):
+            raise ValueError("Path must be file or dir: {}".format(name))
+
+        # adding or removing a variant changes the directory's mtime
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.variants.get((name, kind))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, sorted(variant_paths(path)))
+            self.variants[(name, kind)] = cached
+        return cached[1]
+
+    def get_compiled(self, kind, file_path):
+        mtime = os.stat(file_path).st_mtime_ns
+        cached = self.compiled.get(file_path)
+        if cached is None or cached[0] != mtime:
+            if cached is not None:
+                logger.info("Reloading {}".format(file_path))
+            with open(file_path, 'r') as f:
+                text = f.read()
+            cached = (mtime, self.compilers[kind](text))
+            self.compiled[file_path] = cached
+        return cached[1]
+
+    def get(self, name, kind):
+        if name is None:
+            return self.compilers[kind]('null')
+
+        file_path = random.choice(self.get_variant_paths(name, kind))
+        return self.get_compiled(kind, file_path)
+
+    def load_team(self, name):
+        return self.get(name, "team")
+
+    def load_puzzle(self, name):
+        return self.get(name, "puzzle")
+
+    def load_hints(self, name):
+        return self.get(name, "hints")
+
+
+PuzzleRegistry = _PuzzleRegistry()
@@ -100,3 +100,25 @@ def export_to_packed(export_string):
         team_dict.append(pkmn_dict)
 
     return json_to_packed(team_dict)
+
+
+def packed_to_dicts(packed_team):
+    """The inverse of `json_to_packed`, returning dictionaries in the same format as `single_pokemon_export_to_dict`"""
+    team_dict = list()
+    for packed_pkmn in filter(None, packed_team.split(']')):
+        fields = packed_pkmn.split('|')
+        evs = fields[6].split(',') if fields[6] else [''] * 6
+        extra = fields[11].split(',') if len(fields) > 11 else []
+        team_dict.append({
+            "name": normalize_name(fields[0]),
+            "species": normalize_name(fields[1]),
+            "level": fields[10] if len(fields) > 10 else "",
+            "tera_type": extra[5] if len(extra) > 5 else "",
+            "gender": fields[7] if len(fields) > 7 else "",
+            "item": fields[2],
+            "ability": fields[3],
+            "moves": [m for m in fields[4].split(',') if m],
+            "nature": fields[5],
+            "evs": dict(zip(("hp", "atk", "def", "spa", "spd", "spe"), evs)),
+        })
+    return team_dict
@@ -8,9 +8,10 @@ from copy import deepcopy
 import constants
 from config import ShowdownConfig, init_logging
 
-from puzzles import load_team, load_puzzle, load_hints
+from puzzles import PuzzleRegistry
 from showdown.run_battle import pokemon_battle
-from showdown.websocket_client import PSWebsocketClient
+from showdown.websocket_pool import PSWebsocketPool
+from showdown.engine.search_cache import SearchCache
 
 from data import all_move_json
 from data import pokedex
@@ -42,6 +43,69 @@ def check_dictionaries_are_unmodified(original_pokedex, original_move_json):
         logger.debug("Pokedex JSON unmodified!")
 
 
+async def run_puzzle_battle(ps_websocket_client):
+    team = PuzzleRegistry.load_team(ShowdownConfig.puzzle)
+    puzzle_commands = PuzzleRegistry.load_puzzle(ShowdownConfig.puzzle)
+    hints = PuzzleRegistry.load_hints(ShowdownConfig.puzzle)
+
+    if ShowdownConfig.bot_mode == constants.CHALLENGE_USER:
+        await ps_websocket_client.challenge_user(
+            ShowdownConfig.user_to_challenge,
+            ShowdownConfig.pokemon_mode,
+            team
+        )
+    elif ShowdownConfig.bot_mode == constants.ACCEPT_CHALLENGE:
+        await ps_websocket_client.accept_challenge(
+            ShowdownConfig.pokemon_mode,
+            team,
+            ShowdownConfig.room_name
+        )
+    elif ShowdownConfig.bot_mode == constants.SEARCH_LADDER:
+        await ps_websocket_client.search_for_match(ShowdownConfig.pokemon_mode, team)
+    else:
+        raise ValueError("Invalid Bot Mode: {}".format(ShowdownConfig.bot_mode))
+
+    return await pokemon_battle(ps_websocket_client, ShowdownConfig.pokemon_mode, puzzle_commands, hints)
+
+
+async def forfeit_open_battles(ps_websocket_client):
+    for battle_tag in [room for room in ps_websocket_client.rooms if room.startswith("battle-")]:
+        try:
+            await ps_websocket_client.forfeit_battle(battle_tag)
+        except Exception:
+            logger.error("Could not forfeit {}:\n{}".format(battle_tag, traceback.format_exc()))
+
+
+async def battle_worker(pool, record, original_pokedex, original_move_json):
+    # each worker runs battles on whichever connection in the pool is free
+    # until the requested number of battles have been started
+    while record["started"] < ShowdownConfig.run_count:
+        record["started"] += 1
+
+        if ShowdownConfig.log_to_file:
+            ShowdownConfig.log_handler.do_rollover(datetime.now().strftime("%Y-%m-%dT%H:%M:%S.log"))
+
+        connection = await pool.acquire()
+        try:
+            winner = await run_puzzle_battle(connection.client)
+        except Exception:
+            # one bad battle is given up on so that the other battles keep going
+            logger.error("Battle failed, forfeiting:\n{}".format(traceback.format_exc()))
+            await forfeit_open_battles(connection.client)
+            record["errors"] += 1
+        else:
+            if winner == connection.username:
+                record["wins"] += 1
+            else:
+                record["losses"] += 1
+        finally:
+            await pool.release(connection)
+
+        logger.info("W: {}\tL: {}\tErrors: {}".format(record["wins"], record["losses"], record["errors"]))
+        pool.log_utilization()
+        check_dictionaries_are_unmodified(original_pokedex, original_move_json)
+
+
 async def showdown():
     ShowdownConfig.configure()
     init_logging(
@@ -50,56 +114,36 @@ async def showdown():
     )
     apply_mods(ShowdownConfig.pokemon_mode)
 
+    # puzzles are validated against the moves and pokemon of the mod
+    PuzzleRegistry.preload()
+
+    if ShowdownConfig.search_cache_dir is not None:
+        SearchCache.open(ShowdownConfig.search_cache_dir, ShowdownConfig.search_cache_size)
+
     original_pokedex = deepcopy(pokedex)
     original_move_json = deepcopy(all_move_json)
 
-    ps_websocket_client = await PSWebsocketClient.create(
-        ShowdownConfig.username,
-        ShowdownConfig.password,
-        ShowdownConfig.websocket_uri
+    pool = await PSWebsocketPool.create(
+        ShowdownConfig.accounts,
+        ShowdownConfig.websocket_uri,
+        login_uri=ShowdownConfig.login_uri,
+        login_timeout=ShowdownConfig.login_timeout,
+        reconnect_attempts=ShowdownConfig.reconnect_attempts,
+        reconnect_max_delay=ShowdownConfig.reconnect_max_delay,
+        message_rate_limit=ShowdownConfig.message_rate_limit,
+        message_burst=ShowdownConfig.message_burst,
+        message_lines_per_frame=ShowdownConfig.message_lines_per_frame
     )
-    await ps_websocket_client.login()
-
-    battles_run = 0
-    wins = 0
-    losses = 0
-    while True:
-        if ShowdownConfig.log_to_file:
-            ShowdownConfig.log_handler.do_rollover(datetime.now().strftime("%Y-%m-%dT%H:%M:%S.log"))
-        
-        team = load_team(ShowdownConfig.puzzle)
-        puzzle_commands = load_puzzle(ShowdownConfig.puzzle)
-        hints = load_hints(ShowdownConfig.puzzle)
-
-        if ShowdownConfig.bot_mode == constants.CHALLENGE_USER:
-            await ps_websocket_client.challenge_user(
-                ShowdownConfig.user_to_challenge,
-                ShowdownConfig.pokemon_mode,
-                team
-            )
-        elif ShowdownConfig.bot_mode == constants.ACCEPT_CHALLENGE:
-            await ps_websocket_client.accept_challenge(
-                ShowdownConfig.pokemon_mode,
-                team,
-                ShowdownConfig.room_name
-            )
-        elif ShowdownConfig.bot_mode == constants.SEARCH_LADDER:
-            await ps_websocket_client.search_for_match(ShowdownConfig.pokemon_mode, team)
-        else:
-            raise ValueError("Invalid Bot Mode: {}".format(ShowdownConfig.bot_mode))
-
-        winner = await pokemon_battle(ps_websocket_client, ShowdownConfig.pokemon_mode, puzzle_commands, hints)
-        if winner == ShowdownConfig.username:
-            wins += 1
-        else:
-            losses += 1
+    await pool.login()
 
-        logger.info("W: {}\tL: {}".format(wins, losses))
-        check_dictionaries_are_unmodified(original_pokedex, original_move_json)
-
-        battles_run += 1
-        if battles_run >= ShowdownConfig.run_count:
-            break
+    record = {"started": 0, "wins": 0, "losses": 0, "errors": 0}
+    try:
+        await asyncio.gather(
+            *(battle_worker(pool, record, original_pokedex, original_move_json) for _ in range(len(pool)))
+        )
+    finally:
+        await pool.close()
+        SearchCache.close()
 
 
 if __name__ == "__main__":
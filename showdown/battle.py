@@ -26,6 +26,7 @@ from data.helpers import get_most_likely_item
 from data.helpers import get_most_likely_ability
 from data.helpers import get_most_likely_spread
 from data.helpers import get_all_possible_moves_for_random_battle
+from data.prefix_index import prefix_index
 
 from showdown.engine.objects import State
 from showdown.engine.objects import Side
@@ -122,15 +123,19 @@ class Battle(ABC):
         )
 
     def create_state(self):
-        user_active = TransposePokemon.from_state_pokemon_dict(self.user.active.to_dict())
+        """
+        The engine pokemon are kept between calls and only rebuilt after they change
+        Changes made to the battle's pokemon outside of `battle_modifier` must be followed by `invalidate_state`
+        """
+        user_active = self.user.active.to_transpose_pokemon()
         user_reserve = dict()
         for mon in self.user.reserve:
-            user_reserve[mon.name] = TransposePokemon.from_state_pokemon_dict(mon.to_dict())
+            user_reserve[mon.name] = mon.to_transpose_pokemon()
 
-        opponent_active = TransposePokemon.from_state_pokemon_dict(self.opponent.active.to_dict())
+        opponent_active = self.opponent.active.to_transpose_pokemon()
         opponent_reserve = dict()
         for mon in self.opponent.reserve:
-            opponent_reserve[mon.name] = TransposePokemon.from_state_pokemon_dict(mon.to_dict())
+            opponent_reserve[mon.name] = mon.to_transpose_pokemon()
 
         user = Side(user_active, user_reserve, copy(self.user.wish), copy(self.user.side_conditions), copy(self.user.future_sight))
         opponent = Side(opponent_active, opponent_reserve, copy(self.opponent.wish), copy(self.opponent.side_conditions), copy(self.opponent.future_sight))
@@ -138,6 +143,15 @@ class Battle(ABC):
         state = State(user, opponent, self.weather, self.field, self.trick_room)
         return state
 
+    def invalidate_state(self, reserve=True):
+        """Makes `create_state` rebuild the active pokemon, and the reserve pokemon if `reserve` is True"""
+        for side in (self.user, self.opponent):
+            if side.active is not None:
+                side.active.transpose_pokemon = None
+            if reserve:
+                for pkmn in filter(lambda p: isinstance(p, Pokemon), side.reserve):
+                    pkmn.transpose_pokemon = None
+
     def get_all_options(self):
         force_switch = self.force_switch or self.user.active.hp <= 0
         wait = self.wait or self.opponent.active.hp <= 0
@@ -389,7 +403,10 @@ class Pokemon:
             self.base_stats = pokedex[self.name][constants.BASESTATS]
         except KeyError:
             logger.info("Could not pokedex entry for {}".format(self.name))
-            self.name = [k for k in pokedex if self.name.startswith(k)][0]
+            name = prefix_index(pokedex).first_prefix_of(self.name)
+            if name is None:
+                raise KeyError("No pokedex entry is similar to {}".format(self.name))
+            self.name = name
             logger.info("Using {} instead".format(self.name))
             self.base_stats = pokedex[self.name][constants.BASESTATS]
 
@@ -424,6 +441,12 @@ class Pokemon:
         self.can_have_life_orb = True
         self.can_have_heavydutyboots = True
 
+        # the engine's version of this pokemon, built by `to_transpose_pokemon`
+        self.transpose_pokemon = None
+
+        # the sets from `TeamDatasets` this pokemon can still have, narrowed as it's moves and speed are revealed
+        self.set_candidates = None
+
     def forme_change(self, new_pkmn_name):
         hp_percent = float(self.hp) / self.max_hp
         moves = self.moves
@@ -477,11 +500,13 @@ class Pokemon:
         self.evs = evs
         self.max_hp = self.stats.pop(constants.HITPOINTS)
         self.hp = round(self.max_hp * hp_percent)
+        self.transpose_pokemon = None
 
     def add_move(self, move_name: str):
         try:
             new_move = Move(move_name)
             self.moves.append(new_move)
+            self.transpose_pokemon = None
             return new_move
         except KeyError:
             logger.warning("{} is not a known move".format(move_name))
@@ -499,18 +524,21 @@ class Pokemon:
         additional_moves = get_all_likely_moves(self.name, [m.name for m in self.moves])
         for m in additional_moves:
             self.moves.append(Move(m))
+        self.transpose_pokemon = None
 
     def set_most_likely_ability_unless_revealed(self):
         if self.ability is not None:
             return
         ability = get_most_likely_ability(self.name)
         self.ability = ability
+        self.transpose_pokemon = None
 
     def set_most_likely_item_unless_revealed(self):
         if self.item != constants.UNKNOWN_ITEM:
             return
         item = get_most_likely_item(self.name)
         self.item = item
+        self.transpose_pokemon = None
 
     def set_most_likely_spread(self):
         nature, evs, _ = get_most_likely_spread(self.name)
@@ -643,6 +671,12 @@ class Pokemon:
             constants.MOVES: [m.to_dict() for m in self.moves]
         }
 
+    def to_transpose_pokemon(self):
+        """Returns a copy of the engine's version of this pokemon, which is only rebuilt after `transpose_pokemon` is cleared"""
+        if self.transpose_pokemon is None:
+            self.transpose_pokemon = TransposePokemon.from_state_pokemon_dict(self.to_dict())
+        return self.transpose_pokemon.copy()
+
     @classmethod
     def get_dummy(cls):
         p = Pokemon('pikachu', 100)
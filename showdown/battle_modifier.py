@@ -16,6 +16,7 @@ from showdown.engine.helpers import calculate_stats
 from showdown.engine.find_state_instructions import get_effective_speed
 from showdown.engine.damage_calculator import calculate_damage
 from showdown.engine.objects import boost_multiplier_lookup
+from showdown.protocol import parse_frame
 
 
 logger = logging.getLogger(__name__)
@@ -737,64 +738,74 @@ def noinit(battle, split_msg):
         logger.debug("Renamed battle to {}".format(battle.battle_tag))
 
 
-def update_battle(battle, msg):
-    msg_lines = msg.split('\n')
-
+battle_modifiers_lookup = {
+    'request': request,
+    'switch': switch_or_drag,
+    'faint': faint,
+    'drag': switch_or_drag,
+    '-heal': heal_or_damage,
+    '-damage': heal_or_damage,
+    'move': move,
+    '-boost': boost,
+    '-unboost': unboost,
+    '-status': status,
+    '-activate': activate,
+    '-prepare': prepare,
+    '-start': start_volatile_status,
+    '-end': end_volatile_status,
+    '-curestatus': curestatus,
+    '-cureteam': cureteam,
+    '-weather': weather,
+    '-fieldstart': fieldstart,
+    '-fieldend': fieldend,
+    '-sidestart': sidestart,
+    '-sideend': sideend,
+    '-swapsideconditions': swapsideconditions,
+    '-item': set_item,
+    '-enditem': remove_item,
+    '-immune': set_ability,
+    '-ability': set_opponent_ability_from_ability_tag,
+    'detailschange': form_change,
+    'replace': form_change,
+    '-formechange': form_change,
+    '-transform': transform,
+    '-mega': mega,
+    '-terastallize': terastallize,
+    '-zpower': zpower,
+    '-clearnegativeboost': clearnegativeboost,
+    '-clearallboost': clearallboost,
+    '-singleturn': singleturn,
+    'upkeep': upkeep,
+    'inactive': inactive,
+    'inactiveoff': inactiveoff,
+    'turn': turn,
+    'noinit': noinit,
+}
+
+
+# the other modifiers only change the active pokemon, so the engine's reserve pokemon are kept
+modifiers_that_change_reserves = {
+    'switch',
+    'drag',
+    '-heal',
+    '-damage',
+    '-curestatus',
+    '-cureteam',
+    'detailschange',
+    'replace',
+    '-formechange',
+}
+
+
+def update_battle_from_events(battle, events):
     action = None
-    for i, line in enumerate(msg_lines):
-        split_msg = line.split('|')
-        if len(split_msg) < 2:
-            continue
-
-        action = split_msg[1].strip()
-
-        battle_modifiers_lookup = {
-            'request': request,
-            'switch': switch_or_drag,
-            'faint': faint,
-            'drag': switch_or_drag,
-            '-heal': heal_or_damage,
-            '-damage': heal_or_damage,
-            'move': move,
-            '-boost': boost,
-            '-unboost': unboost,
-            '-status': status,
-            '-activate': activate,
-            '-prepare': prepare,
-            '-start': start_volatile_status,
-            '-end': end_volatile_status,
-            '-curestatus': curestatus,
-            '-cureteam': cureteam,
-            '-weather': weather,
-            '-fieldstart': fieldstart,
-            '-fieldend': fieldend,
-            '-sidestart': sidestart,
-            '-sideend': sideend,
-            '-swapsideconditions': swapsideconditions,
-            '-item': set_item,
-            '-enditem': remove_item,
-            '-immune': set_ability,
-            '-ability': set_opponent_ability_from_ability_tag,
-            'detailschange': form_change,
-            'replace': form_change,
-            '-formechange': form_change,
-            '-transform': transform,
-            '-mega': mega,
-            '-terastallize': terastallize,
-            '-zpower': zpower,
-            '-clearnegativeboost': clearnegativeboost,
-            '-clearallboost': clearallboost,
-            '-singleturn': singleturn,
-            'upkeep': upkeep,
-            'inactive': inactive,
-            'inactiveoff': inactiveoff,
-            'turn': turn,
-            'noinit': noinit,
-        }
+    for event in events:
+        action = event.action
 
         function_to_call = battle_modifiers_lookup.get(action)
         if function_to_call is not None:
-            function_to_call(battle, split_msg)
+            function_to_call(battle, event.split_msg)
+            battle.invalidate_state(reserve=action in modifiers_that_change_reserves)
 
         if action == 'turn':
             return True
@@ -806,5 +817,12 @@ def update_battle(battle, msg):
         return battle.force_switch
 
 
+def update_battle(battle, msg):
+    """`msg` is either a ProtocolFrame or the raw text of a websocket message"""
+    if isinstance(msg, str):
+        msg = parse_frame(msg)
+    return update_battle_from_events(battle, msg.events)
+
+
 async def async_update_battle(battle, msg):
     return update_battle(battle, msg)
@@ -0,0 +1,328 @@
+"""
+Times the parts of the engine used by the search on a fixed corpus of positions
+
+The corpus is recorded by playing seeded battles with each puzzle's team following it's
+commands against a challenger picking random options, and saving the state at every decision.
+States are saved with `codec.encode`, so the corpus has to be recorded again when the data files change.
+Results are saved as JSON so that they can be compared against a baseline from an earlier run
+"""
+import base64
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import logging
+
+import constants
+from config import ShowdownConfig
+from .objects import State
+from .objects import StateMutator
+from .codec import encode
+from .codec import decode
+from .codec import string_table
+from .evaluate import evaluate
+from .damage_calculator import _calculate_damage
+from .find_state_instructions import get_all_state_instructions
+from .select_best_move import get_payoff_matrix
+from .switch_out_moves import SwitchCache
+
+logger = logging.getLogger(__name__)
+
+CORPUS_FORMAT_VERSION = 2
+
+
+def record_battle_positions(commands, bot_team, challenger_team, seed, max_turns=20):
+    """Play one battle and return the state at each of the bot's decisions"""
+    from showdown.puzzle_runner.verifier import CommandCursor
+    from showdown.puzzle_runner.verifier import PuzzleScriptError
+    from showdown.puzzle_runner.verifier import create_side
+    from showdown.puzzle_runner.verifier import side_is_defeated
+
+    rng = random.Random(seed)
+    cursor = CommandCursor(commands)
+    mutator = StateMutator(State(
+        create_side(bot_team, cursor.lead() or bot_team[0][constants.ID]),
+        create_side(challenger_team, rng.choice(challenger_team)[constants.ID]),
+        None,
+        None,
+        False
+    ))
+    state = mutator.state
+
+    positions = []
+    for _ in range(max_turns):
+        if side_is_defeated(state.user) or side_is_defeated(state.opponent):
+            break
+
+        positions.append(state.to_dict())
+        if state.opponent.active.hp <= 0 and state.user.active.hp > 0:
+            bot_choice = constants.DO_NOTHING_MOVE
+        else:
+            try:
+                bot_choice, cursor = cursor.decide(state)
+            except PuzzleScriptError:
+                break
+
+        challenger_choice = rng.choice(state.get_all_options()[1])
+        outcomes = [i for i in get_all_state_instructions(mutator, bot_choice, challenger_choice) if i.percentage > 0]
+        mutator.apply(rng.choices(outcomes, weights=[i.percentage for i in outcomes])[0].instructions)
+
+    return positions
+
+
+def record_corpus(puzzle_names, default_challenger_team, pokemon_mode, battles=3, seed=0, max_turns=20, puzzle_dir=None, extra_challenger_teams=None):
+    """
+    Records positions from every puzzle
+    Each puzzle is played against it's `challenger` team, or `default_challenger_team` if it does not have one,
+    and then against each of `extra_challenger_teams`, a dict of names to teams
+    """
+    from puzzles.load_puzzle import PUZZLE_DIR
+    from puzzles.puzzle_parser import get_puzzle_commands
+    from showdown.puzzle_runner.verifier import puzzle_file_paths
+    from showdown.puzzle_runner.verifier import read_file
+    from showdown.puzzle_runner.verifier import team_from_export
+
+    puzzle_dir = puzzle_dir or PUZZLE_DIR
+    positions = []
+    seen = set()
+    for name in puzzle_names:
+        try:
+            commands = get_puzzle_commands(read_file(puzzle_file_paths(name, "puzzle", puzzle_dir)[0]))
+        except (IndexError, ValueError, SyntaxError) as e:
+            logger.warning("Skipping {}: {}".format(name, e))
+            continue
+
+        challenger_paths = puzzle_file_paths(name, "challenger", puzzle_dir)
+        challenger_team = team_from_export(read_file(challenger_paths[0])) if challenger_paths else default_challenger_team
+        # the puzzle's own challenger keeps the seeds and sources it was recorded with before there were extra teams
+        challengers = [("", challenger_team)] + [(" vs. {}".format(n), t) for n, t in (extra_challenger_teams or {}).items()]
+        for team_path in puzzle_file_paths(name, "team", puzzle_dir):
+            bot_team = team_from_export(read_file(team_path))
+            for challenger_name, team in challengers:
+                for i in range(battles):
+                    battle_seed = "{}-{}-{}-{}{}".format(seed, name, os.path.basename(team_path), i, challenger_name)
+                    for turn, position in enumerate(record_battle_positions(commands, bot_team, team, battle_seed, max_turns)):
+                        key = json.dumps(position, sort_keys=True)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        positions.append({
+                            "source": "{}{} battle {} turn {}".format(name, challenger_name, i, turn),
+                            "state": base64.b64encode(encode(State.from_dict(position))).decode()
+                        })
+
+    return {
+        "version": CORPUS_FORMAT_VERSION,
+        "pokemon_mode": pokemon_mode,
+        "positions": positions,
+    }
+
+
+def load_corpus(path):
+    with open(path, 'r') as f:
+        corpus = json.load(f)
+    if corpus.get("version") != CORPUS_FORMAT_VERSION:
+        raise ValueError("{} was recorded in an older format, record it again".format(path))
+    try:
+        for p in corpus["positions"]:
+            position_state(p)
+    except ValueError as e:
+        raise ValueError("{} cannot be read, record it again: {}".format(path, e))
+    return corpus
+
+
+def position_state(position):
+    return decode(base64.b64decode(position["state"]))
+
+
+def best_time(setup, repeat):
+    """
+    `setup` prepares a benchmark and returns a function that runs it and returns the number of operations done
+    Returns the time of the fastest of `repeat` runs, and the number of operations
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        run = setup()
+        start = time.perf_counter()
+        ops = run()
+        best = min(best, time.perf_counter() - start)
+    return best, ops
+
+
+def states(corpus):
+    return [position_state(p) for p in corpus["positions"]]
+
+
+def spread(positions, limit):
+    """Picks `limit` positions spread evenly over the corpus, so that every puzzle is represented"""
+    if limit is None or limit >= len(positions):
+        return positions
+    step = len(positions) / limit
+    return [positions[int(i * step)] for i in range(limit)]
+
+
+def bench_payoff_matrix(corpus, depth, limit=None):
+    positions = spread(corpus["positions"], limit)
+
+    def setup():
+        # every run searches for it's own switches instead of re-using the ones from earlier runs and depths
+        SwitchCache.clear()
+        mutators = [StateMutator(position_state(p)) for p in positions]
+
+        def run():
+            for mutator in mutators:
+                user_options, opponent_options = mutator.state.get_all_options()
+                get_payoff_matrix(mutator, user_options, opponent_options, depth=depth, prune=True)
+            return len(mutators)
+        return run
+    return setup
+
+
+def bench_state_instructions(corpus):
+    def setup():
+        cells = []
+        for state in states(corpus):
+            mutator = StateMutator(state)
+            user_options, opponent_options = state.get_all_options()
+            cells.extend((mutator, u, o) for u in user_options for o in opponent_options)
+
+        def run():
+            for mutator, user_option, opponent_option in cells:
+                get_all_state_instructions(mutator, user_option, opponent_option)
+            return len(cells)
+        return run
+    return setup
+
+
+def bench_evaluate(corpus):
+    def setup():
+        all_states = states(corpus)
+
+        def run():
+            for state in all_states:
+                evaluate(state)
+            return len(all_states)
+        return run
+    return setup
+
+
+def bench_calculate_damage(corpus):
+    def setup():
+        attacks = []
+        for state in states(corpus):
+            for attacker, defender in ((state.user.active, state.opponent.active), (state.opponent.active, state.user.active)):
+                attacks.extend((attacker, defender, m[constants.ID]) for m in attacker.moves)
+
+        def run():
+            for attacker, defender, move in attacks:
+                _calculate_damage(attacker, defender, move)
+            return len(attacks)
+        return run
+    return setup
+
+
+def bench_apply_reverse(corpus):
+    def setup():
+        transpositions = []
+        for state in states(corpus):
+            mutator = StateMutator(state)
+            user_options, opponent_options = state.get_all_options()
+            for u in user_options:
+                for o in opponent_options:
+                    transpositions.extend((mutator, i.instructions) for i in get_all_state_instructions(mutator, u, o))
+
+        def run():
+            for mutator, instructions in transpositions:
+                mutator.apply(instructions)
+                mutator.reverse(instructions)
+            return len(transpositions)
+        return run
+    return setup
+
+
+def bench_codec(corpus):
+    def setup():
+        all_states = states(corpus)
+        string_table()
+
+        def run():
+            for state in all_states:
+                decode(encode(state))
+            return len(all_states)
+        return run
+    return setup
+
+
+def run_benchmarks(corpus, max_depth=4, deep_positions=8, repeat=3):
+    """
+    :param max_depth: the deepest search to time with `get_payoff_matrix`
+    :param deep_positions: depth 3 searches only use this many positions from the corpus,
+                           and each depth after that uses a quarter as many
+    :param repeat: each benchmark is run this many times and the fastest run is kept
+                   searches deeper than 2 are only run once
+    """
+    benchmarks = {
+        "get_all_state_instructions": bench_state_instructions(corpus),
+        "evaluate": bench_evaluate(corpus),
+        "_calculate_damage": bench_calculate_damage(corpus),
+        "StateMutator.apply/reverse": bench_apply_reverse(corpus),
+        "codec.encode/decode": bench_codec(corpus),
+    }
+    repeats = {name: repeat for name in benchmarks}
+    for depth in range(1, max_depth + 1):
+        name = "get_payoff_matrix depth {}".format(depth)
+        if depth > 2:
+            benchmarks[name] = bench_payoff_matrix(corpus, depth, max(1, deep_positions // 4 ** (depth - 3)))
+            repeats[name] = 1
+        else:
+            benchmarks[name] = bench_payoff_matrix(corpus, depth)
+            repeats[name] = repeat
+
+    results = dict()
+    for name, setup in benchmarks.items():
+        seconds, ops = best_time(setup, repeats[name])
+        results[name] = {
+            "ops": ops,
+            "seconds": seconds,
+            "per_op_us": 1000000 * seconds / ops if ops else 0,
+        }
+        logger.info("{}: {} ops in {:.3f}s ({:.1f}us/op)".format(name, ops, seconds, results[name]["per_op_us"]))
+
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "positions": len(corpus["positions"]),
+            "pokemon_mode": corpus["pokemon_mode"],
+            "damage_calc_type": ShowdownConfig.damage_calc_type,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compares the time per operation of each benchmark against the baseline
+    A benchmark has regressed when it is more than `threshold` slower
+    """
+    comparison = dict()
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base["per_op_us"] or base["ops"] != result["ops"]:
+            # the benchmark is new, or was run on a different corpus
+            comparison[name] = {"baseline_us": None, "current_us": result["per_op_us"], "change": None, "regressed": False}
+            continue
+
+        change = result["per_op_us"] / base["per_op_us"] - 1
+        comparison[name] = {
+            "baseline_us": base["per_op_us"],
+            "current_us": result["per_op_us"],
+            "change": change,
+            "regressed": change > threshold,
+        }
+    return comparison
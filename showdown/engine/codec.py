@@ -0,0 +1,443 @@
+"""
+A compact binary encoding of `State`, for sending states between processes and storing them
+
+Every string (pokemon, moves, abilities, items, statuses, etc.) is written as a 2 byte id
+from a table built from the data files. Strings that are not in the table are written once
+at the start of the message. The table's checksum is part of the header so that a state
+is never decoded with a different table than it was encoded with
+
+    encoded = encode(state)
+    state = decode(encoded)
+"""
+import json
+import os
+import struct
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+
+import constants
+from data.team_datasets import load_team_datasets
+from .helpers import natures
+from .helpers import normalize_name
+from .objects import State
+from .objects import Side
+from .objects import Pokemon
+
+CODEC_VERSION = 1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADER = struct.Struct('<BIH')
+POKEMON_PREFIX = struct.Struct('<BHBHHHH')
+INT_NUMBERS = struct.Struct('<7i7bb6HB')
+FLOAT_NUMBERS = struct.Struct('<BI7d7bb6HB')
+SIDE_PREFIX = struct.Struct('<B')
+STATE_PREFIX = struct.Struct('<HH?')
+
+# pokemon flags
+# when a pokemon has any float stats or pp, all of them are written as doubles
+# along with which ones were floats
+INT_NUMBERS_FLAG = 1
+EVS_TUPLE_FLAG = 2
+TERASTALLIZED_FLAG = 4
+TYPES_TUPLE_FLAG = 8
+
+# side flags
+WISH_LIST_FLAG = 1
+FUTURE_SIGHT_LIST_FLAG = 2
+PLAIN_DICT_FLAG = 4
+INT_CONDITIONS_FLAG = 8
+
+NEUTRAL_NATURES = ('hardy', 'docile', 'serious', 'bashful', 'quirky')
+
+# tags for values that can be of more than one type
+NONE_TAG = 0
+BOOL_TAG = 1
+INT_TAG = 2
+FLOAT_TAG = 3
+STRING_TAG = 4
+
+_table = None
+
+
+@lru_cache(maxsize=None)
+def _struct(fmt):
+    return struct.Struct('<' + fmt)
+
+
+@lru_cache(maxsize=None)
+def _pokemon_format(ints, n_types, n_volatile_status, n_moves):
+    n = 'i' if ints else 'd'
+    return 'BHBHHHH{}7{}7bb6HB{}B{}B{}'.format(
+        '' if ints else 'BI',
+        n,
+        'H' * n_types,
+        'H' * n_volatile_status,
+        ('H?' + n) * n_moves
+    )
+
+
+class _StringTable:
+    def __init__(self, strings):
+        # id 0 is None
+        self.strings = [None] + strings
+        self.ids = {s: i for i, s in enumerate(self.strings)}
+        self.checksum = zlib.crc32('\0'.join(strings).encode())
+
+
+def string_table():
+    """
+    Built from the data files on disk rather than the loaded data, which changes
+    with the mods that are applied, so that every process builds the same table
+    """
+    global _table
+    if _table is None:
+        with open(os.path.join(ROOT, "data", "pokedex.json"), 'r') as f:
+            pokedex = json.load(f)
+        with open(os.path.join(ROOT, "data", "moves.json"), 'r') as f:
+            moves = json.load(f)
+        with open(os.path.join(ROOT, "data", "random_battle_sets.json"), 'r') as f:
+            random_battle_sets = json.load(f)
+        team_datasets = load_team_datasets()
+
+        strings = set(pokedex) | set(moves) | set(natures) | set(NEUTRAL_NATURES)
+        for pkmn in pokedex.values():
+            strings.update(normalize_name(a) for a in pkmn.get(constants.ABILITIES, {}).values())
+            strings.update(pkmn.get(constants.TYPES, []))
+
+        # there is no list of items, so they are taken from the sets
+        for pkmn in random_battle_sets.values():
+            strings.update(item for item, _ in pkmn.get(constants.ITEMS, []))
+        for sets in team_datasets.get("pokemon", {}).values():
+            strings.update(s.split('|')[2] for s in sets)
+        strings.update(v for v in vars(constants).values() if isinstance(v, str))
+        _table = _StringTable(sorted(strings))
+    return _table
+
+
+class _Encoder:
+    __slots__ = ('ids', 'first_extra_id', 'extras', 'fmt', 'values')
+
+    def __init__(self, table):
+        self.ids = table.ids
+        self.first_extra_id = len(table.strings)
+        self.extras = []
+        self.fmt = ['<']
+        self.values = []
+
+    def string_id(self, s):
+        i = self.ids.get(s)
+        if i is None:
+            if not isinstance(s, str):
+                raise TypeError("Cannot encode {!r} as a string".format(s))
+            if not self.extras:
+                # the table's ids are shared by every encoder
+                self.ids = dict(self.ids)
+            i = self.first_extra_id + len(self.extras)
+            self.ids[s] = i
+            self.extras.append(s)
+        return i
+
+    def tagged(self, value):
+        if value is None:
+            self.fmt.append('B')
+            self.values.append(NONE_TAG)
+        elif value is True or value is False:
+            self.fmt.append('B?')
+            self.values += (BOOL_TAG, value)
+        elif isinstance(value, int):
+            self.fmt.append('Bq')
+            self.values += (INT_TAG, value)
+        elif isinstance(value, float):
+            self.fmt.append('Bd')
+            self.values += (FLOAT_TAG, value)
+        else:
+            self.fmt.append('BH')
+            self.values += (STRING_TAG, self.string_id(value))
+
+    def string_ids(self, strings):
+        ids = self.ids
+        try:
+            return [ids[s] for s in strings]
+        except KeyError:
+            return [self.string_id(s) for s in strings]
+
+    def pokemon(self, pkmn):
+        moves = pkmn.moves
+        numbers = (pkmn.hp, pkmn.maxhp, pkmn.attack, pkmn.defense, pkmn.special_attack, pkmn.special_defense, pkmn.speed)
+        pp = [m[constants.CURRENT_PP] for m in moves]
+        ints = float not in list(map(type, numbers)) and float not in list(map(type, pp))
+        if any(len(m) != 3 for m in moves):
+            raise ValueError("Cannot encode the moves {}".format(moves))
+
+        types = pkmn.types
+        volatile_status = sorted(pkmn.volatile_status)
+        names = self.string_ids([
+            pkmn.id,
+            pkmn.nature,
+            pkmn.ability,
+            pkmn.item,
+            pkmn.status,
+            *types,
+            *volatile_status,
+            *[m[constants.ID] for m in moves]
+        ])
+        flags = (
+            (INT_NUMBERS_FLAG if ints else 0) |
+            (EVS_TUPLE_FLAG if isinstance(pkmn.evs, tuple) else 0) |
+            (TERASTALLIZED_FLAG if pkmn.terastallized else 0) |
+            (TYPES_TUPLE_FLAG if isinstance(types, tuple) else 0)
+        )
+
+        self.fmt.append(_pokemon_format(ints, len(types), len(volatile_status), len(moves)))
+        values = self.values
+        values += (flags, names[0], pkmn.level, *names[1:5])
+        if not ints:
+            values += (
+                sum(1 << i for i, number in enumerate(numbers) if type(number) is float),
+                sum(1 << i for i, p in enumerate(pp) if type(p) is float),
+            )
+        values += numbers
+        values += (
+            pkmn.attack_boost,
+            pkmn.defense_boost,
+            pkmn.special_attack_boost,
+            pkmn.special_defense_boost,
+            pkmn.speed_boost,
+            pkmn.accuracy_boost,
+            pkmn.evasion_boost,
+            pkmn.burn_multiplier,
+        )
+        values += pkmn.evs
+        n_types = len(types)
+        values.append(n_types)
+        values += names[5:5 + n_types]
+        values.append(len(volatile_status))
+        values += names[5 + n_types:5 + n_types + len(volatile_status)]
+        values.append(len(moves))
+        for move_id, m, p in zip(names[5 + n_types + len(volatile_status):], moves, pp):
+            values += (move_id, m[constants.DISABLED], p)
+
+    def side(self, side):
+        side_conditions = side.side_conditions
+        int_conditions = int in set(map(type, side_conditions.values())) and len(set(map(type, side_conditions.values()))) == 1
+        flags = (
+            (WISH_LIST_FLAG if isinstance(side.wish, list) else 0) |
+            (FUTURE_SIGHT_LIST_FLAG if isinstance(side.future_sight, list) else 0) |
+            (PLAIN_DICT_FLAG if not isinstance(side_conditions, defaultdict) else 0) |
+            (INT_CONDITIONS_FLAG if int_conditions else 0)
+        )
+        self.fmt.append('B')
+        self.values.append(flags)
+        for value in side.wish:
+            self.tagged(value)
+        for value in side.future_sight:
+            self.tagged(value)
+
+        self.fmt.append('B')
+        self.values.append(len(side_conditions))
+        if int_conditions:
+            # side conditions are almost always counters, so they are written without tags
+            self.fmt.append('Hi' * len(side_conditions))
+            self.values += [v for pair in zip(self.string_ids(side_conditions), side_conditions.values()) for v in pair]
+        else:
+            for condition, value in side_conditions.items():
+                self.fmt.append('H')
+                self.values.append(self.string_id(condition))
+                self.tagged(value)
+
+        self.fmt.append('B')
+        self.values.append(len(side.reserve) + 1)
+        self.pokemon(side.active)
+        for name, pkmn in side.reserve.items():
+            if name != pkmn.id:
+                raise ValueError("Reserve pokemon must be keyed by their id, got {} for {}".format(name, pkmn.id))
+            self.pokemon(pkmn)
+
+    def state(self, state):
+        self.fmt.append('HH?')
+        self.values += (self.string_id(state.weather), self.string_id(state.field), state.trick_room)
+        self.side(state.user)
+        self.side(state.opponent)
+
+
+def encode(state):
+    table = string_table()
+    encoder = _Encoder(table)
+    encoder.state(state)
+    body = struct.pack(''.join(encoder.fmt), *encoder.values)
+
+    header = [HEADER.pack(CODEC_VERSION, table.checksum, len(encoder.extras))]
+    for s in encoder.extras:
+        b = s.encode()
+        header.append(struct.pack('<H', len(b)) + b)
+    return b''.join(header) + body
+
+
+class _Decoder:
+    __slots__ = ('data', 'offset', 'strings')
+
+    def __init__(self, data, strings):
+        self.data = data
+        self.offset = 0
+        self.strings = strings
+
+    def unpack(self, s):
+        values = s.unpack_from(self.data, self.offset)
+        self.offset += s.size
+        return values
+
+    def unpack_format(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def tagged(self):
+        tag = self.data[self.offset]
+        self.offset += 1
+        if tag == NONE_TAG:
+            return None
+        elif tag == BOOL_TAG:
+            return self.unpack_format('<?')[0]
+        elif tag == INT_TAG:
+            return self.unpack_format('<q')[0]
+        elif tag == FLOAT_TAG:
+            return self.unpack_format('<d')[0]
+        elif tag == STRING_TAG:
+            return self.strings[self.unpack_format('<H')[0]]
+        raise ValueError("Unknown tag {}".format(tag))
+
+    def pokemon(self):
+        strings = self.strings
+        data = self.data
+        flags, identifier, level, nature, ability, item, status = POKEMON_PREFIX.unpack_from(data, self.offset)
+        self.offset += POKEMON_PREFIX.size
+
+        ints = flags & INT_NUMBERS_FLAG
+        if ints:
+            numbers = INT_NUMBERS.unpack_from(data, self.offset)
+            self.offset += INT_NUMBERS.size
+            float_numbers = float_pp = 0
+        else:
+            float_numbers, float_pp, *numbers = FLOAT_NUMBERS.unpack_from(data, self.offset)
+            self.offset += FLOAT_NUMBERS.size
+            numbers[:7] = [n if float_numbers & (1 << i) else int(n) for i, n in enumerate(numbers[:7])]
+
+        # the pokemon is filled in directly because `Pokemon.__init__` works out the burn multiplier again
+        pkmn = Pokemon.__new__(Pokemon)
+        pkmn.id = strings[identifier]
+        pkmn.level = level
+        pkmn.nature = strings[nature]
+        pkmn.ability = strings[ability]
+        pkmn.item = strings[item]
+        pkmn.status = strings[status]
+        pkmn.terastallized = bool(flags & TERASTALLIZED_FLAG)
+        (
+            pkmn.hp,
+            pkmn.maxhp,
+            pkmn.attack,
+            pkmn.defense,
+            pkmn.special_attack,
+            pkmn.special_defense,
+            pkmn.speed,
+            pkmn.attack_boost,
+            pkmn.defense_boost,
+            pkmn.special_attack_boost,
+            pkmn.special_defense_boost,
+            pkmn.speed_boost,
+            pkmn.accuracy_boost,
+            pkmn.evasion_boost,
+            pkmn.burn_multiplier,
+        ) = numbers[:15]
+        pkmn.boosted_stats = None
+        pkmn.effective_speed = None
+        evs = numbers[15:21]
+        pkmn.evs = tuple(evs) if flags & EVS_TUPLE_FLAG else list(evs)
+
+        offset = self.offset
+        n_types = numbers[21]
+        types = [strings[i] for i in _struct('H' * n_types).unpack_from(data, offset)]
+        pkmn.types = tuple(types) if flags & TYPES_TUPLE_FLAG else types
+        offset += 2 * n_types
+
+        n_volatile_status = data[offset]
+        offset += 1
+        pkmn.volatile_status = {strings[i] for i in _struct('H' * n_volatile_status).unpack_from(data, offset)}
+        offset += 2 * n_volatile_status
+
+        n_moves = data[offset]
+        offset += 1
+        move_struct = _struct(('H?i' if ints else 'H?d') * n_moves)
+        move_values = move_struct.unpack_from(data, offset)
+        self.offset = offset + move_struct.size
+        pkmn.moves = [
+            {
+                constants.ID: strings[move_values[i]],
+                constants.DISABLED: move_values[i + 1],
+                constants.CURRENT_PP: move_values[i + 2] if ints or float_pp & (1 << (i // 3)) else int(move_values[i + 2]),
+            }
+            for i in range(0, len(move_values), 3)
+        ]
+        return pkmn
+
+    def side(self):
+        flags, = self.unpack(SIDE_PREFIX)
+        wish = (self.tagged(), self.tagged())
+        future_sight = (self.tagged(), self.tagged())
+
+        side_conditions = dict() if flags & PLAIN_DICT_FLAG else defaultdict(int)
+        n_conditions = self.data[self.offset]
+        self.offset += 1
+        if flags & INT_CONDITIONS_FLAG:
+            conditions = _struct('Hi' * n_conditions).unpack_from(self.data, self.offset)
+            self.offset += 6 * n_conditions
+            side_conditions.update(zip([self.strings[i] for i in conditions[::2]], conditions[1::2]))
+        else:
+            for _ in range(n_conditions):
+                condition = self.strings[self.unpack_format('<H')[0]]
+                side_conditions[condition] = self.tagged()
+
+        n_pokemon = self.data[self.offset]
+        self.offset += 1
+        active = self.pokemon()
+        reserve = dict()
+        for _ in range(n_pokemon - 1):
+            pkmn = self.pokemon()
+            reserve[pkmn.id] = pkmn
+
+        return Side(
+            active,
+            reserve,
+            list(wish) if flags & WISH_LIST_FLAG else wish,
+            side_conditions,
+            list(future_sight) if flags & FUTURE_SIGHT_LIST_FLAG else future_sight
+        )
+
+    def state(self):
+        weather, field, trick_room = self.unpack(STATE_PREFIX)
+        user = self.side()
+        opponent = self.side()
+        return State(user, opponent, self.strings[weather], self.strings[field], trick_room)
+
+
+def decode(data):
+    table = string_table()
+    version, checksum, n_extras = HEADER.unpack_from(data, 0)
+    if version != CODEC_VERSION:
+        raise ValueError("Cannot decode a state encoded with version {} of the codec".format(version))
+    if checksum != table.checksum:
+        raise ValueError("The state was encoded with different data files")
+
+    offset = HEADER.size
+    strings = table.strings
+    if n_extras:
+        strings = list(strings)
+        for _ in range(n_extras):
+            length, = struct.unpack_from('<H', data, offset)
+            offset += 2
+            strings.append(data[offset:offset + length].decode())
+            offset += length
+
+    decoder = _Decoder(memoryview(data)[offset:], strings)
+    return decoder.state()
@@ -100,8 +100,9 @@ def _calculate_damage(attacker, defender, move, conditions=None, calc_type='aver
     if conditions is None:
         conditions = {}
 
-    attacking_stats = attacker.calculate_boosted_stats()
-    defending_stats = defender.calculate_boosted_stats()
+    # the boosted stats are cached on the pokemon, so they are copied before being changed below
+    attacking_stats = dict(attacker.calculate_boosted_stats())
+    defending_stats = dict(defender.calculate_boosted_stats())
 
     if attacker.ability == 'unaware':
         if defense == constants.DEFENSE:
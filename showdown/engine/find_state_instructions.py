@@ -29,6 +29,12 @@ def lookup_move(move_name):
 
 
 def get_effective_speed(state, side):
+    if side.active.effective_speed is None:
+        side.active.effective_speed = calculate_effective_speed(state, side)
+    return side.active.effective_speed
+
+
+def calculate_effective_speed(state, side):
     boosted_speed = side.active.calculate_boosted_stats()[constants.SPEED]
 
     if state.weather == constants.SUN and side.active.ability == 'chlorophyll':
@@ -434,9 +440,12 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
 
     if switch_out_move_triggered(attacking_move, damage_amounts):
         temp_instructions = []
+        best_switch = None
         for i in all_instructions:
-            best_switch = get_best_switch_pokemon(mutator, i, attacker, attacking_side, defending_move, first_move)
-            if best_switch is not None:
+            # the switch is picked from the state before the move, so it is the same for every branch
+            if best_switch is None:
+                best_switch = get_best_switch_pokemon(mutator, i, attacker, attacking_side, defending_move, first_move)
+            if best_switch is not None and not i.frozen:
                 temp_instructions.append(instruction_generator.get_instructions_from_switch(mutator, attacker, best_switch, i))
             else:
                 temp_instructions.append(i)
@@ -881,6 +881,39 @@ def get_instructions_from_attacker_recovery(mutator, attacker_string, move, inst
     return [instruction]
 
 
+# the end-of-turn phases that only happen when something in the state sets them up
+WEATHER_DAMAGE_PHASE = 1
+FUTURE_SIGHT_PHASE = 2
+WISH_PHASE = 4
+STATUS_DAMAGE_PHASE = 8
+LEECH_SEED_PHASE = 16
+VOLATILE_STATUS_PHASE = 32
+
+RESIDUAL_DAMAGE_STATUSES = {constants.TOXIC, constants.BURN, constants.POISON}
+
+
+def end_of_turn_phases(state):
+    """The phases of the end of the turn that could do something in `state`, as flags"""
+    user = state.user
+    opponent = state.opponent
+    phases = 0
+    if state.weather == constants.SAND or state.weather == constants.HAIL:
+        phases |= WEATHER_DAMAGE_PHASE
+    if user.future_sight[0] or opponent.future_sight[0]:
+        phases |= FUTURE_SIGHT_PHASE
+    if user.wish[0] or opponent.wish[0]:
+        phases |= WISH_PHASE
+    if user.active.status in RESIDUAL_DAMAGE_STATUSES or opponent.active.status in RESIDUAL_DAMAGE_STATUSES:
+        phases |= STATUS_DAMAGE_PHASE
+    if user.active.volatile_status or opponent.active.volatile_status:
+        phases |= VOLATILE_STATUS_PHASE
+        if constants.LEECH_SEED in user.active.volatile_status or constants.LEECH_SEED in opponent.active.volatile_status:
+            phases |= LEECH_SEED_PHASE
+    if user.side_conditions[constants.PROTECT] or opponent.side_conditions[constants.PROTECT]:
+        phases |= VOLATILE_STATUS_PHASE
+    return phases
+
+
 def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move, bot_moves_first):
     # determine which goes first
     if bot_moves_first:
@@ -890,76 +923,82 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
 
     mutator.apply(instruction.instructions)
 
+    # phases that can not do anything in this state are skipped
+    phases = end_of_turn_phases(mutator.state)
+
     # weather damage - sand and hail
-    for attacker in sides:
-        side = get_side_from_state(mutator.state, attacker)
-        pkmn = side.active
+    if phases & WEATHER_DAMAGE_PHASE:
+        for attacker in sides:
+            side = get_side_from_state(mutator.state, attacker)
+            pkmn = side.active
 
-        if pkmn.ability == 'magicguard' or not pkmn.hp:
-            continue
+            if pkmn.ability == 'magicguard' or not pkmn.hp:
+                continue
 
-        if mutator.state.weather == constants.SAND and not any(t in pkmn.types for t in ['steel', 'rock', 'ground']):
-            sand_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
-            )
-            mutator.apply_one(sand_damage_instruction)
-            instruction.add_instruction(sand_damage_instruction)
+            if mutator.state.weather == constants.SAND and not any(t in pkmn.types for t in ['steel', 'rock', 'ground']):
+                sand_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
+                )
+                mutator.apply_one(sand_damage_instruction)
+                instruction.add_instruction(sand_damage_instruction)
 
-        elif mutator.state.weather == constants.HAIL and 'ice' not in pkmn.types and pkmn.ability != 'icebody':
-            ice_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
-            )
-            mutator.apply_one(ice_damage_instruction)
-            instruction.add_instruction(ice_damage_instruction)
+            elif mutator.state.weather == constants.HAIL and 'ice' not in pkmn.types and pkmn.ability != 'icebody':
+                ice_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
+                )
+                mutator.apply_one(ice_damage_instruction)
+                instruction.add_instruction(ice_damage_instruction)
 
     # futuresight
-    for attacker in sides:
-        side = get_side_from_state(mutator.state, attacker)
-        if side.future_sight[0] == 1:
-            from showdown.engine.damage_calculator import calculate_futuresight_damage
-            damage_dealt = calculate_futuresight_damage(
-                mutator.state,
-                attacker,
-                side.future_sight[1]
-            )[0]
-            if damage_dealt:
-                futuresight_damage_instruction = (
-                    constants.MUTATOR_DAMAGE,
-                    opposite_side[attacker],
-                    damage_dealt
+    if phases & FUTURE_SIGHT_PHASE:
+        for attacker in sides:
+            side = get_side_from_state(mutator.state, attacker)
+            if side.future_sight[0] == 1:
+                from showdown.engine.damage_calculator import calculate_futuresight_damage
+                damage_dealt = calculate_futuresight_damage(
+                    mutator.state,
+                    attacker,
+                    side.future_sight[1]
+                )[0]
+                if damage_dealt:
+                    futuresight_damage_instruction = (
+                        constants.MUTATOR_DAMAGE,
+                        opposite_side[attacker],
+                        damage_dealt
+                    )
+                    mutator.apply_one(futuresight_damage_instruction)
+                    instruction.add_instruction(futuresight_damage_instruction)
+            if side.future_sight[0] > 0:
+                futuresight_decrement_instruction = (
+                    constants.MUTATOR_FUTURESIGHT_DECREMENT,
+                    attacker,
                 )
-                mutator.apply_one(futuresight_damage_instruction)
-                instruction.add_instruction(futuresight_damage_instruction)
-        if side.future_sight[0] > 0:
-            futuresight_decrement_instruction = (
-                constants.MUTATOR_FUTURESIGHT_DECREMENT,
-                attacker,
-            )
-            mutator.apply_one(futuresight_decrement_instruction)
-            instruction.add_instruction(futuresight_decrement_instruction)
+                mutator.apply_one(futuresight_decrement_instruction)
+                instruction.add_instruction(futuresight_decrement_instruction)
 
     # wish
-    for attacker in sides:
-        side = get_side_from_state(mutator.state, attacker)
-        if side.wish[0] == 1 and 0 < side.active.hp < side.active.maxhp:
-            wish_heal_instruction = (
-                constants.MUTATOR_HEAL,
-                attacker,
-                min(side.wish[1], side.active.maxhp - side.active.hp)
-            )
-            mutator.apply_one(wish_heal_instruction)
-            instruction.add_instruction(wish_heal_instruction)
-        if side.wish[0] > 0:
-            wish_decrement_instruction = (
-                constants.MUTATOR_WISH_DECREMENT,
-                attacker
-            )
-            mutator.apply_one(wish_decrement_instruction)
-            instruction.add_instruction(wish_decrement_instruction)
+    if phases & WISH_PHASE:
+        for attacker in sides:
+            side = get_side_from_state(mutator.state, attacker)
+            if side.wish[0] == 1 and 0 < side.active.hp < side.active.maxhp:
+                wish_heal_instruction = (
+                    constants.MUTATOR_HEAL,
+                    attacker,
+                    min(side.wish[1], side.active.maxhp - side.active.hp)
+                )
+                mutator.apply_one(wish_heal_instruction)
+                instruction.add_instruction(wish_heal_instruction)
+            if side.wish[0] > 0:
+                wish_decrement_instruction = (
+                    constants.MUTATOR_WISH_DECREMENT,
+                    attacker
+                )
+                mutator.apply_one(wish_decrement_instruction)
+                instruction.add_instruction(wish_decrement_instruction)
 
     # item and ability - they can add one instruction each
     for attacker in sides:
@@ -979,160 +1018,166 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
             mutator.apply_one(ability_instruction)
             instruction.add_instruction(ability_instruction)
 
+    # items and abilities can give a status, so the phases are checked again
+    phases = end_of_turn_phases(mutator.state)
+
     # poison, toxic, and burn damage
-    for attacker in sides:
-        side = get_side_from_state(mutator.state, attacker)
-        pkmn = side.active
+    if phases & STATUS_DAMAGE_PHASE:
+        for attacker in sides:
+            side = get_side_from_state(mutator.state, attacker)
+            pkmn = side.active
 
-        if pkmn.ability == 'magicguard' or not pkmn.hp:
-            continue
+            if pkmn.ability == 'magicguard' or not pkmn.hp:
+                continue
 
-        if constants.TOXIC == pkmn.status and pkmn.ability != 'poisonheal':
-            toxic_count = side.side_conditions[constants.TOXIC_COUNT]
-            toxic_multiplier = (1 / 16) * toxic_count + (1 / 16)
-            toxic_damage = max(0, int(min(pkmn.maxhp * toxic_multiplier, pkmn.hp)))
+            if constants.TOXIC == pkmn.status and pkmn.ability != 'poisonheal':
+                toxic_count = side.side_conditions[constants.TOXIC_COUNT]
+                toxic_multiplier = (1 / 16) * toxic_count + (1 / 16)
+                toxic_damage = max(0, int(min(pkmn.maxhp * toxic_multiplier, pkmn.hp)))
 
-            toxic_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                toxic_damage
-            )
-            toxic_count_instruction = (
-                constants.MUTATOR_SIDE_START,
-                attacker,
-                constants.TOXIC_COUNT,
-                1
-            )
-            mutator.apply_one(toxic_damage_instruction)
-            mutator.apply_one(toxic_count_instruction)
+                toxic_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    toxic_damage
+                )
+                toxic_count_instruction = (
+                    constants.MUTATOR_SIDE_START,
+                    attacker,
+                    constants.TOXIC_COUNT,
+                    1
+                )
+                mutator.apply_one(toxic_damage_instruction)
+                mutator.apply_one(toxic_count_instruction)
 
-            instruction.add_instruction(toxic_damage_instruction)
-            instruction.add_instruction(toxic_count_instruction)
+                instruction.add_instruction(toxic_damage_instruction)
+                instruction.add_instruction(toxic_count_instruction)
 
-        elif constants.BURN == pkmn.status:
-            burn_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
-            )
-            mutator.apply_one(burn_damage_instruction)
-            instruction.add_instruction(burn_damage_instruction)
+            elif constants.BURN == pkmn.status:
+                burn_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
+                )
+                mutator.apply_one(burn_damage_instruction)
+                instruction.add_instruction(burn_damage_instruction)
 
-        elif constants.POISON == pkmn.status and pkmn.ability != 'poisonheal':
-            poison_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
-            )
-            mutator.apply_one(poison_damage_instruction)
-            instruction.add_instruction(poison_damage_instruction)
+            elif constants.POISON == pkmn.status and pkmn.ability != 'poisonheal':
+                poison_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
+                )
+                mutator.apply_one(poison_damage_instruction)
+                instruction.add_instruction(poison_damage_instruction)
 
     # leechseed sap damage
-    for attacker in sides:
-        defender = opposite_side[attacker]
-        side = get_side_from_state(mutator.state, attacker)
-        defending_side = get_side_from_state(mutator.state, defender)
-        pkmn = side.active
-        defending_pkmn = defending_side.active
-
-        if pkmn.ability == 'magicguard' or not pkmn.hp or not defending_pkmn.hp:
-            continue
-
-        if constants.LEECH_SEED in pkmn.volatile_status:
-            # damage taken
-            damage_sapped = max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
-            sap_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                damage_sapped
-            )
+    if phases & LEECH_SEED_PHASE:
+        for attacker in sides:
+            defender = opposite_side[attacker]
+            side = get_side_from_state(mutator.state, attacker)
+            defending_side = get_side_from_state(mutator.state, defender)
+            pkmn = side.active
+            defending_pkmn = defending_side.active
+
+            if pkmn.ability == 'magicguard' or not pkmn.hp or not defending_pkmn.hp:
+                continue
+
+            if constants.LEECH_SEED in pkmn.volatile_status:
+                # damage taken
+                damage_sapped = max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
+                sap_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    damage_sapped
+                )
 
-            # heal amount
-            damage_from_full = defending_pkmn.maxhp - defending_pkmn.hp
-            heal_instruction = (
-                constants.MUTATOR_HEAL,
-                defender,
-                min(damage_sapped, damage_from_full)
-            )
+                # heal amount
+                damage_from_full = defending_pkmn.maxhp - defending_pkmn.hp
+                heal_instruction = (
+                    constants.MUTATOR_HEAL,
+                    defender,
+                    min(damage_sapped, damage_from_full)
+                )
 
-            mutator.apply_one(sap_instruction)
-            mutator.apply_one(heal_instruction)
-            instruction.add_instruction(sap_instruction)
-            instruction.add_instruction(heal_instruction)
+                mutator.apply_one(sap_instruction)
+                mutator.apply_one(heal_instruction)
+                instruction.add_instruction(sap_instruction)
+                instruction.add_instruction(heal_instruction)
 
     # volatile-statuses
-    for attacker in sides:
-        side = get_side_from_state(mutator.state, attacker)
-        pkmn = side.active
-
-        if any(vs in constants.PROTECT_VOLATILE_STATUSES for vs in pkmn.volatile_status):
-            if constants.PROTECT in pkmn.volatile_status:
-                volatile_status_to_remove = constants.PROTECT
-            elif constants.BANEFUL_BUNKER in pkmn.volatile_status:
-                volatile_status_to_remove = constants.BANEFUL_BUNKER
-            elif constants.SPIKY_SHIELD in pkmn.volatile_status:
-                volatile_status_to_remove = constants.SPIKY_SHIELD
-            elif constants.SILK_TRAP in pkmn.volatile_status:
-                volatile_status_to_remove = constants.SILK_TRAP
-            else:
-                # should never happen
-                raise Exception("Pokemon has volatile status that is not caught here: {}".format(pkmn.volatile_status))
+    if phases & VOLATILE_STATUS_PHASE:
+        for attacker in sides:
+            side = get_side_from_state(mutator.state, attacker)
+            pkmn = side.active
+
+            if any(vs in constants.PROTECT_VOLATILE_STATUSES for vs in pkmn.volatile_status):
+                if constants.PROTECT in pkmn.volatile_status:
+                    volatile_status_to_remove = constants.PROTECT
+                elif constants.BANEFUL_BUNKER in pkmn.volatile_status:
+                    volatile_status_to_remove = constants.BANEFUL_BUNKER
+                elif constants.SPIKY_SHIELD in pkmn.volatile_status:
+                    volatile_status_to_remove = constants.SPIKY_SHIELD
+                elif constants.SILK_TRAP in pkmn.volatile_status:
+                    volatile_status_to_remove = constants.SILK_TRAP
+                else:
+                    # should never happen
+                    raise Exception("Pokemon has volatile status that is not caught here: {}".format(pkmn.volatile_status))
+
+                remove_protect_volatile_status_instruction = (
+                    constants.MUTATOR_REMOVE_VOLATILE_STATUS,
+                    attacker,
+                    volatile_status_to_remove
+                )
+                start_protect_side_condition_instruction = (
+                        constants.MUTATOR_SIDE_START,
+                        attacker,
+                        constants.PROTECT,
+                        1
+                )
+                mutator.apply_one(remove_protect_volatile_status_instruction)
+                mutator.apply_one(start_protect_side_condition_instruction)
+                instruction.add_instruction(remove_protect_volatile_status_instruction)
+                instruction.add_instruction(start_protect_side_condition_instruction)
 
-            remove_protect_volatile_status_instruction = (
-                constants.MUTATOR_REMOVE_VOLATILE_STATUS,
-                attacker,
-                volatile_status_to_remove
-            )
-            start_protect_side_condition_instruction = (
-                    constants.MUTATOR_SIDE_START,
+            elif side.side_conditions[constants.PROTECT]:
+                end_protect_side_condition_instruction = (
+                    constants.MUTATOR_SIDE_END,
                     attacker,
                     constants.PROTECT,
-                    1
-            )
-            mutator.apply_one(remove_protect_volatile_status_instruction)
-            mutator.apply_one(start_protect_side_condition_instruction)
-            instruction.add_instruction(remove_protect_volatile_status_instruction)
-            instruction.add_instruction(start_protect_side_condition_instruction)
-
-        elif side.side_conditions[constants.PROTECT]:
-            end_protect_side_condition_instruction = (
-                constants.MUTATOR_SIDE_END,
-                attacker,
-                constants.PROTECT,
-                side.side_conditions[constants.PROTECT]
-            )
-            mutator.apply_one(end_protect_side_condition_instruction)
-            instruction.add_instruction(end_protect_side_condition_instruction)
+                    side.side_conditions[constants.PROTECT]
+                )
+                mutator.apply_one(end_protect_side_condition_instruction)
+                instruction.add_instruction(end_protect_side_condition_instruction)
 
-        if constants.ROOST in pkmn.volatile_status:
-            remove_roost_instruction = (
-                constants.MUTATOR_REMOVE_VOLATILE_STATUS,
-                attacker,
-                constants.ROOST,
-            )
-            mutator.apply_one(remove_roost_instruction)
-            instruction.add_instruction(remove_roost_instruction)
+            if constants.ROOST in pkmn.volatile_status:
+                remove_roost_instruction = (
+                    constants.MUTATOR_REMOVE_VOLATILE_STATUS,
+                    attacker,
+                    constants.ROOST,
+                )
+                mutator.apply_one(remove_roost_instruction)
+                instruction.add_instruction(remove_roost_instruction)
 
-        if constants.PARTIALLY_TRAPPED in pkmn.volatile_status:
-            damage_taken = max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
-            partially_trapped_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                damage_taken
-            )
-            mutator.apply_one(partially_trapped_damage_instruction)
-            instruction.add_instruction(partially_trapped_damage_instruction)
+            if constants.PARTIALLY_TRAPPED in pkmn.volatile_status:
+                damage_taken = max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
+                partially_trapped_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    damage_taken
+                )
+                mutator.apply_one(partially_trapped_damage_instruction)
+                instruction.add_instruction(partially_trapped_damage_instruction)
 
-        if "saltcure" in pkmn.volatile_status:
-            divisor = 4 if any(t in pkmn.types for t in ["water", "steel"]) else 8
-            damage_taken = max(0, int(min(pkmn.maxhp * (1/divisor), pkmn.hp)))
-            partially_trapped_damage_instruction = (
-                constants.MUTATOR_DAMAGE,
-                attacker,
-                damage_taken
-            )
-            mutator.apply_one(partially_trapped_damage_instruction)
-            instruction.add_instruction(partially_trapped_damage_instruction)
+            if "saltcure" in pkmn.volatile_status:
+                divisor = 4 if any(t in pkmn.types for t in ["water", "steel"]) else 8
+                damage_taken = max(0, int(min(pkmn.maxhp * (1/divisor), pkmn.hp)))
+                partially_trapped_damage_instruction = (
+                    constants.MUTATOR_DAMAGE,
+                    attacker,
+                    damage_taken
+                )
+                mutator.apply_one(partially_trapped_damage_instruction)
+                instruction.add_instruction(partially_trapped_damage_instruction)
 
     # disable not used moves if choice-item is held
     for attacker in sides:
@@ -117,6 +117,16 @@ class State(object):
             state_dict[constants.TRICK_ROOM]
         )
 
+    def to_dict(self):
+        """The inverse of `from_dict`, made of plain types so that it can be saved as JSON"""
+        return {
+            constants.USER: self.user.to_dict(),
+            constants.OPPONENT: self.opponent.to_dict(),
+            constants.WEATHER: self.weather,
+            constants.FIELD: self.field,
+            constants.TRICK_ROOM: self.trick_room
+        }
+
     def __repr__(self):
         return str(
             {
@@ -170,6 +180,15 @@ class Side(object):
             side_dict[constants.FUTURE_SIGHT]
         )
 
+    def to_dict(self):
+        return {
+            constants.ACTIVE: self.active.to_dict(),
+            constants.RESERVE: {name: pkmn.to_dict() for name, pkmn in self.reserve.items()},
+            constants.WISH: list(self.wish),
+            constants.SIDE_CONDITIONS: dict(self.side_conditions),
+            constants.FUTURE_SIGHT: list(self.future_sight)
+        }
+
     def __repr__(self):
         return str({
             constants.ACTIVE: self.active,
@@ -207,7 +226,9 @@ class Pokemon(object):
         'volatile_status',
         'moves',
         'terastallized',
-        'burn_multiplier'
+        'burn_multiplier',
+        'boosted_stats',
+        'effective_speed'
     )
 
     def __init__(
@@ -268,6 +289,45 @@ class Pokemon(object):
         # it is calculated here to save time during evaluation
         self.burn_multiplier = self.calculate_burn_multiplier()
 
+        # worked out when they are first needed and cleared by the `StateMutator` when they change
+        self.boosted_stats = None
+        self.effective_speed = None
+
+    def copy(self):
+        """A copy that the engine can change without changing this pokemon"""
+        # filled in directly since this is much faster than `copy` for a class with `__slots__`
+        pkmn = Pokemon.__new__(Pokemon)
+        pkmn.id = self.id
+        pkmn.level = self.level
+        pkmn.types = self.types
+        pkmn.hp = self.hp
+        pkmn.maxhp = self.maxhp
+        pkmn.ability = self.ability
+        pkmn.item = self.item
+        pkmn.attack = self.attack
+        pkmn.defense = self.defense
+        pkmn.special_attack = self.special_attack
+        pkmn.special_defense = self.special_defense
+        pkmn.speed = self.speed
+        pkmn.nature = self.nature
+        pkmn.evs = self.evs
+        pkmn.attack_boost = self.attack_boost
+        pkmn.defense_boost = self.defense_boost
+        pkmn.special_attack_boost = self.special_attack_boost
+        pkmn.special_defense_boost = self.special_defense_boost
+        pkmn.speed_boost = self.speed_boost
+        pkmn.accuracy_boost = self.accuracy_boost
+        pkmn.evasion_boost = self.evasion_boost
+        pkmn.status = self.status
+        pkmn.volatile_status = set(self.volatile_status)
+        pkmn.moves = [dict(m) for m in self.moves]
+        pkmn.terastallized = self.terastallized
+        pkmn.burn_multiplier = self.burn_multiplier
+        pkmn.boosted_stats = self.boosted_stats
+        # the effective speed depends on the state the pokemon is in
+        pkmn.effective_speed = None
+        return pkmn
+
     def calculate_burn_multiplier(self):
         # this will result in a positive evaluation for a burned pokemon
         if self.ability in ['guts', 'marvelscale', 'quickfeet']:
@@ -404,15 +464,47 @@ class Pokemon(object):
             d[constants.MOVES]
         )
 
-    def calculate_boosted_stats(self):
+    def to_dict(self):
         return {
-            constants.ATTACK: boost_multiplier_lookup[self.attack_boost] * self.attack,
-            constants.DEFENSE: boost_multiplier_lookup[self.defense_boost] * self.defense,
-            constants.SPECIAL_ATTACK: boost_multiplier_lookup[self.special_attack_boost] * self.special_attack,
-            constants.SPECIAL_DEFENSE: boost_multiplier_lookup[self.special_defense_boost] * self.special_defense,
-            constants.SPEED: boost_multiplier_lookup[self.speed_boost] * self.speed,
+            constants.ID: self.id,
+            constants.LEVEL: self.level,
+            constants.TYPES: list(self.types),
+            constants.HITPOINTS: self.hp,
+            constants.MAXHP: self.maxhp,
+            constants.ABILITY: self.ability,
+            constants.ITEM: self.item,
+            constants.ATTACK: self.attack,
+            constants.DEFENSE: self.defense,
+            constants.SPECIAL_ATTACK: self.special_attack,
+            constants.SPECIAL_DEFENSE: self.special_defense,
+            constants.SPEED: self.speed,
+            constants.NATURE: self.nature,
+            constants.EVS: list(self.evs),
+            constants.ATTACK_BOOST: self.attack_boost,
+            constants.DEFENSE_BOOST: self.defense_boost,
+            constants.SPECIAL_ATTACK_BOOST: self.special_attack_boost,
+            constants.SPECIAL_DEFENSE_BOOST: self.special_defense_boost,
+            constants.SPEED_BOOST: self.speed_boost,
+            constants.ACCURACY_BOOST: self.accuracy_boost,
+            constants.EVASION_BOOST: self.evasion_boost,
+            constants.STATUS: self.status,
+            constants.TERASTALLIZED: self.terastallized,
+            constants.VOLATILE_STATUS: sorted(self.volatile_status),
+            constants.MOVES: [dict(m) for m in self.moves]
         }
 
+    def calculate_boosted_stats(self):
+        """The stats with boosts applied. The dictionary is shared between calls, so copy it before changing it"""
+        if self.boosted_stats is None:
+            self.boosted_stats = {
+                constants.ATTACK: boost_multiplier_lookup[self.attack_boost] * self.attack,
+                constants.DEFENSE: boost_multiplier_lookup[self.defense_boost] * self.defense,
+                constants.SPECIAL_ATTACK: boost_multiplier_lookup[self.special_attack_boost] * self.special_attack,
+                constants.SPECIAL_DEFENSE: boost_multiplier_lookup[self.special_defense_boost] * self.special_defense,
+                constants.SPEED: boost_multiplier_lookup[self.speed_boost] * self.speed,
+            }
+        return self.boosted_stats
+
     def is_grounded(self):
         if 'flying' in self.types or self.ability == 'levitate' or self.item == 'airballoon':
             return False
@@ -578,6 +670,8 @@ class StateMutator:
 
         side.reserve[side.active.id] = side.active
         side.active = side.reserve.pop(switch_pokemon_name)
+        # the weather, terrain or tailwind could have changed while it was in the reserve
+        side.active.effective_speed = None
 
     def reverse_switch(self, side, previous_active, current_active):
         self.switch(side, current_active, previous_active)
@@ -585,10 +679,12 @@ class StateMutator:
     def apply_volatile_status(self, side, volatile_status):
         side = self.get_side(side)
         side.active.volatile_status.add(volatile_status)
+        side.active.effective_speed = None
 
     def remove_volatile_status(self, side, volatile_status):
         side = self.get_side(side)
         side.active.volatile_status.remove(volatile_status)
+        side.active.effective_speed = None
 
     def damage(self, side, amount):
         side = self.get_side(side)
@@ -616,6 +712,8 @@ class StateMutator:
             side.active.evasion_boost += amount
         else:
             raise ValueError("Invalid stat: {}".format(stat))
+        side.active.boosted_stats = None
+        side.active.effective_speed = None
 
     def unboost(self, side, stat, amount):
         self.boost(side, stat, -1*amount)
@@ -623,6 +721,7 @@ class StateMutator:
     def apply_status(self, side, status):
         side = self.get_side(side)
         side.active.status = status
+        side.active.effective_speed = None
 
     def remove_status(self, side, _):
         # the second parameter of this function is the status being removed
@@ -632,14 +731,20 @@ class StateMutator:
     def side_start(self, side, effect, amount):
         side = self.get_side(side)
         side.side_conditions[effect] += amount
+        if effect == constants.TAILWIND:
+            side.active.effective_speed = None
 
     def reverse_side_start(self, side, effect, amount):
         side = self.get_side(side)
         side.side_conditions[effect] -= amount
+        if effect == constants.TAILWIND:
+            side.active.effective_speed = None
 
     def side_end(self, side, effect, amount):
         side = self.get_side(side)
         side.side_conditions[effect] -= amount
+        if effect == constants.TAILWIND:
+            side.active.effective_speed = None
 
     def reverse_side_end(self, side, effect, amount):
         self.side_start(side, effect, amount)
@@ -684,25 +789,35 @@ class StateMutator:
         # the second parameter is the current weather
         # the value is here for reversing purposes
         self.state.weather = weather
+        self.clear_effective_speeds()
 
     def reverse_start_weather(self, _, old_weather):
         self.state.weather = old_weather
+        self.clear_effective_speeds()
 
     def start_field(self, field, _):
         # the second parameter is the current field
         # the value is here for reversing purposes
         self.state.field = field
+        self.clear_effective_speeds()
 
     def reverse_start_field(self, _, old_field):
         self.state.field = old_field
+        self.clear_effective_speeds()
 
     def end_field(self, _):
         # the second parameter is the current field
         # the value is here for reversing purposes
         self.state.field = None
+        self.clear_effective_speeds()
 
     def reverse_end_field(self, old_field):
         self.state.field = old_field
+        self.clear_effective_speeds()
+
+    def clear_effective_speeds(self):
+        self.state.user.active.effective_speed = None
+        self.state.opponent.active.effective_speed = None
 
     def toggle_trickroom(self):
         self.state.trick_room ^= True
@@ -722,10 +837,12 @@ class StateMutator:
         # it must be here for reversing purposes
         side = self.get_side(side)
         side.active.item = new_item
+        side.active.effective_speed = None
 
     def reverse_change_item(self, side, _, old_item):
         side = self.get_side(side)
         side.active.item = old_item
+        side.active.effective_speed = None
 
     def change_stats(self, side, new_stats, _):
         # the third parameter is the old stats
@@ -737,6 +854,8 @@ class StateMutator:
         side.active.special_attack = new_stats[3]
         side.active.special_defense = new_stats[4]
         side.active.speed = new_stats[5]
+        side.active.boosted_stats = None
+        side.active.effective_speed = None
 
     def reverse_change_stats(self, side, _, old_stats):
         # the second parameter are the new stats
@@ -747,3 +866,5 @@ class StateMutator:
         side.active.special_attack = old_stats[3]
         side.active.special_defense = old_stats[4]
         side.active.speed = old_stats[5]
+        side.active.boosted_stats = None
+        side.active.effective_speed = None
@@ -0,0 +1,155 @@
+import numpy as np
+
+
+class PayoffMatrix:
+    """
+    The score of every pair of options, with a row for each of the bot's options and a column for each of the opponent's
+
+    Cells that were pruned from the search are NaN and are ignored when looking for the worst case of a row
+    """
+
+    __slots__ = ('user_options', 'opponent_options', 'scores')
+
+    def __init__(self, user_options, opponent_options, scores=None):
+        self.user_options = list(user_options)
+        self.opponent_options = list(opponent_options)
+        if scores is None:
+            scores = np.full((len(self.user_options), len(self.opponent_options)), np.nan)
+        self.scores = np.asarray(scores, dtype=float).reshape(len(self.user_options), len(self.opponent_options))
+
+    def items(self):
+        """The `((user_move, opponent_move), score)` of every cell, row by row"""
+        for i, user_move in enumerate(self.user_options):
+            for j, opponent_move in enumerate(self.opponent_options):
+                yield (user_move, opponent_move), float(self.scores[i, j])
+
+    def get(self, move_pair, default=None):
+        user_move, opponent_move = move_pair
+        try:
+            return float(self.scores[self.user_options.index(user_move), self.opponent_options.index(opponent_move)])
+        except ValueError:
+            return default
+
+    def __len__(self):
+        return self.scores.size
+
+    def row(self, user_move):
+        return self.scores[self.user_options.index(user_move)]
+
+    def column(self, opponent_move):
+        return self.scores[:, self.opponent_options.index(opponent_move)]
+
+    def row_minimums(self):
+        """The worst score of each of the bot's options. A row with every cell pruned is `inf`"""
+        return np.fmin.reduce(self.scores, axis=1, initial=np.inf)
+
+    def column_maximums(self):
+        """The best score the bot can get against each of the opponent's options. A column with every cell pruned is `-inf`"""
+        return np.fmax.reduce(self.scores, axis=0, initial=-np.inf)
+
+    def worst_cases(self):
+        """`row_minimums`, with the rows that have no scores at all never being the safest"""
+        worst_cases = self.row_minimums()
+        worst_cases[np.isnan(self.scores).all(axis=1)] = -np.inf
+        return worst_cases
+
+    def keep_columns(self, mask):
+        return PayoffMatrix(
+            self.user_options,
+            [o for o, keep in zip(self.opponent_options, mask) if keep],
+            self.scores[:, mask]
+        )
+
+    def remove_guaranteed_opponent_moves(self):
+        """
+        Removes the opponent's moves that do not give the bot a choice, where every option of the bot gets the same score.
+        For example - if the bot has 1 pokemon left, the opponent is faster, and can kill your active pokemon with move X
+        then move X for the opponent will be removed
+
+        The bot behaves much better when it cannot see these types of decisions
+        """
+        if len(self.user_options) <= 1 or len(self.opponent_options) <= 1:
+            return self
+
+        pruned = np.isnan(self.scores)
+        # every column is compared with it's first score that was not pruned
+        first_scores = self.scores[np.argmax(~pruned, axis=0), np.arange(self.scores.shape[1])]
+        decisions = np.any((self.scores != first_scores) & ~pruned, axis=0)
+        return self.keep_columns(decisions)
+
+    def maximin(self):
+        """
+        The bot's option with the best worst case, as `((user_move, opponent_move), score)`
+        where `opponent_move` is the opponent's best reply to it. The first option wins ties
+        """
+        worst_cases = self.worst_cases()
+        i = int(np.argmax(worst_cases))
+        # pruned cells are never the worst case
+        j = int(np.argmin(np.where(np.isnan(self.scores[i]), np.inf, self.scores[i])))
+        return (self.user_options[i], self.opponent_options[j]), float(worst_cases[i])
+
+    def safest_score(self):
+        """The score of `maximin` without looking up the options"""
+        return float(np.max(self.worst_cases()))
+
+
+class SampledPayoffs:
+    """
+    The payoff matrices of several sampled battles stacked into one array of battle x bot option x opponent option,
+    with a weight for each battle
+
+    Options that a battle does not have are NaN in that battle, the same as pruned cells
+    """
+
+    __slots__ = ('user_options', 'opponent_options', 'scores', 'weights')
+
+    def __init__(self, payoff_matrices, weights=None):
+        rows = {}
+        columns = {}
+        for payoff_matrix in payoff_matrices:
+            for user_move in payoff_matrix.user_options:
+                rows.setdefault(user_move, len(rows))
+            for opponent_move in payoff_matrix.opponent_options:
+                columns.setdefault(opponent_move, len(columns))
+
+        self.user_options = list(rows)
+        self.opponent_options = list(columns)
+        self.scores = np.full((len(payoff_matrices), len(rows), len(columns)), np.nan)
+        for b, payoff_matrix in enumerate(payoff_matrices):
+            row_indexes = [[rows[user_move]] for user_move in payoff_matrix.user_options]
+            column_indexes = [columns[opponent_move] for opponent_move in payoff_matrix.opponent_options]
+            self.scores[b, row_indexes, column_indexes] = payoff_matrix.scores
+
+        if weights is None:
+            weights = np.ones(len(payoff_matrices))
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != (len(payoff_matrices),) or np.any(weights < 0) or not weights.sum() > 0:
+            raise ValueError("Expected a non-negative weight for each of the {} battles: {}".format(len(payoff_matrices), weights))
+        self.weights = weights / weights.sum()
+
+    def worst_case(self):
+        """
+        Every opponent option of every battle with a weight as it's own column, named `<option>_<battle>`,
+        so that the bot's worst case is over all of them
+        """
+        battles = np.flatnonzero(self.weights)
+        scores = self.scores[battles].transpose(1, 0, 2).reshape(len(self.user_options), -1)
+        # the options that a battle does not have are dropped before they are named
+        columns = np.flatnonzero(~np.isnan(scores).all(axis=0))
+        width = len(self.opponent_options)
+        opponent_options = [
+            "{}_{}".format(self.opponent_options[c % width], battles[c // width]) for c in columns.tolist()
+        ]
+        return PayoffMatrix(self.user_options, opponent_options, scores[:, columns])
+
+    def expectation(self):
+        """
+        The weighted average score of each pair of options over the battles.
+        A cell that is NaN in some battles is averaged over the others
+        """
+        weights = np.where(np.isnan(self.scores), 0, self.weights[:, None, None])
+        total_weights = weights.sum(axis=0)
+        weighted_scores = (np.nan_to_num(self.scores) * weights).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores = np.where(total_weights > 0, weighted_scores / total_weights, np.nan)
+        return PayoffMatrix(self.user_options, self.opponent_options, scores)
@@ -0,0 +1,224 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import logging
+
+from config import ShowdownConfig
+from .evaluate import Scoring
+from .payoff_matrix import PayoffMatrix
+
+logger = logging.getLogger(__name__)
+
+PWD = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(PWD))
+
+# bump this when the format of the stored scores changes
+CACHE_FORMAT_VERSION = 2
+
+# the search results are only valid for the data and the engine they were computed with
+VERSIONED_FILES = [
+    os.path.join(ROOT, "data", "moves.json"),
+    os.path.join(ROOT, "data", "pokedex.json"),
+    os.path.join(ROOT, "data", "mods", "*.json"),
+    os.path.join(ROOT, "data", "mods", "apply_mods.py"),
+    os.path.join(ROOT, "constants.py"),
+    os.path.join(PWD, "*.py"),
+    os.path.join(PWD, "special_effects", "**", "*.py"),
+]
+
+
+def data_version():
+    h = hashlib.sha1(str(CACHE_FORMAT_VERSION).encode())
+    for pattern in VERSIONED_FILES:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            with open(path, 'rb') as f:
+                h.update(os.path.relpath(path, ROOT).encode())
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def pokemon_fingerprint(pkmn, portable=True):
+    """
+    `portable` fingerprints are the same in any process.
+    Otherwise sets and move dicts are used as they are, which is about twice as fast and only equal within this process
+    """
+    if portable:
+        volatile_status = tuple(sorted(pkmn.volatile_status))
+        moves = tuple(tuple(sorted(m.items())) for m in pkmn.moves)
+    else:
+        volatile_status = frozenset(pkmn.volatile_status)
+        moves = tuple(tuple(m.items()) for m in pkmn.moves)
+
+    return (
+        pkmn.id,
+        pkmn.level,
+        tuple(pkmn.types),
+        pkmn.hp,
+        pkmn.maxhp,
+        pkmn.ability,
+        pkmn.item,
+        pkmn.attack,
+        pkmn.defense,
+        pkmn.special_attack,
+        pkmn.special_defense,
+        pkmn.speed,
+        pkmn.nature,
+        tuple(pkmn.evs),
+        pkmn.attack_boost,
+        pkmn.defense_boost,
+        pkmn.special_attack_boost,
+        pkmn.special_defense_boost,
+        pkmn.speed_boost,
+        pkmn.accuracy_boost,
+        pkmn.evasion_boost,
+        pkmn.status,
+        pkmn.terastallized,
+        volatile_status,
+        moves,
+    )
+
+
+def side_fingerprint(side, portable=True):
+    return (
+        pokemon_fingerprint(side.active, portable),
+        # reserve order decides the order of the switches, so it is kept
+        tuple((name, pokemon_fingerprint(pkmn, portable)) for name, pkmn in side.reserve.items()),
+        tuple(side.wish),
+        tuple(sorted((k, v) for k, v in side.side_conditions.items() if v)),
+        tuple(side.future_sight),
+    )
+
+
+def state_fingerprint(state, portable=True):
+    """A representation of the state that is the same for equal states, in any process if it is `portable`"""
+    return (
+        side_fingerprint(state.user, portable),
+        side_fingerprint(state.opponent, portable),
+        state.weather,
+        state.field,
+        state.trick_room,
+    )
+
+
+_scoring_fingerprint = None
+
+
+def scoring_fingerprint():
+    """Built the first time it is needed, `scoring_changed` must be called after changing `Scoring`"""
+    global _scoring_fingerprint
+    if _scoring_fingerprint is None:
+        _scoring_fingerprint = tuple(
+            (k, repr(v)) for k, v in sorted(vars(Scoring).items())
+            if not k.startswith('_') and not callable(v) and not isinstance(v, staticmethod)
+        )
+    return _scoring_fingerprint
+
+
+def scoring_changed():
+    global _scoring_fingerprint
+    _scoring_fingerprint = None
+
+
+class _SearchCache:
+    """
+    Stores the results of `get_payoff_matrix` in an SQLite database so that they are
+    shared between battles and survive restarts
+
+    The least recently used results are removed once there are more than `max_entries`,
+    and everything is thrown away when the data files or the engine change
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.max_entries = 0
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.connection is not None
+
+    def open(self, directory, max_entries):
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "search_cache.sqlite3"), isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS payoff (key TEXT PRIMARY KEY, scores TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS payoff_last_used ON payoff (last_used)")
+        self.max_entries = max_entries
+
+        version = data_version()
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != version:
+            if row is not None:
+                logger.info("The data or the engine changed since the search cache was written, clearing it")
+            self.connection.execute("DELETE FROM payoff")
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM payoff").fetchone()[0]
+        if self.entries > self.max_entries:
+            self.evict()
+        logger.info("Opened search cache in {} with {} entries".format(directory, self.entries))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @staticmethod
+    def key(state, user_options, opponent_options, depth, prune):
+        return hashlib.sha1(
+            repr((
+                state_fingerprint(state),
+                tuple(user_options),
+                tuple(opponent_options),
+                depth,
+                prune,
+                getattr(ShowdownConfig, 'damage_calc_type', None),
+                getattr(ShowdownConfig, 'pokemon_mode', None),
+                getattr(ShowdownConfig, 'switch_out_mode', None),
+                scoring_fingerprint(),
+            )).encode()
+        ).hexdigest()
+
+    def get(self, key):
+        row = self.connection.execute("SELECT scores FROM payoff WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.connection.execute("UPDATE payoff SET last_used = ? WHERE key = ?", (time.time(), key))
+        user_options, opponent_options, scores = json.loads(row[0])
+        return PayoffMatrix(user_options, opponent_options, scores)
+
+    def put(self, key, payoff_matrix):
+        scores = json.dumps([payoff_matrix.user_options, payoff_matrix.opponent_options, payoff_matrix.scores.tolist()])
+        self.connection.execute(
+            "INSERT OR REPLACE INTO payoff (key, scores, last_used) VALUES (?, ?, ?)",
+            (key, scores, time.time())
+        )
+        self.entries += 1
+
+        # evict in batches so that the table is not counted on every insert
+        if self.entries > self.max_entries * 1.1:
+            self.evict()
+
+    def evict(self):
+        self.connection.execute(
+            "DELETE FROM payoff WHERE key IN (SELECT key FROM payoff ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM payoff").fetchone()[0]
+        logger.debug("Evicted search results down to {} entries".format(self.entries))
+
+
+SearchCache = _SearchCache()
@@ -1,59 +1,31 @@
-import math
-from collections import defaultdict
-
 import constants
 
 from .evaluate import evaluate
 from .find_state_instructions import get_all_state_instructions
+from .payoff_matrix import PayoffMatrix
+from .search_cache import SearchCache
 
 
 WON_BATTLE = 100
 
 
-def remove_guaranteed_opponent_moves(score_lookup):
-    """This method removes enemy moves from the score-lookup that do not give the bot a choice.
+def remove_guaranteed_opponent_moves(payoff_matrix):
+    """This method removes enemy moves from the payoff matrix that do not give the bot a choice.
        For example - if the bot has 1 pokemon left, the opponent is faster, and can kill your active pokemon with move X
-       then move X for the opponent will be removed from the score_lookup
+       then move X for the opponent will be removed from the payoff matrix
 
        The bot behaves much better when it cannot see these types of decisions"""
-    move_combinations = list(score_lookup.keys())
-    if len(set(k[0] for k in move_combinations)) == 1:
-        return score_lookup
-    elif len(set(k[1] for k in move_combinations)) == 1:
-        return score_lookup
-
-    # find the opponent's moves where the bot has a choice
-    opponent_move_scores = dict()
-    opponent_decisions = set()
-    for k, score in score_lookup.items():
-        opponent_move = k[1]
-        if opponent_move not in opponent_move_scores:
-            opponent_move_scores[opponent_move] = score
-        elif opponent_move in opponent_move_scores and score != opponent_move_scores[opponent_move] and not math.isnan(score):
-            opponent_decisions.add(opponent_move)
-
-    # re-create score_lookup with only the opponent's move acquired above
-    new_opponent_decisions = dict()
-    for k, v in score_lookup.items():
-        if k[1] in opponent_decisions:
-            new_opponent_decisions[k] = v
-
-    return new_opponent_decisions
-
-
-def pick_safest(score_lookup, remove_guaranteed=False):
-    modified_score_lookup = score_lookup
+    return payoff_matrix.remove_guaranteed_opponent_moves()
+
+
+def pick_safest(payoff_matrix, remove_guaranteed=False):
+    modified_payoff_matrix = payoff_matrix
     if remove_guaranteed:
-        modified_score_lookup = remove_guaranteed_opponent_moves(score_lookup)
-        if not modified_score_lookup:
-            modified_score_lookup = score_lookup
-    worst_case = defaultdict(lambda: (tuple(), float('inf')))
-    for move_pair, result in modified_score_lookup.items():
-        if worst_case[move_pair[0]][1] > result:
-            worst_case[move_pair[0]] = move_pair, result
+        modified_payoff_matrix = remove_guaranteed_opponent_moves(payoff_matrix)
+        if not len(modified_payoff_matrix):
+            modified_payoff_matrix = payoff_matrix
 
-    safest = max(worst_case, key=lambda x: worst_case[x][1])
-    return worst_case[safest]
+    return modified_payoff_matrix.maximin()
 
 
 def move_item_to_front_of_list(l, item):
@@ -71,12 +43,29 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
     :param opponent_options: options for the opponent
     :param depth: the remaining depth before the state is evaluated
     :param prune: specify whether or not to prune the tree
-    :return: a dictionary representing the potential move combinations and their associated scores
+    :return: a PayoffMatrix of the scores of every combination of options
     """
 
+    # a depth of 1 is cheaper to search than to look up
+    if depth > 1 and SearchCache.enabled:
+        key = SearchCache.key(mutator.state, user_options, opponent_options, depth, prune)
+        payoff_matrix = SearchCache.get(key)
+        if payoff_matrix is None:
+            payoff_matrix = search_payoff_matrix(mutator, user_options, opponent_options, depth, prune)
+            SearchCache.put(key, payoff_matrix)
+        return payoff_matrix
+
+    return search_payoff_matrix(mutator, user_options, opponent_options, depth, prune)
+
+
+def search_payoff_matrix(mutator, user_options, opponent_options, depth, prune):
     winner = mutator.state.battle_is_finished()
     if winner:
-        return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): evaluate(mutator.state) + WON_BATTLE*depth*winner}
+        return PayoffMatrix(
+            [constants.DO_NOTHING_MOVE],
+            [constants.DO_NOTHING_MOVE],
+            evaluate(mutator.state) + WON_BATTLE*depth*winner
+        )
 
     depth -= 1
 
@@ -84,22 +73,20 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
     # this is a special case in a random battle where the opponent's pokemon has fainted, but the opponent still
     # has reserves left that are unseen
     if opponent_options == [constants.DO_NOTHING_MOVE] and mutator.state.opponent.active.hp == 0:
-        return {(user_option, constants.DO_NOTHING_MOVE): evaluate(mutator.state) for user_option in user_options}
+        return PayoffMatrix(user_options, [constants.DO_NOTHING_MOVE], evaluate(mutator.state))
 
-    state_scores = dict()
+    payoff_matrix = PayoffMatrix(user_options, opponent_options)
+    scores = payoff_matrix.scores
+    # the opponent's options are re-ordered while pruning, but each one keeps it's column
+    columns = {opponent_move: j for j, opponent_move in enumerate(opponent_options)}
 
     best_score = float('-inf')
     for i, user_move in enumerate(user_options):
         worst_score_for_this_row = float('inf')
-        skip = False
 
         # opponent_options can change during the loop
         # using opponent_options[:] makes a copy when iterating to ensure no funny-business
-        for j, opponent_move in enumerate(opponent_options[:]):
-            if skip:
-                state_scores[(user_move, opponent_move)] = float('nan')
-                continue
-
+        for opponent_move in opponent_options[:]:
             score = 0
             state_instructions = get_all_state_instructions(mutator, user_move, opponent_move)
             if depth == 0:
@@ -114,23 +101,24 @@ def get_payoff_matrix(mutator, user_options, opponent_options, depth=2, prune=Tr
                     this_percentage = instructions.percentage
                     mutator.apply(instructions.instructions)
                     next_turn_user_options, next_turn_opponent_options = mutator.state.get_all_options()
-                    safest = pick_safest(get_payoff_matrix(mutator, next_turn_user_options, next_turn_opponent_options, depth=depth, prune=prune))
-                    score += safest[1] * this_percentage
+                    next_payoff_matrix = get_payoff_matrix(mutator, next_turn_user_options, next_turn_opponent_options, depth=depth, prune=prune)
+                    score += next_payoff_matrix.safest_score() * this_percentage
                     mutator.reverse(instructions.instructions)
 
-            state_scores[(user_move, opponent_move)] = score
+            scores[i, columns[opponent_move]] = score
 
             if score < worst_score_for_this_row:
                 worst_score_for_this_row = score
 
             if prune and score < best_score:
-                skip = True
-
                 # MOST of the time in pokemon, an opponent's move that causes a prune will cause a prune elsewhere
                 # move this item to the front of the list to prune faster
                 opponent_options = move_item_to_front_of_list(opponent_options, opponent_move)
 
+                # the rest of the row is left as NaN
+                break
+
         if worst_score_for_this_row > best_score:
             best_score = worst_score_for_this_row
 
-    return state_scores
+    return payoff_matrix
@@ -1,4 +1,16 @@
+import logging
+
+import numpy as np
+
 import constants
+from config import ShowdownConfig
+from data import all_move_json
+
+from .damage_calculator import _calculate_damage
+from .search_cache import scoring_fingerprint
+from .search_cache import state_fingerprint
+
+logger = logging.getLogger(__name__)
 
 
 def switch_out_move_triggered(move, damage_amounts):
@@ -9,9 +21,102 @@ def switch_out_move_triggered(move, damage_amounts):
             return damage_amounts is not None and all(damage_amounts)
 
 
-def get_best_switch_pokemon(mutator, instructions, attacker, attacking_side, defending_move, first_move):
+class _SwitchCache:
+    """
+    Remembers the switch picked after a switch-out move for each state, attacker and other move
+    so that it is only searched for once, no matter how many branches or depths reach the same state
+
+    Only the hash of each key is kept so that the entries stay small. It is cleared when a battle starts,
+    and the oldest choices are dropped once there are more than `max_entries`
+    """
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self.choices = dict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(state, attacker, other_move, mode):
+        return hash((
+            state_fingerprint(state, portable=False),
+            attacker,
+            other_move,
+            mode,
+            getattr(ShowdownConfig, 'damage_calc_type', None),
+            getattr(ShowdownConfig, 'pokemon_mode', None),
+            scoring_fingerprint(),
+        ))
+
+    def get(self, key):
+        try:
+            choice = self.choices[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return choice
+
+    def put(self, key, choice):
+        self.choices[key] = choice
+        if len(self.choices) > self.max_entries:
+            del self.choices[next(iter(self.choices))]
+
+    def log_stats(self):
+        logger.debug("Switch-out cache: {} hits, {} misses, {} entries".format(self.hits, self.misses, len(self.choices)))
+
+    def clear(self):
+        self.choices.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+SwitchCache = _SwitchCache()
+
+
+def search_best_switch(mutator, attacker, switches, other_move):
     from .select_best_move import get_payoff_matrix
 
+    if attacker == constants.USER:
+        payoff_matrix = get_payoff_matrix(mutator, switches, [other_move], depth=1)
+        i, _ = np.unravel_index(np.argmax(payoff_matrix.scores), payoff_matrix.scores.shape)
+        return payoff_matrix.user_options[i]
+    else:
+        payoff_matrix = get_payoff_matrix(mutator, [other_move], switches, depth=1)
+        _, j = np.unravel_index(np.argmin(payoff_matrix.scores), payoff_matrix.scores.shape)
+        return payoff_matrix.opponent_options[j]
+
+
+def damage_fraction(attacker, defender, move_name):
+    """The fraction of the defender's remaining hp that the move takes off, ignoring the field"""
+    if move_name not in all_move_json or not defender.hp:
+        return 0
+    damage = _calculate_damage(attacker, defender, move_name)
+    if not damage:
+        return 0
+    return min(damage[0], defender.hp) / defender.hp
+
+
+def score_switch(pkmn, opponent, other_move):
+    """How good it is for `pkmn` to come in against `opponent` using `other_move`, from their moves and hp alone"""
+    best_damage = max(
+        (damage_fraction(pkmn, opponent, m[constants.ID]) for m in pkmn.moves if m.get(constants.CURRENT_PP, 1)),
+        default=0
+    )
+    damage_taken = damage_fraction(opponent, pkmn, other_move)
+    return best_damage - damage_taken + pkmn.hp / pkmn.maxhp
+
+
+def heuristic_best_switch(mutator, attacker, switches, other_move):
+    attacking_side = getattr(mutator.state, attacker)
+    defending_side = getattr(mutator.state, constants.OPPONENT if attacker == constants.USER else constants.USER)
+    return max(
+        switches,
+        key=lambda s: score_switch(attacking_side.reserve[s.split()[-1].strip()], defending_side.active, other_move)
+    )
+
+
+def get_best_switch_pokemon(mutator, instructions, attacker, attacking_side, defending_move, first_move):
     switches = attacking_side.get_switches()
     if not switches or instructions.frozen:
         return None
@@ -21,9 +126,15 @@ def get_best_switch_pokemon(mutator, instructions, attacker, attacking_side, def
     else:
         other_move = constants.DO_NOTHING_MOVE
 
-    if attacker == constants.USER:
-        best_switch = max(get_payoff_matrix(mutator, switches, [other_move], depth=1).items(), key=lambda x: x[1])[0][0]
-    else:
-        best_switch = min(get_payoff_matrix(mutator, [other_move], switches, depth=1).items(), key=lambda x: x[1])[0][1]
+    # the choice only depends on the state the move was used in, so every branch of the move shares it
+    mode = getattr(ShowdownConfig, 'switch_out_mode', constants.SWITCH_OUT_SEARCH)
+    key = SwitchCache.key(mutator.state, attacker, other_move, mode)
+    best_switch = SwitchCache.get(key)
+    if best_switch is None:
+        if mode == constants.SWITCH_OUT_HEURISTIC:
+            best_switch = heuristic_best_switch(mutator, attacker, switches, other_move)
+        else:
+            best_switch = search_best_switch(mutator, attacker, switches, other_move)
+        SwitchCache.put(key, best_switch)
 
     return best_switch.split()[-1].strip()
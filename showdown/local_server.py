@@ -0,0 +1,532 @@
+"""
+A stand-in for Pokemon Showdown used to load-test the bot without connecting to the real server
+
+It serves the login endpoint and the websocket, and speaks the subset of the protocol
+used by PSWebsocketClient and `update_battle`. Battles are played out by the engine:
+the bot's side is whatever team it sends with `/utm`, the challenger's side picks
+a random option each turn, and the random parts of each turn are rolled with a seed
+so the same battles are played every run
+
+The battle log only has what the bot reads (moves, switches, damage, boosts, status
+and faints), so it is a simplification of what Pokemon Showdown would send
+"""
+import json
+import math
+import random
+import secrets
+import time
+from collections import deque
+
+from aiohttp import web
+from aiohttp import WSMsgType
+
+import logging
+
+import constants
+from data import all_move_json
+from data import pokedex
+from showdown.engine.objects import State
+from showdown.engine.objects import StateMutator
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.puzzle_runner.verifier import create_side
+from showdown.puzzle_runner.verifier import side_is_defeated
+from showdown.puzzle_runner.verifier import team_from_export
+from showdown.puzzle_runner.verifier import team_from_packed
+
+logger = logging.getLogger(__name__)
+
+
+BOT_SIDE = "p1"
+CHALLENGER_SIDE = "p2"
+
+SIDE_IDS = {
+    constants.USER: BOT_SIDE,
+    constants.OPPONENT: CHALLENGER_SIDE,
+}
+
+
+def display_name(pkmn):
+    return pokedex[pkmn.id]['name']
+
+
+def details(pkmn):
+    # pokemon showdown leaves the level out when it is 100
+    if pkmn.level == 100:
+        return display_name(pkmn)
+    return "{}, L{}".format(display_name(pkmn), pkmn.level)
+
+
+def condition(pkmn, exact):
+    """The bot sees the exact hp of it's own pokemon, and a percentage for the challenger's"""
+    if pkmn.hp <= 0:
+        return "0 fnt"
+    if exact:
+        text = "{}/{}".format(int(pkmn.hp), pkmn.maxhp)
+    else:
+        text = "{}/100".format(math.ceil(100 * pkmn.hp / pkmn.maxhp))
+    if pkmn.status is not None:
+        text += " {}".format(pkmn.status)
+    return text
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class LocalBattle:
+    """One battle between a bot connection and the simulated challenger"""
+
+    def __init__(self, tag, connection, bot_team, challenger_team, seed, max_turns):
+        self.tag = tag
+        self.connection = connection
+        self.bot_team = bot_team
+        self.challenger_team = challenger_team
+        self.random = random.Random(seed)
+        self.max_turns = max_turns
+
+        self.mutator = None
+        self.turn = 0
+        self.rqid = 0
+        self.order = [pkmn[constants.ID] for pkmn in bot_team]
+        self.team_preview = True
+        self.finished = False
+        self.invalid_choice = False
+
+        # the time the bot was last asked for a decision, for measuring how long it takes to answer
+        self.request_sent_at = None
+
+    @property
+    def state(self):
+        return self.mutator.state
+
+    def ident(self, side, pkmn):
+        return "{}a: {}".format(SIDE_IDS[side], display_name(pkmn))
+
+    def request_pokemon(self):
+        team = [self.state.user.active] + [self.state.user.reserve[name] for name in self.order if name in self.state.user.reserve]
+        return [
+            {
+                "ident": "{}: {}".format(BOT_SIDE, display_name(pkmn)),
+                "details": details(pkmn),
+                "condition": condition(pkmn, exact=True),
+                "active": pkmn is self.state.user.active,
+                "stats": {
+                    "atk": pkmn.attack,
+                    "def": pkmn.defense,
+                    "spa": pkmn.special_attack,
+                    "spd": pkmn.special_defense,
+                    "spe": pkmn.speed,
+                },
+                "moves": [m[constants.ID] for m in pkmn.moves],
+                "baseAbility": pkmn.ability,
+                constants.REQUEST_DICT_ABILITY: pkmn.ability,
+                "item": pkmn.item or "",
+            }
+            for pkmn in team
+        ]
+
+    def preview_request_pokemon(self):
+        return [
+            {
+                "ident": "{}: {}".format(BOT_SIDE, pokedex[pkmn[constants.ID]]['name']),
+                "details": pokedex[pkmn[constants.ID]]['name'] if pkmn[constants.LEVEL] == 100 else "{}, L{}".format(pokedex[pkmn[constants.ID]]['name'], pkmn[constants.LEVEL]),
+                "condition": "{}/{}".format(pkmn[constants.HITPOINTS], pkmn[constants.MAXHP]),
+                "active": i == 0,
+                "stats": {
+                    "atk": pkmn[constants.STATS][constants.ATTACK],
+                    "def": pkmn[constants.STATS][constants.DEFENSE],
+                    "spa": pkmn[constants.STATS][constants.SPECIAL_ATTACK],
+                    "spd": pkmn[constants.STATS][constants.SPECIAL_DEFENSE],
+                    "spe": pkmn[constants.STATS][constants.SPEED],
+                },
+                "moves": [m[constants.ID] for m in pkmn[constants.MOVES]],
+                "baseAbility": pkmn[constants.ABILITY],
+                constants.REQUEST_DICT_ABILITY: pkmn[constants.ABILITY],
+                "item": pkmn[constants.ITEM] or "",
+            }
+            for i, pkmn in enumerate(self.bot_team)
+        ]
+
+    def request(self):
+        self.rqid += 1
+        request = {
+            "side": {"name": self.connection.username, "id": BOT_SIDE},
+            "rqid": self.rqid,
+        }
+        if self.team_preview:
+            request["teamPreview"] = True
+            request["side"]["pokemon"] = self.preview_request_pokemon()
+            return request
+
+        request["side"]["pokemon"] = self.request_pokemon()
+        if self.state.user.active.hp <= 0:
+            request[constants.FORCE_SWITCH] = [True]
+        else:
+            request[constants.ACTIVE] = [{
+                "moves": [
+                    {
+                        "move": all_move_json[m[constants.ID]]['name'],
+                        "id": m[constants.ID],
+                        "pp": m[constants.CURRENT_PP],
+                        "maxpp": m[constants.CURRENT_PP],
+                        "disabled": m[constants.DISABLED],
+                    }
+                    for m in self.state.user.active.moves
+                ],
+                constants.TRAPPED: self.state.user.trapped(self.state.opponent.active),
+            }]
+        return request
+
+    def start_lines(self):
+        return [
+            "|init|battle",
+            "|title|{} vs. {}".format(self.connection.username, self.connection.server.challenger_name),
+            "|j|☆{}".format(self.connection.username),
+        ]
+
+    def preview_lines(self):
+        lines = ["|clearpoke"]
+        for pkmn in self.bot_team:
+            lines.append("|poke|{}|{}|".format(BOT_SIDE, pokedex[pkmn[constants.ID]]['name']))
+        for pkmn in self.challenger_team:
+            name = pokedex[pkmn[constants.ID]]['name']
+            if pkmn[constants.LEVEL] != 100:
+                name = "{}, L{}".format(name, pkmn[constants.LEVEL])
+            lines.append("|poke|{}|{}|".format(CHALLENGER_SIDE, name))
+        lines.append("|teampreview")
+        return lines
+
+    def choose_team(self, order):
+        """Start the battle with the team order picked at team preview"""
+        try:
+            lead = self.bot_team[int(order[0]) - 1][constants.ID]
+        except (IndexError, ValueError):
+            lead = self.bot_team[0][constants.ID]
+        challenger_lead = self.random.choice(self.challenger_team)[constants.ID]
+
+        self.mutator = StateMutator(State(
+            create_side(self.bot_team, lead),
+            create_side(self.challenger_team, challenger_lead),
+            None,
+            None,
+            False
+        ))
+        self.team_preview = False
+        self.turn = 1
+        return [
+            "|",
+            "|start",
+            "|switch|{}|{}|{}".format(self.ident(constants.USER, self.state.user.active), details(self.state.user.active), condition(self.state.user.active, exact=True)),
+            "|switch|{}|{}|{}".format(self.ident(constants.OPPONENT, self.state.opponent.active), details(self.state.opponent.active), condition(self.state.opponent.active, exact=False)),
+            "|turn|1",
+        ]
+
+    def valid_options(self):
+        return self.state.get_all_options()
+
+    def play(self, bot_choice):
+        """Play out one decision, returns the protocol lines for it"""
+        lines = ["|"]
+        challenger_choice = self.random.choice(self.valid_options()[1])
+        lines += self.play_choices(bot_choice, challenger_choice)
+
+        # the challenger replaces a fainted pokemon straight away if the bot does not have to
+        while (
+            not self.finished and
+            self.state.opponent.active.hp <= 0 and
+            self.state.user.active.hp > 0
+        ):
+            lines += self.play_choices(constants.DO_NOTHING_MOVE, self.random.choice(self.valid_options()[1]))
+
+        if self.finished:
+            return lines
+
+        lines.append("|upkeep")
+        if self.state.user.active.hp > 0:
+            self.turn += 1
+            lines.append("|turn|{}".format(self.turn))
+            if self.turn > self.max_turns:
+                self.finished = True
+                lines.append("|tie")
+        return lines
+
+    def play_choices(self, bot_choice, challenger_choice):
+        lines = []
+        for side, choice in ((constants.USER, bot_choice), (constants.OPPONENT, challenger_choice)):
+            if choice != constants.DO_NOTHING_MOVE and not choice.startswith(constants.SWITCH_STRING):
+                other = constants.OPPONENT if side == constants.USER else constants.USER
+                lines.append("|move|{}|{}|{}".format(
+                    self.ident(side, self.mutator.get_side(side).active),
+                    all_move_json[choice]['name'],
+                    self.ident(other, self.mutator.get_side(other).active)
+                ))
+
+        # one of the possible outcomes is picked with it's own chance of happening
+        outcomes = [i for i in get_all_state_instructions(self.mutator, bot_choice, challenger_choice) if i.percentage > 0]
+        outcome = self.random.choices(outcomes, weights=[i.percentage for i in outcomes])[0]
+        for instruction in outcome.instructions:
+            self.mutator.apply_one(instruction)
+            lines += self.instruction_lines(instruction)
+
+        bot_defeated = side_is_defeated(self.state.user)
+        challenger_defeated = side_is_defeated(self.state.opponent)
+        if bot_defeated and challenger_defeated:
+            lines.append("|tie")
+        elif challenger_defeated:
+            lines.append("|win|{}".format(self.connection.username))
+        elif bot_defeated:
+            lines.append("|win|{}".format(self.connection.server.challenger_name))
+        self.finished = bot_defeated or challenger_defeated
+        return lines
+
+    def instruction_lines(self, instruction):
+        action, side = instruction[0], instruction[1]
+        if side not in SIDE_IDS:
+            return []
+
+        pkmn = self.mutator.get_side(side).active
+        ident = self.ident(side, pkmn)
+        exact = side == constants.USER
+        if action == constants.MUTATOR_SWITCH:
+            return ["|switch|{}|{}|{}".format(ident, details(pkmn), condition(pkmn, exact))]
+        elif action in (constants.MUTATOR_DAMAGE, constants.MUTATOR_HEAL):
+            # the engine heals by a negative amount for moves like self-destruct
+            damaged = (instruction[2] > 0) == (action == constants.MUTATOR_DAMAGE)
+            line = "|{}|{}|{}".format("-damage" if damaged else "-heal", ident, condition(pkmn, exact))
+            if pkmn.hp <= 0:
+                return [line, "|faint|{}".format(ident)]
+            return [line]
+        elif action in (constants.MUTATOR_BOOST, constants.MUTATOR_UNBOOST):
+            stat = constants.STAT_ABBREVIATION_REVERSE_LOOKUPS.get(instruction[2])
+            if stat is None or instruction[3] == 0:
+                return []
+            boost = "-boost" if (instruction[3] > 0) == (action == constants.MUTATOR_BOOST) else "-unboost"
+            return ["|{}|{}|{}|{}".format(boost, ident, stat, abs(instruction[3]))]
+        elif action == constants.MUTATOR_APPLY_STATUS:
+            return ["|-status|{}|{}".format(ident, instruction[2])]
+        elif action == constants.MUTATOR_REMOVE_STATUS:
+            return ["|-curestatus|{}|{}".format(ident, instruction[2])]
+        return []
+
+
+class LocalConnection:
+    """The server's side of one websocket"""
+
+    def __init__(self, server, websocket):
+        self.server = server
+        self.websocket = websocket
+        self.username = None
+        self.team = None
+        self.battles = dict()
+
+    async def send(self, room, lines):
+        if room:
+            lines = [">{}".format(room)] + lines
+        await self.websocket.send_str("\n".join(lines))
+
+    async def handle_frame(self, frame):
+        room, _, text = frame.partition('|')
+        for line in text.split('\n'):
+            if line.startswith('/'):
+                command, _, argument = line[1:].partition(' ')
+                await self.handle_command(room, command, argument.strip())
+
+    async def handle_command(self, room, command, argument):
+        if command == "trn":
+            self.username = argument.split(',')[0]
+            await self.send('', ["|updateuser| {}|1|1|{{}}".format(self.username)])
+        elif command == "utm":
+            self.team = None if argument == "None" else argument
+            # anyone waiting for a challenge is sent one, it is ignored by those that challenge or search
+            await self.send('', ["|pm| {}| {}|/challenge {}|{}|||".format(
+                self.server.challenger_name,
+                self.username,
+                self.server.pokemon_mode,
+                self.server.pokemon_mode
+            )])
+        elif command in ("challenge", "search", "accept"):
+            await self.start_battle()
+        elif command == "leave":
+            self.battles.pop(argument, None)
+            await self.send(argument, ["|deinit"])
+        elif command == "forfeit" and room in self.battles:
+            await self.forfeit(self.battles[room])
+        elif command in ("team", "choose", "switch") and room in self.battles:
+            choice, _, _ = argument.partition('|')
+            await self.handle_choice(self.battles[room], command, choice)
+
+    async def start_battle(self):
+        if self.team is None:
+            await self.send('', ["|popup|The local server can only play battles with a team"])
+            return
+
+        battle = self.server.create_battle(self)
+        self.battles[battle.tag] = battle
+        await self.send(battle.tag, battle.start_lines())
+        await self.send_request(battle)
+        await self.send(battle.tag, battle.preview_lines())
+
+    async def forfeit(self, battle):
+        """The bot gives up a battle when it runs into an error, which is counted separately from losses"""
+        if battle.finished:
+            return
+        logger.warning("{} was forfeited".format(battle.tag))
+        battle.finished = True
+        battle.request_sent_at = None
+        lines = ["|", "|-message|{} forfeited.".format(self.username), "|win|{}".format(self.server.challenger_name)]
+        self.server.record_result(battle, lines, error=True)
+        await self.send(battle.tag, lines)
+
+    async def send_request(self, battle):
+        await self.send(battle.tag, ["|request|{}".format(json.dumps(battle.request()))])
+        battle.request_sent_at = time.time()
+
+    async def handle_choice(self, battle, command, choice):
+        if battle.finished or battle.request_sent_at is None:
+            return
+        self.server.record_decision(time.time() - battle.request_sent_at)
+        battle.request_sent_at = None
+
+        if command == "team":
+            lines = battle.choose_team(choice)
+        else:
+            if command == "switch":
+                choice = "{} {}".format(constants.SWITCH_STRING, choice)
+            elif choice.startswith("move "):
+                # move modifiers such as mega or terastallize are not simulated
+                choice = choice.split()[1]
+
+            if choice not in battle.valid_options()[0]:
+                # a broken puzzle forfeits rather than stalling the load test
+                logger.warning("{} sent '{}' which is not a valid option, forfeiting".format(battle.tag, choice))
+                battle.finished = True
+                lines = ["|error|[Invalid choice] {}".format(choice), "|win|{}".format(self.server.challenger_name)]
+                battle.invalid_choice = True
+            else:
+                lines = battle.play(choice)
+
+        if battle.finished:
+            self.server.record_result(battle, lines, error=battle.invalid_choice)
+        else:
+            await self.send_request(battle)
+        await self.send(battle.tag, lines)
+
+
+class LocalShowdownServer:
+    """
+    Serves `/action.php` for logging in and `/showdown/websocket` for battles
+
+    :param challenger_team: the challenger's team in the export format
+    :param seed: battles are numbered, and each battle's random choices are seeded with this and it's number
+    :param max_turns: battles that run longer than this are ended in a tie
+    """
+
+    def __init__(self, challenger_team, pokemon_mode, host="127.0.0.1", port=8000, seed=0, max_turns=100, challenger_name="localchallenger"):
+        self.challenger_team = team_from_export(challenger_team)
+        self.pokemon_mode = pokemon_mode
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.max_turns = max_turns
+        self.challenger_name = challenger_name
+        self.runner = None
+
+        self.battles_started = 0
+        self.battles_finished = 0
+        self.wins = 0
+        self.errors = 0
+        self.first_battle_at = None
+        self.last_battle_at = None
+        self.decision_times = deque(maxlen=100000)
+
+    @property
+    def address(self):
+        """The value to use for WEBSOCKET_URI"""
+        return "{}:{}".format(self.host, self.port)
+
+    @property
+    def login_uri(self):
+        return "http://{}:{}/action.php".format(self.host, self.port)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/action.php", self.login)
+        app.router.add_get("/showdown/websocket", self.websocket)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info("Local server listening on {}".format(self.address))
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def login(self, request):
+        # every login succeeds
+        data = await request.post()
+        assertion = secrets.token_hex(16)
+        if data.get('act') == 'getassertion':
+            response = web.Response(text=assertion)
+        else:
+            response = web.Response(text="]" + json.dumps({"actionsuccess": True, "loggedin": True, "assertion": assertion}))
+        response.set_cookie('sid', request.cookies.get('sid') or secrets.token_hex(16))
+        return response
+
+    async def websocket(self, request):
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        connection = LocalConnection(self, websocket)
+        await websocket.send_str("|challstr|4|{}".format(secrets.token_hex(64)))
+
+        async for message in websocket:
+            if message.type != WSMsgType.TEXT:
+                break
+            try:
+                await connection.handle_frame(message.data)
+            except Exception:
+                logger.exception("Error handling '{}'".format(message.data))
+        return websocket
+
+    def create_battle(self, connection):
+        self.battles_started += 1
+        if self.first_battle_at is None:
+            self.first_battle_at = time.time()
+        return LocalBattle(
+            "battle-{}-{}".format(self.pokemon_mode, self.battles_started),
+            connection,
+            team_from_packed(connection.team),
+            self.challenger_team,
+            "{}-{}".format(self.seed, self.battles_started),
+            self.max_turns
+        )
+
+    def record_decision(self, seconds):
+        self.decision_times.append(seconds)
+
+    def record_result(self, battle, lines, error=False):
+        self.battles_finished += 1
+        self.last_battle_at = time.time()
+        if error:
+            self.errors += 1
+        elif "|win|{}".format(battle.connection.username) in lines:
+            self.wins += 1
+
+    def stats(self):
+        elapsed = (self.last_battle_at or 0) - (self.first_battle_at or 0)
+        decision_times = list(self.decision_times)
+        return {
+            "battles": self.battles_finished,
+            "wins": self.wins,
+            "errors": self.errors,
+            "elapsed": elapsed,
+            "battles_per_second": self.battles_finished / elapsed if elapsed > 0 else 0,
+            "decisions": len(decision_times),
+            "average_turn_latency": sum(decision_times) / len(decision_times) if decision_times else 0,
+            "p50_turn_latency": percentile(decision_times, 0.5),
+            "p95_turn_latency": percentile(decision_times, 0.95),
+            "max_turn_latency": max(decision_times, default=0),
+        }
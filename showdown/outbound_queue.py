@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import deque
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` sends per second on average, with bursts of up to `capacity` sends"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        # a rate of 0 or less disables rate limiting
+        if self.rate <= 0:
+            return
+
+        self.refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self.refill()
+        self.tokens -= 1
+
+
+class OutboundQueue:
+    """
+    Queues messages for the websocket and sends them from a single task
+
+    Consecutive lines for the same room are joined into one multi-line frame
+    and frames are sent no faster than the token bucket allows, so a burst of
+    messages is smoothed out instead of tripping Pokemon Showdown's throttle
+    """
+
+    def __init__(self, send_frame, rate, burst, max_lines_per_frame=3):
+        """
+        :param send_frame: coroutine function that sends one frame on the websocket
+        :param rate: frames per second, 0 disables rate limiting
+        :param burst: how many frames can be sent back-to-back before the rate applies
+        :param max_lines_per_frame: Pokemon Showdown rejects frames with too many lines
+        """
+        self.send_frame = send_frame
+        self.bucket = TokenBucket(rate, burst)
+        self.max_lines_per_frame = max(max_lines_per_frame, 1)
+        self.pending = deque()
+        self.message_added = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.error = None
+        self.task = None
+
+        self.frames_sent = 0
+        self.lines_sent = 0
+        self.total_latency = 0
+        self.max_latency = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def raise_if_failed(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def put(self, room, line):
+        self.raise_if_failed()
+        self.pending.append((room, line, time.monotonic()))
+        self.drained.clear()
+        self.message_added.set()
+        self.start()
+
+    def next_frame(self):
+        room, line, enqueued_at = self.pending.popleft()
+        lines = [line]
+        enqueue_times = [enqueued_at]
+        while self.pending and len(lines) < self.max_lines_per_frame and self.pending[0][0] == room:
+            _, line, enqueued_at = self.pending.popleft()
+            lines.append(line)
+            enqueue_times.append(enqueued_at)
+
+        return room + "|" + "\n".join(lines), enqueue_times
+
+    async def run(self):
+        while True:
+            if not self.pending:
+                self.drained.set()
+                self.message_added.clear()
+                await self.message_added.wait()
+                continue
+
+            await self.bucket.acquire()
+            frame, enqueue_times = self.next_frame()
+            try:
+                await self.send_frame(frame)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Could not send '{}': {}".format(frame, e))
+                self.error = e
+                continue
+
+            now = time.monotonic()
+            self.frames_sent += 1
+            self.lines_sent += len(enqueue_times)
+            for enqueued_at in enqueue_times:
+                latency = now - enqueued_at
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+    async def flush(self):
+        await self.drained.wait()
+        self.raise_if_failed()
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def stats(self):
+        return {
+            "depth": len(self.pending),
+            "frames_sent": self.frames_sent,
+            "lines_sent": self.lines_sent,
+            "average_latency": self.total_latency / self.lines_sent if self.lines_sent else 0,
+            "max_latency": self.max_latency
+        }
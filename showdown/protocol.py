@@ -0,0 +1,92 @@
+"""
+Tokenizer for the Pokemon Showdown battle protocol
+
+A websocket frame looks like:
+    >battle-gen9ou-12345
+    |move|p1a: Pikachu|Thunderbolt|p2a: Gyarados
+    |-damage|p2a: Gyarados|0 fnt
+
+Each frame is parsed once into a ProtocolFrame holding the room and one
+ProtocolEvent per protocol line. Only the action of a line is read up front,
+the line is split into it's arguments the first time they are needed
+"""
+
+
+class ProtocolEvent:
+    __slots__ = ("line", "action", "_split_msg")
+
+    def __init__(self, line, action):
+        self.line = line
+        self.action = action
+        self._split_msg = None
+
+    @property
+    def split_msg(self):
+        """The line split on `|`, indexed the same way the battle_modifier functions expect"""
+        if self._split_msg is None:
+            self._split_msg = self.line.split('|')
+        return self._split_msg
+
+    @property
+    def args(self):
+        return self.split_msg[2:]
+
+    def __repr__(self):
+        return "ProtocolEvent({})".format(self.line)
+
+
+class ProtocolFrame:
+    __slots__ = ("raw", "room", "events")
+
+    def __init__(self, raw, room, events):
+        self.raw = raw
+        self.room = room
+        self.events = events
+
+    def first(self, action):
+        """Returns the first event with the given action, or None"""
+        for event in self.events:
+            if event.action == action:
+                return event
+        return None
+
+    def has(self, action):
+        return self.first(action) is not None
+
+    def events_after(self, action):
+        """Returns the events following the last event with the given action"""
+        for i in range(len(self.events) - 1, -1, -1):
+            if self.events[i].action == action:
+                return self.events[i + 1:]
+        return []
+
+    def __repr__(self):
+        return "ProtocolFrame({}, {} events)".format(self.room, len(self.events))
+
+
+def parse_event(line):
+    """Returns a ProtocolEvent for a protocol line, or None if the line has no action"""
+    start = line.find('|')
+    if start == -1:
+        return None
+
+    end = line.find('|', start + 1)
+    action = line[start + 1:] if end == -1 else line[start + 1:end]
+    return ProtocolEvent(line, action.strip())
+
+
+def parse_frame(raw):
+    lines = raw.split('\n')
+
+    room = ''
+    if lines[0].startswith('>'):
+        room = lines[0][1:].strip()
+        lines = lines[1:]
+
+    events = []
+    for line in lines:
+        event = parse_event(line)
+        if event is not None:
+            events.append(event)
+
+    return ProtocolFrame(raw, room, events)
@@ -2,8 +2,10 @@ import logging
 
 import constants
 
+from config import ShowdownConfig
 from showdown.battle import Battle
 from showdown.engine.objects import StateMutator
+from showdown.engine.payoff_matrix import SampledPayoffs
 from showdown.engine.select_best_move import pick_safest
 from showdown.engine.select_best_move import get_payoff_matrix
 
@@ -43,29 +45,37 @@ def format_decision(battle: Battle, decision, switch = False, **kwargs):
     return [message, str(battle.rqid)]
 
 
-def prefix_opponent_move(score_lookup, prefix):
-    new_score_lookup = dict()
-    for k, v in score_lookup.items():
-        bot_move, opponent_move = k
-        new_opponent_move = "{}_{}".format(opponent_move, prefix)
-        new_score_lookup[(bot_move, new_opponent_move)] = v
+def sample_aggregation():
+    return getattr(ShowdownConfig, 'sample_aggregation', constants.SAMPLES_WORST_CASE)
 
-    return new_score_lookup
+
+def aggregate_samples(payoff_matrices, aggregation):
+    """Combines the payoff matrices of sampled battles, which are all equally likely, into the one the bot picks from"""
+    samples = SampledPayoffs(payoff_matrices)
+    if aggregation == constants.SAMPLES_EXPECTED:
+        return samples.expectation()
+    elif aggregation == constants.SAMPLES_WORST_CASE:
+        return samples.worst_case()
+    raise ValueError("Unknown aggregation: {}".format(aggregation))
 
 
 def pick_safest_move_from_battles(battles):
-    all_scores = dict()
-    for i, b in enumerate(battles):
+    """
+    The battles are combined with `SAMPLE_AGGREGATION`: `constants.SAMPLES_WORST_CASE` picks the move with the
+    best worst case over every battle, and `constants.SAMPLES_EXPECTED` picks it from the average of the battles' scores
+    """
+    aggregation = sample_aggregation()
+    # pruning keeps the scores that the worst case needs, but not every score that is averaged
+    prune = aggregation == constants.SAMPLES_WORST_CASE
+    payoff_matrices = []
+    for b in battles:
         state = b.create_state()
         mutator = StateMutator(state)
         user_options, opponent_options = b.get_all_options()
         logger.debug("Searching through the state: {}".format(mutator.state))
-        scores = get_payoff_matrix(mutator, user_options, opponent_options, prune=True)
-
-        prefixed_scores = prefix_opponent_move(scores, str(i))
-        all_scores = {**all_scores, **prefixed_scores}
+        payoff_matrices.append(get_payoff_matrix(mutator, user_options, opponent_options, prune=prune))
 
-    decision, payoff = pick_safest(all_scores, remove_guaranteed=True)
+    decision, payoff = pick_safest(aggregate_samples(payoff_matrices, aggregation), remove_guaranteed=True)
     bot_choice = decision[0]
     logger.debug("Safest: {}, {}".format(bot_choice, payoff))
     return bot_choice
@@ -74,25 +84,27 @@ def pick_safest_move_from_battles(battles):
 def pick_safest_move_using_dynamic_search_depth(battles):
     """
     Dynamically decides how far to look into the game.
+    Several battles are combined like in `pick_safest_move_from_battles`
 
     This requires a strong computer to be able to search 3/4 turns ahead.
     Using a pypy interpreter will also result in better performance.
 
     """
-    all_scores = dict()
     num_battles = len(battles)
 
     if num_battles > 1:
         search_depth = 2
+        aggregation = sample_aggregation()
+        prune = aggregation == constants.SAMPLES_WORST_CASE
 
-        for i, b in enumerate(battles):
+        payoff_matrices = []
+        for b in battles:
             state = b.create_state()
             mutator = StateMutator(state)
             user_options, opponent_options = b.get_all_options()
             logger.debug("Searching through the state: {}".format(mutator.state))
-            scores = get_payoff_matrix(mutator, user_options, opponent_options, depth=search_depth, prune=True)
-            prefixed_scores = prefix_opponent_move(scores, str(i))
-            all_scores = {**all_scores, **prefixed_scores}
+            payoff_matrices.append(get_payoff_matrix(mutator, user_options, opponent_options, depth=search_depth, prune=prune))
+        payoff_matrix = aggregate_samples(payoff_matrices, aggregation)
 
     elif num_battles == 1:
         search_depth = 3
@@ -114,12 +126,12 @@ def pick_safest_move_using_dynamic_search_depth(battles):
         logger.debug("My Options: {}".format(user_options))
         logger.debug("Opponent Options: {}".format(opponent_options))
         logger.debug("Search depth: {}".format(search_depth))
-        all_scores = get_payoff_matrix(mutator, user_options, opponent_options, depth=search_depth, prune=True)
+        payoff_matrix = get_payoff_matrix(mutator, user_options, opponent_options, depth=search_depth, prune=True)
 
     else:
         raise ValueError("less than 1 battle?: {}".format(battles))
 
-    decision, payoff = pick_safest(all_scores, remove_guaranteed=True)
+    decision, payoff = pick_safest(payoff_matrix, remove_guaranteed=True)
     bot_choice = decision[0]
     logger.debug("Safest: {}, {}".format(bot_choice, payoff))
     logger.debug("Depth: {}".format(search_depth))
@@ -16,6 +16,31 @@ class PuzzleRunner(Battle):
         self.repeat_until_faint = False
         self.default_switch: str
 
+    def resume(self):
+        """
+        Returns a new PuzzleRunner for the same battle that knows nothing about the battle's state
+        but continues from this PuzzleRunner's position in the puzzle commands
+
+        Used to rebuild the battle from the room's log after the websocket reconnects
+        """
+        battle = PuzzleRunner(self.commands, self.battle_tag)
+        battle.battle_type = self.battle_type
+        battle.generation = self.generation
+        battle.request_json = self.request_json
+        battle.rqid = self.rqid
+        battle.opponent.name = self.opponent.name
+        battle.opponent.account_name = self.opponent.account_name
+
+        battle.n_commands = self.n_commands
+        battle.n_repeated_commands = self.n_repeated_commands
+        battle.repeat_until_faint = self.repeat_until_faint
+        if hasattr(self, 'repeated_commands'):
+            battle.repeated_commands = self.repeated_commands
+        if hasattr(self, 'default_switch'):
+            battle.default_switch = self.default_switch
+
+        return battle
+
     def find_best_move(self):
         # Setting lead pokemon
         if self.n_commands == 0 and self.commands[0]['action'] == constants.SET_SWITCH:
@@ -0,0 +1,364 @@
+"""
+Checks whether a puzzle can be beaten without playing it on Pokemon Showdown
+
+The bot's side follows the puzzle commands, the same way a PuzzleRunner would in a live battle,
+while every option of the challenger's side is searched. A puzzle has a forced win if there is
+a line for the challenger that wins against the scripted bot no matter how the random parts
+of the battle (accuracy, secondary effects, etc.) turn out
+"""
+import os
+from collections import defaultdict
+from collections import namedtuple
+from copy import copy
+from copy import deepcopy
+from multiprocessing import Pool
+
+import logging
+
+import constants
+from showdown.battle import Pokemon
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import StateMutator
+from showdown.engine.objects import Pokemon as TransposePokemon
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.switch_out_moves import SwitchCache
+from puzzles.load_puzzle import PUZZLE_DIR
+from puzzles.load_puzzle import variant_paths
+from puzzles.puzzle_parser import get_puzzle_commands
+from puzzles.team_converter import single_pokemon_export_to_dict
+from puzzles.team_converter import packed_to_dicts
+
+logger = logging.getLogger(__name__)
+
+
+# a turn of the line that was found, the random outcome followed is the most likely one
+Turn = namedtuple('Turn', ['bot_choice', 'challenger_choice'])
+
+FORCED_WIN = "forced win"
+NO_FORCED_WIN = "no forced win"
+UNKNOWN = "unknown"
+SCRIPT_ERROR = "script error"
+# a file the puzzle needs is missing, so there is nothing to verify
+SKIPPED = "skipped"
+
+VerificationResult = namedtuple('VerificationResult', ['puzzle', 'team', 'challenger', 'result', 'line', 'nodes', 'message'])
+
+
+class PuzzleScriptError(ValueError):
+    """The puzzle commands ask for something the bot could not do in a live battle"""
+    line = None
+
+
+class SearchBudgetExceeded(Exception):
+    pass
+
+
+class CommandCursor:
+    """
+    The bot's position in the puzzle commands
+
+    This follows the same rules as PuzzleRunner.find_best_move, but works on an engine State
+    and returns a new cursor instead of changing itself, so every branch of the search keeps its own position
+    Move modifiers (mega, tera, etc.) are not modelled by the engine and are ignored
+    """
+
+    __slots__ = ('commands', 'n_commands', 'repeat_until_faint', 'repeated_commands', 'n_repeated_commands', 'default_switch')
+
+    def __init__(self, commands):
+        self.commands = commands
+        self.n_commands = 0
+        self.repeat_until_faint = False
+        self.repeated_commands = None
+        self.n_repeated_commands = 0
+        self.default_switch = None
+
+    def lead(self):
+        if self.commands and self.commands[0]['action'] == constants.SET_SWITCH:
+            return self.commands[0]['pokemon']
+        return None
+
+    def decide(self, state):
+        """Returns the bot's choice for the state and the cursor after making it"""
+        cursor = copy(self)
+        choice = cursor.find_choice(state)
+        return choice, cursor
+
+    def find_choice(self, state):
+        if self.n_commands == 0 and self.lead() is not None:
+            self.default_switch = self.lead()
+
+        if state.user.active.hp <= 0:
+            self.repeat_until_faint = False
+            return self.validate(state, "{} {}".format(constants.SWITCH_STRING, self.default_switch), force_switch=True)
+        elif self.repeat_until_faint:
+            return self.evaluate_repeated_commands(state)
+        else:
+            return self.evaluate_normal_commands(state)
+
+    def evaluate_normal_commands(self, state):
+        n, choice = self.evaluate_commands(state, self.commands[self.n_commands:])
+        self.n_commands += n
+        return choice
+
+    def evaluate_repeated_commands(self, state):
+        start = self.n_repeated_commands % len(self.repeated_commands)
+        n, choice = self.evaluate_commands(state, self.repeated_commands[start:] + self.repeated_commands)
+        self.n_repeated_commands += n
+        return choice
+
+    def evaluate_commands(self, state, commands):
+        n = 0
+        for command in commands:
+            n += 1
+            if command['action'] == constants.MOVE:
+                return n, self.validate(state, command['move'])
+            elif command['action'] == constants.SWITCH:
+                return n, self.validate(state, "{} {}".format(constants.SWITCH_STRING, command['pokemon']))
+            elif command['action'] == constants.SET_SWITCH:
+                self.default_switch = command['pokemon']
+            elif command['action'] == constants.REPEAT_UNTIL_FAINT:
+                self.repeat_until_faint = True
+                self.n_repeated_commands = 0
+                self.repeated_commands = command['commands']
+                return n, self.evaluate_repeated_commands(state)
+
+        raise PuzzleScriptError("The puzzle ran out of commands")
+
+    @staticmethod
+    def validate(state, choice, force_switch=False):
+        if choice not in state.get_self_options(force_switch):
+            raise PuzzleScriptError("'{}' is not a valid option at this time".format(choice))
+        return choice
+
+
+def pokemon_from_dict(pkmn_dict):
+    """Returns the state dictionary of a pokemon given by `single_pokemon_export_to_dict` or `packed_to_dicts`"""
+    evs = tuple(
+        int(pkmn_dict['evs'][stat] or 0)
+        for stat in ('hp', 'atk', 'def', 'spa', 'spd', 'spe')
+    )
+    pkmn = Pokemon(
+        pkmn_dict['species'] or pkmn_dict['name'],
+        int(pkmn_dict['level'] or 100),
+        nature=pkmn_dict['nature'] or 'serious',
+        evs=evs
+    )
+    pkmn.ability = pkmn_dict['ability'] or None
+    pkmn.item = pkmn_dict['item']
+    for move in pkmn_dict['moves']:
+        pkmn.add_move(move)
+
+    return pkmn.to_dict()
+
+
+def pokemon_from_export(pkmn_export_string):
+    """Returns the state dictionary of a pokemon in the Pokemon Showdown export format"""
+    return pokemon_from_dict(single_pokemon_export_to_dict(pkmn_export_string))
+
+
+def team_from_export(export_string):
+    return [pokemon_from_export(pkmn) for pkmn in export_string.split('\n\n') if pkmn.strip()]
+
+
+def team_from_packed(packed_team):
+    return [pokemon_from_dict(pkmn_dict) for pkmn_dict in packed_to_dicts(packed_team)]
+
+
+def create_side(team, lead):
+    # the dictionaries are copied because the engine changes the pokemon's moves in-place
+    team = [TransposePokemon.from_state_pokemon_dict(deepcopy(pkmn)) for pkmn in team]
+    active = next(pkmn for pkmn in team if pkmn.id == lead)
+    reserve = {pkmn.id: pkmn for pkmn in team if pkmn is not active}
+    return Side(active, reserve, (0, 0), defaultdict(lambda: 0), (0, 0))
+
+
+def side_is_defeated(side):
+    return side.active.hp <= 0 and not any(pkmn.hp > 0 for pkmn in side.reserve.values())
+
+
+class PuzzleVerifier:
+    """Searches for a forced win for the challenger against the puzzle's commands"""
+
+    def __init__(self, commands, max_turns=20, max_nodes=200000):
+        self.commands = commands
+        self.max_turns = max_turns
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+        # the turns leading to the state being searched
+        self.path = []
+
+    def verify(self, bot_team, challenger_team):
+        """
+        :param bot_team: the pokemon dictionaries of the side running the puzzle
+        :param challenger_team: the pokemon dictionaries of the side trying to beat it
+        :return: the result and the line that was found
+        """
+        cursor = CommandCursor(self.commands)
+        bot_lead = cursor.lead() or bot_team[0][constants.ID]
+        if bot_lead not in [pkmn[constants.ID] for pkmn in bot_team]:
+            raise PuzzleScriptError("The lead '{}' is not on the puzzle's team".format(bot_lead))
+
+        # the challenger picks any lead at team preview
+        for challenger_lead in [pkmn[constants.ID] for pkmn in challenger_team]:
+            self.path = [Turn(None, "{} {}".format(constants.SWITCH_STRING, challenger_lead))]
+            state = State(
+                create_side(bot_team, bot_lead),
+                create_side(challenger_team, challenger_lead),
+                None,
+                None,
+                False
+            )
+            line = self.search(StateMutator(state), cursor, self.max_turns)
+            if line is not None:
+                return [Turn(None, "{} {}".format(constants.SWITCH_STRING, challenger_lead))] + line
+
+        return None
+
+    def search(self, mutator, cursor, turns_left):
+        """Returns the challenger's winning line from this state, or None if there is no forced win"""
+        state = mutator.state
+        if side_is_defeated(state.user):
+            return []
+        if side_is_defeated(state.opponent) or turns_left == 0:
+            return None
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchBudgetExceeded()
+
+        # the bot only makes a decision when the server would ask it for one
+        if state.opponent.active.hp <= 0 and state.user.active.hp > 0:
+            bot_choice = constants.DO_NOTHING_MOVE
+        else:
+            try:
+                bot_choice, cursor = cursor.decide(state)
+            except PuzzleScriptError as e:
+                e.line = list(self.path)
+                raise
+
+        for challenger_choice in self.ordered_challenger_options(mutator, bot_choice):
+            line = self.search_choices(mutator, cursor, turns_left, bot_choice, challenger_choice)
+            if line is not None:
+                return [Turn(bot_choice, challenger_choice)] + line
+
+        return None
+
+    def search_choices(self, mutator, cursor, turns_left, bot_choice, challenger_choice):
+        # every random outcome has to be a win for the challenger
+        most_likely_line = None
+        most_likely_percentage = -1
+        for instructions in get_all_state_instructions(mutator, bot_choice, challenger_choice):
+            if instructions.percentage <= 0:
+                continue
+
+            mutator.apply(instructions.instructions)
+            self.path.append(Turn(bot_choice, challenger_choice))
+            try:
+                line = self.search(mutator, cursor, turns_left - 1)
+            finally:
+                self.path.pop()
+                mutator.reverse(instructions.instructions)
+
+            if line is None:
+                return None
+            if instructions.percentage > most_likely_percentage:
+                most_likely_line = line
+                most_likely_percentage = instructions.percentage
+
+        return most_likely_line
+
+    @staticmethod
+    def ordered_challenger_options(mutator, bot_choice):
+        # options that look worst for the bot are tried first
+        _, challenger_options = mutator.state.get_all_options()
+        if len(challenger_options) == 1:
+            return challenger_options
+
+        scores = get_payoff_matrix(mutator, [bot_choice], challenger_options, depth=1, prune=False)
+        return sorted(challenger_options, key=lambda o: scores.get((bot_choice, o), 0))
+
+
+def read_file(path):
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def puzzle_file_paths(name, kind, puzzle_dir=PUZZLE_DIR):
+    path = os.path.join(puzzle_dir, name, kind)
+    if os.path.isdir(path):
+        return sorted(variant_paths(path))
+    elif os.path.isfile(path):
+        return [path]
+    return []
+
+
+def verify_puzzle(name, challenger_path=None, max_turns=20, max_nodes=200000, puzzle_dir=PUZZLE_DIR, default_challenger_path=None):
+    """
+    Verify every team variant of a puzzle against every challenger team variant
+    The challenger's team is read from `challenger_path` if it is given, then the puzzle's `challenger` file,
+    then `default_challenger_path`
+    """
+    challenger_paths = [challenger_path] if challenger_path else puzzle_file_paths(name, "challenger", puzzle_dir)
+    if not challenger_paths and default_challenger_path:
+        challenger_paths = [default_challenger_path]
+    if not challenger_paths:
+        return [VerificationResult(name, None, None, SKIPPED, None, 0, "No challenger team for this puzzle")]
+
+    puzzle_paths = puzzle_file_paths(name, "puzzle", puzzle_dir)
+    if not puzzle_paths:
+        return [VerificationResult(name, None, None, SKIPPED, None, 0, "No puzzle file")]
+    team_paths = puzzle_file_paths(name, "team", puzzle_dir)
+    if not team_paths:
+        return [VerificationResult(name, None, None, SKIPPED, None, 0, "No team file")]
+
+    SwitchCache.clear()
+    try:
+        commands = get_puzzle_commands(read_file(puzzle_paths[0]))
+    except (ValueError, SyntaxError) as e:
+        return [VerificationResult(name, None, None, SCRIPT_ERROR, None, 0, str(e))]
+
+    results = []
+    for team_path in team_paths:
+        for path in challenger_paths:
+            verifier = PuzzleVerifier(commands, max_turns=max_turns, max_nodes=max_nodes)
+            line = None
+            message = ""
+            try:
+                line = verifier.verify(team_from_export(read_file(team_path)), team_from_export(read_file(path)))
+                result = FORCED_WIN if line is not None else NO_FORCED_WIN
+            except PuzzleScriptError as e:
+                result, message, line = SCRIPT_ERROR, str(e), e.line
+            except SearchBudgetExceeded:
+                result, message = UNKNOWN, "Searched {} states without finishing".format(max_nodes)
+
+            results.append(VerificationResult(name, team_path, path, result, line, verifier.nodes, message))
+
+    SwitchCache.log_stats()
+    return results
+
+
+def _init_worker(pokemon_mode, damage_calc_type):
+    # worker processes start with the data dictionaries unmodified
+    from config import ShowdownConfig
+    from data.mods.apply_mods import apply_mods
+
+    ShowdownConfig.pokemon_mode = pokemon_mode
+    ShowdownConfig.damage_calc_type = damage_calc_type
+    apply_mods(pokemon_mode)
+
+
+def _verify_puzzle_star(args):
+    return verify_puzzle(*args)
+
+
+def verify_puzzles(names, pokemon_mode, challenger_path=None, max_turns=20, max_nodes=200000, processes=None, damage_calc_type="average", default_challenger_path=None):
+    """Verify each puzzle in it's own worker process"""
+    with Pool(processes, initializer=_init_worker, initargs=(pokemon_mode, damage_calc_type)) as pool:
+        results = pool.map(
+            _verify_puzzle_star,
+            [(name, challenger_path, max_turns, max_nodes, PUZZLE_DIR, default_challenger_path) for name in names]
+        )
+    return [r for puzzle_results in results for r in puzzle_results]
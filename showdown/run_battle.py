@@ -6,13 +6,16 @@ from copy import deepcopy
 import logging
 
 import data
-from data.helpers import get_standard_battle_sets
 import constants
 from config import ShowdownConfig
 from showdown.engine.evaluate import Scoring
+from showdown.engine.search_cache import scoring_changed
+from showdown.engine.switch_out_moves import SwitchCache
 from showdown.battle import Pokemon
 from showdown.battle import LastUsedMove
 from showdown.battle_modifier import async_update_battle
+from showdown.battle_modifier import update_battle_from_events
+from showdown.protocol import parse_frame
 from showdown.puzzle_runner.puzzle_runner import PuzzleRunner
 
 from showdown.websocket_client import PSWebsocketClient
@@ -20,14 +23,26 @@ from showdown.websocket_client import PSWebsocketClient
 logger = logging.getLogger(__name__)
 
 
-def battle_is_finished(battle_tag, msg):
+async def receive_frame(ps_websocket_client: PSWebsocketClient):
+    return parse_frame(await ps_websocket_client.receive_message())
+
+
+def battle_is_finished(battle_tag, frame):
     return (
-        msg.startswith(">{}".format(battle_tag)) and
-        (constants.WIN_STRING in msg or constants.TIE_STRING in msg) and
-        constants.CHAT_STRING not in msg
+        frame.room == battle_tag and
+        (frame.has('win') or frame.has('tie')) and
+        not frame.has('c')
     )
 
 
+def is_hint_request(frame, hints):
+    # a hint is given when the first line of the message is a chat message asking for one
+    if not frame.events or len(hints) == 0:
+        return False
+    event = frame.events[0]
+    return event.action == 'c' and len(event.args) > 1 and 'hint' in event.args[1]
+
+
 async def async_pick_move(battle):
     best_move = battle.find_best_move()
     choice = best_move[0]
@@ -60,23 +75,21 @@ async def handle_team_preview(battle, ps_websocket_client):
 
 async def get_battle_tag_and_opponent(ps_websocket_client: PSWebsocketClient):
     while True:
-        msg = await ps_websocket_client.receive_message()
-        split_msg = msg.split('|')
-        first_msg = split_msg[0]
-        if 'battle' in first_msg:
-            battle_tag = first_msg.replace('>', '').strip()
-            user_name = split_msg[-1].replace('☆', '').strip()
-            opponent_name = split_msg[4].replace(user_name, '').replace('vs.', '').strip()
-            return battle_tag, opponent_name
+        frame = await receive_frame(ps_websocket_client)
+        title = frame.first('title')
+        if 'battle' in frame.room and title is not None:
+            user_name = frame.events[-1].split_msg[-1].replace('☆', '').strip()
+            opponent_name = title.args[0].replace(user_name, '').replace('vs.', '').strip()
+            return frame.room, opponent_name
 
 
 async def initialize_battle_with_tag(ps_websocket_client: PSWebsocketClient, puzzle_commands, set_request_json=True):
     battle_tag, opponent_name = await get_battle_tag_and_opponent(ps_websocket_client)
     while True:
-        msg = await ps_websocket_client.receive_message()
-        split_msg = msg.split('|')
-        if split_msg[1].strip() == 'request' and split_msg[2].strip():
-            user_json = json.loads(split_msg[2].strip('\''))
+        frame = await receive_frame(ps_websocket_client)
+        request = frame.events[0] if frame.events else None
+        if request is not None and request.action == 'request' and request.args[0].strip():
+            user_json = json.loads(request.args[0].strip('\''))
             user_id = user_json[constants.SIDE][constants.ID]
             opponent_id = constants.ID_LOOKUP[user_id]
             battle = PuzzleRunner(puzzle_commands, battle_tag)
@@ -93,15 +106,14 @@ async def read_messages_until_first_pokemon_is_seen(ps_websocket_client, battle,
     # keep reading messages until the opponent's first pokemon is seen
     # this is run when starting non team-preview battles
     while True:
-        msg = await ps_websocket_client.receive_message()
-        if constants.START_STRING in msg:
-            split_msg = msg.split(constants.START_STRING)[-1].split('\n')
-            for line in split_msg:
-                if opponent_id in line and constants.SWITCH_STRING in line:
-                    battle.start_non_team_preview_battle(user_json, line)
+        frame = await receive_frame(ps_websocket_client)
+        if frame.has('start'):
+            for event in frame.events_after('start'):
+                if event.action == constants.SWITCH_STRING and opponent_id in event.line:
+                    battle.start_non_team_preview_battle(user_json, event.line)
 
                 elif battle.started:
-                    await async_update_battle(battle, line)
+                    update_battle_from_events(battle, [event])
 
             # first move needs to be picked here
             best_move = await async_pick_move(battle)
@@ -128,20 +140,15 @@ async def start_standard_battle(ps_websocket_client: PSWebsocketClient, pokemon_
     if battle.generation in constants.NO_TEAM_PREVIEW_GENS:
         await read_messages_until_first_pokemon_is_seen(ps_websocket_client, battle, opponent_id, user_json)
     else:
-        msg = ''
-        while constants.START_TEAM_PREVIEW not in msg:
-            msg = await ps_websocket_client.receive_message()
-
-        preview_string_lines = msg.split(constants.START_TEAM_PREVIEW)[-1].split('\n')
-
-        opponent_pokemon = []
-        for line in preview_string_lines:
-            if not line:
-                continue
+        frame = await receive_frame(ps_websocket_client)
+        while not frame.has(constants.START_TEAM_PREVIEW):
+            frame = await receive_frame(ps_websocket_client)
 
-            split_line = line.split('|')
-            if split_line[1] == constants.TEAM_PREVIEW_POKE and split_line[2].strip() == opponent_id:
-                opponent_pokemon.append(split_line[3])
+        opponent_pokemon = [
+            event.args[1]
+            for event in frame.events_after(constants.START_TEAM_PREVIEW)
+            if event.action == constants.TEAM_PREVIEW_POKE and event.args[0].strip() == opponent_id
+        ]
 
         battle.initialize_team_preview(user_json, opponent_pokemon, pokemon_battle_type)
         battle.during_team_preview()
@@ -152,8 +159,11 @@ async def start_standard_battle(ps_websocket_client: PSWebsocketClient, pokemon_
 
 
 async def start_battle(ps_websocket_client: PSWebsocketClient, pokemon_battle_type, puzzle_commands):
+    # positions from other battles are not seen again
+    SwitchCache.clear()
     if "random" in pokemon_battle_type:
         Scoring.POKEMON_ALIVE_STATIC = 30  # random battle benefits from a lower static score for an alive pkmn
+        scoring_changed()
         battle = await start_random_battle(ps_websocket_client, pokemon_battle_type)
     else:
         battle = await start_standard_battle(ps_websocket_client, pokemon_battle_type, puzzle_commands)
@@ -163,36 +173,92 @@ async def start_battle(ps_websocket_client: PSWebsocketClient, pokemon_battle_ty
     return battle
 
 
+def battle_is_resuming(ps_websocket_client: PSWebsocketClient, battle, frame):
+    # after reconnecting, the server replays the whole log of each battle room that is rejoined
+    init = frame.first('init')
+    return (
+        battle.battle_tag in ps_websocket_client.resumed_rooms and
+        frame.room == battle.battle_tag and
+        init is not None and
+        init.args[0] == 'battle'
+    )
+
+
+def resume_battle(battle, room_log, pokemon_battle_type):
+    """Rebuild the battle from the room's log, keeping the bot's position in the puzzle commands"""
+    if battle.request_json is None:
+        logger.warning("Cannot rebuild {} without a request from the server, continuing with the current battle".format(battle.battle_tag))
+        return battle
+
+    resumed = battle.resume()
+    events = room_log.events
+
+    if resumed.generation in constants.NO_TEAM_PREVIEW_GENS:
+        for i, event in enumerate(events):
+            if event.action == constants.SWITCH_STRING and resumed.opponent.name in event.line:
+                resumed.start_non_team_preview_battle(resumed.request_json, event.line)
+                events = events[i + 1:]
+                break
+        else:
+            logger.warning("The opponent's first pokemon is not in the log for {}, continuing with the current battle".format(battle.battle_tag))
+            return battle
+    else:
+        opponent_pokemon = [
+            event.args[1]
+            for event in events
+            if event.action == constants.TEAM_PREVIEW_POKE and len(event.args) > 1 and event.args[0].strip() == resumed.opponent.name
+        ]
+        resumed.initialize_team_preview(resumed.request_json, opponent_pokemon, pokemon_battle_type)
+
+    # `update_battle` stops at the end of a turn, so the log is replayed one event at a time
+    for event in events:
+        if event.action != 'request':
+            update_battle_from_events(resumed, [event])
+
+    logger.info("Resumed {} on turn {}".format(resumed.battle_tag, resumed.turn))
+    return resumed
+
+
 async def pokemon_battle(ps_websocket_client: PSWebsocketClient, pokemon_battle_type, puzzle_commands, hints):
     battle = await start_battle(ps_websocket_client, pokemon_battle_type, puzzle_commands)
     n_hints = 0
+    last_decision_rqid = None
+    awaiting_resumed_request = False
     while True:
-        msg: str = await ps_websocket_client.receive_message()
-
-        try:
-            split_message = msg.splitlines()[1].split('|')
-            hint_message = split_message[3]
-            hint = split_message[1] == 'c' and 'hint' in hint_message and len(hints) != 0
-        except Exception as e:
-            hint = False
-
-        if battle_is_finished(battle.battle_tag, msg):
-            if constants.WIN_STRING in msg:
-                winner = msg.split(constants.WIN_STRING)[-1].split('\n')[0].strip()
-            else:
-                winner = None
+        frame = await receive_frame(ps_websocket_client)
+
+        if battle_is_resuming(ps_websocket_client, battle, frame):
+            ps_websocket_client.resumed_rooms.discard(battle.battle_tag)
+            battle = resume_battle(battle, frame, pokemon_battle_type)
+            awaiting_resumed_request = True
+            continue
+
+        if battle_is_finished(battle.battle_tag, frame):
+            win = frame.first('win')
+            winner = win.args[0].strip() if win is not None else None
             logger.debug("Winner: {}".format(winner))
+            SwitchCache.log_stats()
             await ps_websocket_client.send_message(battle.battle_tag, ["gg"])
             await ps_websocket_client.leave_battle(battle.battle_tag, save_replay=ShowdownConfig.save_replay)
             return winner
-        elif '-crit' in msg.split('|'):
+        elif frame.has('-crit'):
             await ps_websocket_client.send_message(battle.battle_tag, ["Critical hit detected - aborting puzzle"])
             await ps_websocket_client.leave_battle(battle.battle_tag, save_replay=ShowdownConfig.save_replay)
-        elif hint:
+        elif is_hint_request(frame, hints):
             await ps_websocket_client.send_message(battle.battle_tag, [hints[n_hints % len(hints)]])
             n_hints += 1
+        elif awaiting_resumed_request and frame.has('request'):
+            # the server re-sends the current request after a battle room is rejoined
+            # a decision is only needed if the one for this request was not already sent
+            awaiting_resumed_request = False
+            await async_update_battle(battle, frame)
+            if not battle.wait and battle.rqid != last_decision_rqid:
+                best_move = await async_pick_move(battle)
+                await ps_websocket_client.send_message(battle.battle_tag, best_move)
+                last_decision_rqid = battle.rqid
         else:
-            action_required = await async_update_battle(battle, msg)
+            action_required = await async_update_battle(battle, frame)
             if action_required and not battle.wait:
                 best_move = await async_pick_move(battle)
                 await ps_websocket_client.send_message(battle.battle_tag, best_move)
+                last_decision_rqid = battle.rqid
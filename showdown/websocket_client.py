@@ -1,9 +1,12 @@
 import asyncio
+import random
 import websockets
-import requests
+import aiohttp
 import json
 import time
 
+from showdown.outbound_queue import OutboundQueue
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,10 @@ class SaveReplayError(Exception):
     pass
 
 
+class ReconnectError(Exception):
+    pass
+
+
 class PSWebsocketClient:
 
     websocket = None
@@ -25,33 +32,174 @@ class PSWebsocketClient:
     password = None
     last_message = None
     last_challenge_time = 0
+    http_session = None
+    owns_http_session = False
+    login_timeout = None
+    sid = None
+    rooms = None
+    resumed_rooms = None
+    reconnect_attempts = 0
+    reconnect_max_delay = 0
+    reconnecting = False
+    reconnected = None
+    reconnect_task = None
+    closing = False
+    outbound_queue = None
 
     @classmethod
-    async def create(cls, username, password, address):
+    async def create(
+        cls,
+        username,
+        password,
+        address,
+        login_uri=None,
+        http_session=None,
+        login_timeout=10,
+        reconnect_attempts=10,
+        reconnect_max_delay=60,
+        message_rate_limit=0,
+        message_burst=1,
+        message_lines_per_frame=3
+    ):
+        """
+        :param http_session: an aiohttp.ClientSession used to talk to the login server
+                             it may be shared between clients, so it should not keep cookies
+        :param login_timeout: seconds before a request to the login server is abandoned
+        :param reconnect_attempts: how many times to try reconnecting after the websocket drops
+        :param reconnect_max_delay: the longest time in seconds to back-off between reconnect attempts
+        :param message_rate_limit: the most messages per second to send, 0 sends messages as soon as they are ready
+        :param message_burst: how many messages can be sent back-to-back before the rate limit applies
+        :param message_lines_per_frame: the most lines for one room to join into a single message
+        """
         self = PSWebsocketClient()
         self.username = username
         self.password = password
         self.address = "ws://{}/showdown/websocket".format(address)
         self.websocket = await websockets.connect(self.address)
-        self.login_uri = "https://play.pokemonshowdown.com/action.php"
+        self.login_uri = login_uri or "https://play.pokemonshowdown.com/action.php"
+        self.owns_http_session = http_session is None
+        self.http_session = http_session or cls.create_http_session()
+        self.login_timeout = aiohttp.ClientTimeout(total=login_timeout)
+        self.rooms = set()
+        self.resumed_rooms = set()
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnected = asyncio.Event()
+        self.reconnected.set()
+        self.outbound_queue = OutboundQueue(
+            self.send_frame,
+            message_rate_limit,
+            message_burst,
+            max_lines_per_frame=message_lines_per_frame
+        )
         return self
 
+    @staticmethod
+    def create_http_session():
+        # the session cookie is tracked per-client in `self.sid`
+        # so that one session can be shared by clients logged into different accounts
+        return aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar())
+
     async def join_room(self, room_name):
         message = "/join {}".format(room_name)
         await self.send_message('', [message])
+        self.rooms.add(room_name)
         logger.debug("Joined room '{}'".format(room_name))
 
+    def track_rooms(self, message):
+        # battle rooms are joined by the server, so they are tracked from the messages it sends
+        if not message.startswith('>'):
+            return
+        room = message[1:message.find('\n')].strip() if '\n' in message else message[1:].strip()
+        if '|init|' in message:
+            self.rooms.add(room)
+        elif '|deinit' in message:
+            self.rooms.discard(room)
+            self.resumed_rooms.discard(room)
+
     async def receive_message(self):
-        message = await self.websocket.recv()
+        while True:
+            try:
+                message = await self.websocket.recv()
+            except websockets.ConnectionClosed as e:
+                await self.recover_connection(e)
+            else:
+                break
+
         logger.debug("Received message from websocket: {}".format(message))
+        self.track_rooms(message)
         return message
 
     async def send_message(self, room, message_list):
-        message = room + "|" + "|".join(message_list)
+        """Queue a message to be sent, consecutive messages for the same room are sent together"""
+        self.outbound_queue.put(room, "|".join(message_list))
+
+    async def send_frame(self, message):
+        # hold messages back until the connection has logged in and rejoined its rooms
+        if self.reconnecting and self.reconnect_task is not asyncio.current_task():
+            await self.reconnected.wait()
+
         logger.debug("Sending message to websocket: {}".format(message))
-        await self.websocket.send(message)
+        try:
+            await self.websocket.send(message)
+        except websockets.ConnectionClosed as e:
+            await self.recover_connection(e)
+            await self.websocket.send(message)
         self.last_message = message
 
+    async def flush(self):
+        """Wait until every queued message has been sent"""
+        await self.outbound_queue.flush()
+
+    async def recover_connection(self, error):
+        """
+        Reconnect after the websocket has dropped
+        Messages are sent from their own task, so another task may already be reconnecting
+        """
+        if self.closing or self.reconnect_task is asyncio.current_task():
+            raise error
+
+        if self.reconnecting:
+            await self.reconnected.wait()
+            if self.reconnecting or self.websocket.closed:
+                raise ReconnectError("The websocket was not reconnected")
+            return
+
+        await self.reconnect()
+
+    async def reconnect(self):
+        """
+        Re-open the websocket with an exponential back-off, log back in, and rejoin every room
+        The server replays the full log of each battle room that is rejoined
+        """
+        self.reconnecting = True
+        self.reconnect_task = asyncio.current_task()
+        self.reconnected.clear()
+        try:
+            for attempt in range(self.reconnect_attempts):
+                delay = min(2 ** attempt, self.reconnect_max_delay) + random.uniform(0, 1)
+                logger.warning("Websocket connection lost - reconnecting in {:.1f} seconds".format(delay))
+                await asyncio.sleep(delay)
+                try:
+                    self.websocket = await websockets.connect(self.address)
+                    await self.login()
+                except (OSError, websockets.WebSocketException, LoginError, asyncio.TimeoutError) as e:
+                    logger.warning("Reconnect attempt {} failed: {}".format(attempt + 1, e))
+                    continue
+
+                # rejoin ahead of anything still waiting in the outbound queue
+                for room in self.rooms:
+                    await self.send_frame("|/join {}".format(room))
+                self.resumed_rooms = {r for r in self.rooms if r.startswith('battle-')}
+                logger.info("Reconnected and rejoined {} room(s)".format(len(self.rooms)))
+                return
+        finally:
+            self.reconnecting = False
+            self.reconnect_task = None
+            self.reconnected.set()
+
+        raise ReconnectError("Could not reconnect after {} attempts".format(self.reconnect_attempts))
+
     async def get_id_and_challstr(self):
         while True:
             message = await self.receive_message()
@@ -59,48 +207,100 @@ class PSWebsocketClient:
             if split_message[1] == 'challstr':
                 return split_message[2], split_message[3]
 
-    async def login(self):
-        logger.debug("Logging in...")
-        client_id, challstr = await self.get_id_and_challstr()
-        if self.password:
-            response = requests.post(
-                self.login_uri,
-                data={
-                    'act': 'login',
-                    'name': self.username,
-                    'pass': self.password,
-                    'challstr': "|".join([client_id, challstr])
-                }
-            )
+    async def post_to_login_server(self, data):
+        cookies = {'sid': self.sid} if self.sid is not None else None
+        async with self.http_session.post(self.login_uri, data=data, cookies=cookies, timeout=self.login_timeout) as response:
+            text = await response.text()
+            if 'sid' in response.cookies:
+                self.sid = response.cookies['sid'].value
+            return response.status, text
 
-        else:
-            response = requests.post(
-                self.login_uri,
-                data={
-                    'act': 'getassertion',
-                    'userid': self.username,
-                    'challstr': '|'.join([client_id, challstr]),
+    async def upkeep(self, challstr):
+        """Get an assertion using the session from a previous login instead of the password"""
+        try:
+            status, text = await self.post_to_login_server(
+                {
+                    'act': 'upkeep',
+                    'challstr': challstr
                 }
             )
+            response_json = json.loads(text[1:])
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug("Could not refresh the login session: {}".format(e))
+            return None
 
-        if response.status_code == 200:
-            if self.password:
-                response_json = json.loads(response.text[1:])
-                if not response_json['actionsuccess']:
-                    logger.error("Login Unsuccessful")
-                    raise LoginError("Could not log-in")
+        if status != 200 or not response_json.get('loggedin') or not response_json.get('assertion'):
+            return None
+
+        return response_json['assertion']
 
-                assertion = response_json.get('assertion')
+    async def get_assertion(self, challstr):
+        if self.sid is not None:
+            assertion = await self.upkeep(challstr)
+            if assertion is not None:
+                logger.debug("Re-used the previous login session")
+                return assertion
+
+        try:
+            if self.password:
+                status, text = await self.post_to_login_server(
+                    {
+                        'act': 'login',
+                        'name': self.username,
+                        'pass': self.password,
+                        'challstr': challstr
+                    }
+                )
             else:
-                assertion = response.text
+                status, text = await self.post_to_login_server(
+                    {
+                        'act': 'getassertion',
+                        'userid': self.username,
+                        'challstr': challstr,
+                    }
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("Could not reach the login server: {}".format(e))
+            raise LoginError("Could not log-in")
 
-            message = ["/trn " + self.username + ",0," + assertion]
-            logger.debug("Successfully logged in")
-            await self.send_message('', message)
-        else:
-            logger.error("Could not log-in\nDetails:\n{}".format(response.content))
+        if status != 200:
+            logger.error("Could not log-in\nDetails:\n{}".format(text))
             raise LoginError("Could not log-in")
 
+        if self.password:
+            response_json = json.loads(text[1:])
+            if not response_json['actionsuccess']:
+                logger.error("Login Unsuccessful")
+                raise LoginError("Could not log-in")
+
+            return response_json.get('assertion')
+        else:
+            return text
+
+    async def login(self):
+        logger.debug("Logging in...")
+        client_id, challstr = await self.get_id_and_challstr()
+        challstr = "|".join([client_id, challstr])
+
+        # an assertion is only valid for the challstr it was issued for, so a new one is needed every time
+        assertion = await self.get_assertion(challstr)
+
+        # sent directly because queued messages may depend on being logged in
+        message = "|/trn " + self.username + ",0," + assertion
+        logger.debug("Successfully logged in")
+        await self.send_frame(message)
+
+    async def close(self):
+        try:
+            await self.flush()
+        except (websockets.WebSocketException, ReconnectError) as e:
+            logger.warning("Could not send every queued message before closing: {}".format(e))
+        await self.outbound_queue.stop()
+        self.closing = True
+        await self.websocket.close()
+        if self.owns_http_session and not self.http_session.closed:
+            await self.http_session.close()
+
     async def update_team(self, battle_format, team):
         if "random" in battle_format:
             logger.info("Setting team to None because the pokemon mode is {}".format(battle_format))
@@ -159,6 +359,10 @@ class PSWebsocketClient:
             if battle_tag in msg and 'deinit' in msg:
                 return
 
+    async def forfeit_battle(self, battle_tag):
+        await self.send_message(battle_tag, ["/forfeit"])
+        await self.leave_battle(battle_tag)
+
     async def save_replay(self, battle_tag):
         message = ["/savereplay"]
         await self.send_message(battle_tag, message)
@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+import logging
+
+from showdown.websocket_client import PSWebsocketClient
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnection:
+    """A logged-in PSWebsocketClient along with the bookkeeping the pool uses to balance work"""
+
+    def __init__(self, client):
+        self.client = client
+        self.busy = False
+        self.battles = 0
+        self.busy_time = 0
+        self.acquired_at = None
+
+    @property
+    def username(self):
+        return self.client.username
+
+    def acquire(self):
+        self.busy = True
+        self.acquired_at = time.time()
+
+    def release(self):
+        self.busy = False
+        self.battles += 1
+        self.busy_time += time.time() - self.acquired_at
+        self.acquired_at = None
+
+    def current_busy_time(self):
+        if self.acquired_at is None:
+            return self.busy_time
+        return self.busy_time + time.time() - self.acquired_at
+
+
+class PSWebsocketPool:
+    """
+    Holds one PSWebsocketClient per Pokemon Showdown account so that battles
+    can be run concurrently from a single process
+
+    Every account has it's own challenge queue and challenge throttle, so
+    work is handed to the idle connection that challenged least recently
+    """
+
+    def __init__(self, connections, http_session=None):
+        self.connections = connections
+        self.http_session = http_session
+        self.created_at = time.time()
+        self.connection_released = asyncio.Condition()
+
+    @classmethod
+    async def create(
+        cls,
+        accounts,
+        address,
+        login_uri=None,
+        login_timeout=10,
+        reconnect_attempts=10,
+        reconnect_max_delay=60,
+        message_rate_limit=0,
+        message_burst=1,
+        message_lines_per_frame=3
+    ):
+        """
+        :param accounts: a list of (username, password) tuples
+        :param address: the address of the Pokemon Showdown websocket
+        :param login_uri: the login endpoint, defaults to the one used by PSWebsocketClient
+        :param login_timeout: seconds before a request to the login server is abandoned
+        :param reconnect_attempts: how many times each connection tries to reconnect after it drops
+        :param reconnect_max_delay: the longest time in seconds to back-off between reconnect attempts
+        :param message_rate_limit: the most messages per second each connection sends
+        :param message_burst: how many messages a connection can send back-to-back before the rate limit applies
+        :param message_lines_per_frame: the most lines for one room to join into a single message
+        """
+        http_session = PSWebsocketClient.create_http_session()
+        clients = await asyncio.gather(
+            *(
+                PSWebsocketClient.create(
+                    username,
+                    password,
+                    address,
+                    login_uri=login_uri,
+                    http_session=http_session,
+                    login_timeout=login_timeout,
+                    reconnect_attempts=reconnect_attempts,
+                    reconnect_max_delay=reconnect_max_delay,
+                    message_rate_limit=message_rate_limit,
+                    message_burst=message_burst,
+                    message_lines_per_frame=message_lines_per_frame
+                )
+                for username, password in accounts
+            )
+        )
+        return cls([PooledConnection(c) for c in clients], http_session=http_session)
+
+    async def login(self):
+        await asyncio.gather(*(c.client.login() for c in self.connections))
+        logger.info("Logged in {} account(s): {}".format(len(self.connections), ", ".join(c.username for c in self.connections)))
+
+    async def close(self):
+        await asyncio.gather(*(c.client.close() for c in self.connections))
+        if self.http_session is not None:
+            await self.http_session.close()
+
+    def __len__(self):
+        return len(self.connections)
+
+    def idle_connections(self):
+        return [c for c in self.connections if not c.busy]
+
+    async def acquire(self):
+        """Wait for an idle connection and mark it as busy"""
+        async with self.connection_released:
+            await self.connection_released.wait_for(lambda: self.idle_connections())
+            connection = min(self.idle_connections(), key=lambda c: c.client.last_challenge_time)
+            connection.acquire()
+
+        logger.debug("Acquired connection for {}".format(connection.username))
+        return connection
+
+    async def release(self, connection):
+        async with self.connection_released:
+            connection.release()
+            self.connection_released.notify()
+
+        logger.debug("Released connection for {}".format(connection.username))
+
+    def utilization(self):
+        """
+        Returns the number of battles, the fraction of time spent in a battle
+        and the state of the outbound message queue for each connection
+        """
+        elapsed = max(time.time() - self.created_at, 1e-9)
+        return {
+            c.username: {
+                "battles": c.battles,
+                "busy": c.busy,
+                "utilization": round(c.current_busy_time() / elapsed, 3),
+                "queue": c.client.outbound_queue.stats()
+            }
+            for c in self.connections
+        }
+
+    def log_utilization(self):
+        for username, stats in self.utilization().items():
+            logger.info(
+                "{}: {} battle(s), {:.1%} utilization{}".format(
+                    username,
+                    stats["battles"],
+                    stats["utilization"],
+                    " (busy)" if stats["busy"] else ""
+                )
+            )
+            queue = stats["queue"]
+            logger.info(
+                "{}: {} line(s) sent in {} message(s), {} queued, {:.3f}s average / {:.3f}s max latency".format(
+                    username,
+                    queue["lines_sent"],
+                    queue["frames_sent"],
+                    queue["depth"],
+                    queue["average_latency"],
+                    queue["max_latency"]
+                )
+            )
@@ -0,0 +1,92 @@
+import io
+import json
+import unittest
+
+from data.parse_smogon_stats import CHAOS_FIELDS
+from data.parse_smogon_stats import read_chaos_file
+
+
+def pokemon_information(name):
+    return {
+        "Raw count": 100,
+        "Checks and Counters": {name: [1, 0.5, 0.1]},
+        "Spreads": {"Jolly:0/252/0/0/4/252": 60.5},
+        "Items": {"Choice Scarf": 50},
+        "Moves": {"U-turn": 90, "": 10},
+        "Abilities": {"Intimidate": 100},
+        "Teammates": {"Garchomp": 0.5},
+    }
+
+
+CHAOS = {
+    "info": {"metagame": "gen9ou", "cutoff": 1500, "note": "brackets } ] { [ in a string"},
+    "data": {
+        "Landorus-Therian": pokemon_information("Landorus-Therian"),
+        # escaped quotes and backslashes before the quote that ends a string
+        'Skipped "}]" \\': dict(pokemon_information("Skipped"), **{"Moves": {'a \\"]}': 1, "b\\\\": 2}}),
+        "Garchomp": pokemon_information("Garchomp"),
+        "Nested": {"Raw count": 1, "Spreads": {"x": [[], {}, [{"]": "["}]]}, "Moves": {}},
+        "Great Tusk": dict(pokemon_information("Great Tusk"), **{"Items": {"}{": 1, "\\u00e9": 2}}),
+    },
+}
+
+
+def expected(wanted):
+    return [
+        (name, {k: info[k] for k in CHAOS_FIELDS if k in info})
+        for name, info in CHAOS["data"].items() if wanted(name)
+    ]
+
+
+class TestReadChaosFile(unittest.TestCase):
+    def read(self, text, wanted, chunk_size):
+        return list(read_chaos_file(io.StringIO(text), wanted, chunk_size=chunk_size))
+
+    def test_every_chunk_boundary(self):
+        text = json.dumps(CHAOS, indent=2)
+        wanted = {"Landorus-Therian", "Great Tusk"}.__contains__
+        for chunk_size in range(1, 300):
+            self.assertEqual(expected(wanted), self.read(text, wanted, chunk_size), chunk_size)
+
+    def test_every_chunk_boundary_without_whitespace(self):
+        text = json.dumps(CHAOS, separators=(',', ':'))
+        wanted = {"Garchomp", "Nested"}.__contains__
+        for chunk_size in range(1, 300):
+            self.assertEqual(expected(wanted), self.read(text, wanted, chunk_size), chunk_size)
+
+    def test_reads_every_wanted_pokemon_in_one_chunk(self):
+        text = json.dumps(CHAOS)
+        self.assertEqual(expected(lambda name: True), self.read(text, lambda name: True, len(text)))
+
+    def truncated(self, after):
+        text = json.dumps(CHAOS)
+        return text[:text.index(after) + len(after)]
+
+    def test_truncated_in_a_wanted_pokemon(self):
+        text = self.truncated('"Garchomp": {"Raw count"')
+        with self.assertRaises(ValueError):
+            self.read(text, {"Garchomp"}.__contains__, 64)
+
+    def test_truncated_in_a_skipped_pokemon(self):
+        text = self.truncated('"Garchomp": {"Raw count"')
+        with self.assertRaises(ValueError) as cm:
+            self.read(text, {"Landorus-Therian"}.__contains__, 64)
+        self.assertEqual("Unexpected end of JSON", str(cm.exception))
+
+    def test_truncated_in_a_skipped_string(self):
+        # in the middle of a move name that has an escaped quote and brackets after it
+        text = self.truncated(json.dumps('a \\"]}')[:-2])
+        with self.assertRaises(ValueError) as cm:
+            self.read(text, {"Landorus-Therian"}.__contains__, 64)
+        self.assertEqual("Unexpected end of JSON", str(cm.exception))
+
+    def test_truncated_between_pokemon(self):
+        text = json.dumps(CHAOS)[:-2]
+        with self.assertRaises(ValueError) as cm:
+            self.read(text, lambda name: False, 64)
+        self.assertEqual("Unexpected end of JSON", str(cm.exception))
+
+    def test_not_an_object(self):
+        with self.assertRaises(ValueError) as cm:
+            self.read('["data"]', lambda name: True, 64)
+        self.assertEqual("Expected '{' at '[\"data\"]'", str(cm.exception))
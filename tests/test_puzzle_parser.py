@@ -0,0 +1,98 @@
+import unittest
+
+import constants
+from puzzles.puzzle_parser import PuzzleError
+from puzzles.puzzle_parser import PuzzleSyntaxError
+from puzzles.puzzle_parser import get_puzzle_commands
+
+
+NO_MODIFIERS = {'mega': False, 'ultra_burst': False, 'dynamax': False, 'tera': False, 'z': False}
+
+
+class TestGetPuzzleCommands(unittest.TestCase):
+    def test_parses_commands_with_their_locations(self):
+        puzzle = "(Golem)\n+ Close Combat\n+@ Self-Destruct\n[+# Curse]\n"
+        expected = [
+            {'action': constants.SET_SWITCH, 'pokemon': 'golem', 'location': (1, 2)},
+            {'action': constants.MOVE, 'move': 'closecombat', 'modifiers': NO_MODIFIERS, 'location': (2, 2)},
+            {'action': constants.MOVE, 'move': 'selfdestruct', 'modifiers': dict(NO_MODIFIERS, mega=True), 'location': (3, 3)},
+            {
+                'action': constants.REPEAT_UNTIL_FAINT,
+                'commands': [
+                    {'action': constants.MOVE, 'move': 'curse', 'modifiers': dict(NO_MODIFIERS, tera=True), 'location': (4, 4)},
+                ]
+            },
+        ]
+        self.assertEqual(expected, get_puzzle_commands(puzzle))
+
+    def test_puzzles_are_parsed_the_same_with_any_line_endings(self):
+        puzzle = "(Golem)\n[+ Curse]\n"
+        self.assertEqual(get_puzzle_commands(puzzle), get_puzzle_commands(puzzle.replace("\n", "\r\n")))
+
+    def assert_error(self, exception, message, puzzle):
+        with self.assertRaises(exception) as cm:
+            get_puzzle_commands(puzzle)
+        self.assertEqual(message, str(cm.exception))
+
+    def test_first_command_must_be_the_lead(self):
+        self.assert_error(
+            PuzzleError,
+            "Error in puzzle file: line 1, column 1.\n+ Curse\n^\nFirst command of each puzzle must be declaring a lead pokemon",
+            "+ Curse\n"
+        )
+
+    def test_unknown_move(self):
+        self.assert_error(
+            PuzzleError,
+            "Error in puzzle file: line 3, column 2.\n+ Not A Move\n ^\n'notamove' is not a valid move",
+            "(Golem)\n+ Curse\n+ Not A Move\n"
+        )
+
+    def test_unknown_pokemon(self):
+        self.assert_error(
+            PuzzleError,
+            "Error in puzzle file: line 2, column 2.\n> Notapokemon\n ^\n'notapokemon' is not a valid Pokemon",
+            "(Golem)\n> Notapokemon\n"
+        )
+
+    def test_unclosed_repeat_until_faint_loop(self):
+        self.assert_error(
+            PuzzleSyntaxError,
+            "Error in puzzle file: line 2, column 3.\n[+ Curse\n  ^\nReached end of file while parsing puzzle",
+            "(Golem)\n[+ Curse\n"
+        )
+
+    def test_nested_repeat_until_faint_loop(self):
+        self.assert_error(
+            PuzzleSyntaxError,
+            "Error in puzzle file: line 2, column 10.\n[+ Curse [+ Curse]]\n         ^\n'[' unexpected in repeat until faint loop",
+            "(Golem)\n[+ Curse [+ Curse]]\n"
+        )
+
+    def test_close_bracket_outside_of_repeat_until_faint_loop(self):
+        self.assert_error(
+            PuzzleSyntaxError,
+            "Error in puzzle file: line 2, column 8.\n+ Curse]\n       ^\n']' unexpected outside of repeat until faint loop",
+            "(Golem)\n+ Curse]\n"
+        )
+
+    def test_unclosed_set_switch(self):
+        self.assert_error(
+            PuzzleSyntaxError,
+            "Error in puzzle file: line 2, column 1.\n+ Curse\n^\nMissing closing parenthesis ')' for set switch statement",
+            "(Golem\n+ Curse\n"
+        )
+
+    def test_token_inside_set_switch(self):
+        self.assert_error(
+            PuzzleSyntaxError,
+            "Error in puzzle file: line 1, column 8.\n(Golem + Curse)\n       ^\n'+' unexpected in set switch statement",
+            "(Golem + Curse)\n"
+        )
+
+    def test_token_instead_of_move_name(self):
+        self.assert_error(
+            PuzzleSyntaxError,
+            "Error in puzzle file: line 2, column 3.\n+ >\n  ^\nExpected a move name, got '>' instead",
+            "(Golem)\n+ >\n"
+        )
@@ -0,0 +1,73 @@
+import argparse
+import logging
+import os
+
+from config import init_logging
+from puzzles.load_puzzle import PUZZLE_DIR
+from showdown.puzzle_runner.verifier import verify_puzzles
+from showdown.puzzle_runner.verifier import FORCED_WIN
+from showdown.puzzle_runner.verifier import SKIPPED
+
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Check offline whether each puzzle can be beaten by the challenger's team"
+    )
+    parser.add_argument("puzzles", nargs="*", help="the puzzles to verify, defaults to every puzzle")
+    parser.add_argument("--pokemon-mode", default=os.environ.get("POKEMON_MODE", "gen9nationaldexag"))
+    parser.add_argument("--challenger", default=None, help="a team in the export format to use instead of each puzzle's `challenger` file")
+    parser.add_argument(
+        "--default-challenger",
+        default=os.path.join(BENCHMARK_DIR, "challenger"),
+        help="the team used for puzzles without a `challenger` file"
+    )
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--max-nodes", type=int, default=200000, help="the most states searched for each team before giving up")
+    parser.add_argument("--processes", type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument("--damage-calc-type", default="average")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    init_logging("INFO", False)
+
+    names = args.puzzles or sorted(
+        name for name in os.listdir(PUZZLE_DIR)
+        if os.path.isdir(os.path.join(PUZZLE_DIR, name)) and not name.startswith('.')
+    )
+
+    results = verify_puzzles(
+        names,
+        args.pokemon_mode,
+        challenger_path=args.challenger,
+        max_turns=args.max_turns,
+        max_nodes=args.max_nodes,
+        processes=args.processes,
+        damage_calc_type=args.damage_calc_type,
+        default_challenger_path=args.default_challenger
+    )
+
+    for result in results:
+        logger.info("{}: {} ({} states searched){}".format(
+            result.puzzle,
+            result.result,
+            result.nodes,
+            " - {}".format(result.message) if result.message else ""
+        ))
+        if result.line:
+            for turn in result.line:
+                logger.info("    {} vs. {}".format(turn.challenger_choice, turn.bot_choice or "team preview"))
+
+    # puzzles that are missing a file are reported, but are not a failure
+    if any(r.result not in (FORCED_WIN, SKIPPED) for r in results):
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()